@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from cajas import box_statistics
+
+# Familia categórica de cada opción del boxplot
+BOX_FAMILIES = {"photos": "has_photo", "pets": "pets_allowed"}
+
+
+class DashboardAggregator:
+    """Etapa de agregación única para todas las salidas que dependen de los filtros.
+
+    Con una sola resolución de filtros por interacción produce los KPIs, el
+    conteo de dormitorios, los datos del boxplot y las correlaciones de las
+    amenities con el precio; las figuras se construyen a partir de ese resultado.
+    Con un índice ``espacial`` la selección se puede restringir a una región
+    del mapa; en ese caso los cubos no aplican y todo sale de las filas.
+    """
+
+    def __init__(self, datos, motor, amenities, cubo=None, correlaciones=None, box_max_points=200,
+                 espacial=None):
+        self.datos = datos
+        self.motor = motor
+        self.espacial = espacial
+        self.cubo = cubo
+        self.correlaciones = correlaciones
+        self.box_max_points = box_max_points
+        # Columnas por defecto del heatmap cuando no se selecciona ninguna amenidad
+        self.heatmap_columns = [col for col in datos.columns if col.startswith("has_") or col in amenities]
+
+    def aggregate(self, state, bathrooms, square_feet_range, amenities, category, region=None):
+        # La región del mapa se resuelve con el índice espacial y los demás filtros se prueban solo
+        # sobre sus filas
+        within = self.espacial.query(region) if region else None
+
+        # El heatmap no se filtra por amenities; el resto de salidas sí
+        base_rows = self.motor.resolve(state, bathrooms, square_feet_range, rows=within)
+        rows = self.motor.refine(base_rows, amenities)
+
+        return {
+            **self._kpis(state, bathrooms, square_feet_range, amenities, rows, region),
+            "bedroom_counts": self._bedroom_counts(rows),
+            "box_stats": self._box_stats(rows, category),
+            "correlations": self._correlations(state, bathrooms, square_feet_range, amenities, base_rows, region),
+        }
+
+    def _kpis(self, state, bathrooms, square_feet_range, amenities, rows, region=None):
+        # Sin filtros de amenities ni región los KPIs salen del cubo precalculado
+        if self.cubo is not None and not amenities and not region:
+            kpis = self.cubo.query(state, bathrooms, square_feet_range)
+            if kpis is not None:
+                return kpis
+
+        return {
+            # Cada fila tiene a lo sumo una ciudad (código -1 si no tiene ninguna)
+            "total_cities": np.count_nonzero(self.datos.codes("cityname")[rows] >= 0),
+            "total_apartments": len(rows),
+            "avg_price": self._mean("price", rows),
+            "avg_description_length": self._mean("longitud_descripcion", rows),
+        }
+
+    def _mean(self, column, rows):
+        values = self.datos.column(column, rows)
+        return values.mean(dtype=np.float64) if len(values) else np.nan
+
+    def _bedroom_counts(self, rows):
+        bedroom_counts = pd.Series(self.datos.column("bedrooms", rows)).value_counts().reset_index()
+        bedroom_counts.columns = ["bedrooms", "count"]
+        return bedroom_counts
+
+    def _box_stats(self, rows, category):
+        if category not in BOX_FAMILIES:
+            return None
+
+        # Agrupar directamente sobre los códigos precalculados de la familia
+        family = BOX_FAMILIES[category]
+        return box_statistics(self.datos.codes(family)[rows], self.datos.column("price", rows),
+                              self.datos.display_labels(family), self.box_max_points)
+
+    def _correlations(self, state, bathrooms, square_feet_range, amenities, rows, region=None):
+        # Si no se selecciona ninguna amenidad, usar todas
+        if amenities is None or len(amenities) == 0:
+            amenities = self.heatmap_columns
+
+        # Con el motor de estadísticos suficientes solo se calculan las k correlaciones con el precio
+        if self.correlaciones is not None:
+            return self.correlaciones.correlations(state, bathrooms, square_feet_range, amenities, rows,
+                                                   use_cube=not region)
+
+        # Correlación entre amenities y precio, solo la fila del precio
+        filtered_data = self.datos.take_columns(rows, amenities + ["price"])
+        correlation = filtered_data.corr()
+        return correlation[["price"]].drop("price")
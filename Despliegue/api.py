@@ -0,0 +1,141 @@
+import json
+import math
+
+import numpy as np
+from flask import jsonify, request
+
+
+def _prefixed(value, prefix):
+    # Acepta "Austin" o "cityname_Austin" (y "CA" o "state_CA")
+    return value if value.startswith(prefix) else prefix + value
+
+
+def _number(listing, field, errors, minimum):
+    value = listing.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        errors.append(f"'{field}' debe ser un número")
+        return None
+    if value < minimum:
+        errors.append(f"'{field}' debe ser mayor o igual a {minimum}")
+        return None
+    return float(value)
+
+
+def _read_body(stream, max_bytes):
+    # Lee a lo sumo ``max_bytes + 1`` bytes: alcanza para saber si el cuerpo supera el límite aunque
+    # llegue sin Content-Length (transferencia por partes)
+    parts, size = [], 0
+    while size <= max_bytes:
+        part = stream.read(max_bytes + 1 - size)
+        if not part:
+            break
+        parts.append(part)
+        size += len(part)
+    return b"".join(parts)
+
+
+def validate_listing(listing, cities, states, amenities, city_states):
+    """Valida un anuncio del lote y lo normaliza a los nombres de variable del modelo.
+
+    Devuelve ``(anuncio, errores)``; si hay errores el anuncio es ``None``.
+    """
+    if not isinstance(listing, dict):
+        return None, ["cada anuncio debe ser un objeto JSON"]
+
+    errors = []
+    bathrooms = _number(listing, "bathrooms", errors, 0)
+    square_feet = _number(listing, "square_feet", errors, 1)
+
+    city = listing.get("city")
+    if not isinstance(city, str) or _prefixed(city, "cityname_") not in cities:
+        errors.append("'city' no es una ciudad conocida")
+        city = None
+    else:
+        city = _prefixed(city, "cityname_")
+
+    state = listing.get("state")
+    if state is None:
+        state = city_states.get(city)
+    elif not isinstance(state, str) or _prefixed(state, "state_") not in states:
+        errors.append("'state' no es un estado conocido")
+    else:
+        state = _prefixed(state, "state_")
+
+    listing_amenities = listing.get("amenities") or []
+    if not isinstance(listing_amenities, list) or not all(isinstance(a, str) for a in listing_amenities):
+        errors.append("'amenities' debe ser una lista de textos")
+    else:
+        unknown = [a for a in listing_amenities if a not in amenities]
+        if unknown:
+            errors.append(f"amenities desconocidas: {', '.join(unknown)}")
+
+    if errors:
+        return None, errors
+    return {
+        "bathrooms": bathrooms,
+        "square_feet": square_feet,
+        "city": city,
+        "state": state,
+        "amenities": listing_amenities,
+    }, []
+
+
+def register_scoring_api(server, context, max_rows=10_000, max_bytes=5 * 1024 * 1024):
+    """Registra ``POST /api/estimaciones`` en el servidor Flask del tablero.
+
+    El cuerpo es ``{"listings": [...]}`` (o directamente la lista) con objetos
+    ``{"bathrooms", "square_feet", "city", "state", "amenities"}``. Todos los
+    anuncios válidos se estiman en una sola pasada vectorizada; los inválidos
+    devuelven sus errores sin hacer fallar el lote.
+
+    ``context()`` devuelve ``(model, cities, states, amenities, city_states)``
+    de la versión vigente del tablero (ciudades, estados y amenities como
+    conjuntos); se llama una vez por solicitud, así que un lote se estima
+    completo con una misma versión del modelo.
+
+    Un cuerpo de más de ``max_bytes`` bytes recibe 413 sin leerse completo,
+    tenga o no Content-Length.
+    """
+
+    @server.route("/api/estimaciones", methods=["POST"])
+    def estimate_prices():
+        too_large = request.content_length is not None and request.content_length > max_bytes
+        data = b"" if too_large else _read_body(request.stream, max_bytes)
+        if too_large or len(data) > max_bytes:
+            return jsonify(error=f"El cuerpo supera el límite de {max_bytes} bytes"), 413
+
+        try:
+            body = json.loads(data) if request.is_json else None
+        except ValueError:
+            body = None
+        listings = body.get("listings") if isinstance(body, dict) else body
+        if not isinstance(listings, list):
+            return jsonify(error="Se esperaba una lista de anuncios en 'listings'"), 400
+        if len(listings) > max_rows:
+            return jsonify(error=f"El lote supera el límite de {max_rows} anuncios"), 413
+
+        model, cities, states, amenities, city_states = context()
+        results = [None] * len(listings)
+        valid_positions, valid = [], []
+        for i, listing in enumerate(listings):
+            normalized, errors = validate_listing(listing, cities, states, amenities, city_states)
+            if errors:
+                results[i] = {"index": i, "errors": errors}
+            else:
+                valid_positions.append(i)
+                valid.append(normalized)
+
+        if valid:
+            estimates = model.score_batch(
+                np.array([v["bathrooms"] for v in valid]),
+                np.array([v["square_feet"] for v in valid]),
+                cities=[v["city"] for v in valid],
+                states=[v["state"] for v in valid],
+                amenities=[v["amenities"] for v in valid],
+            )
+            for i, estimate in zip(valid_positions, estimates):
+                results[i] = {"index": i, "estimate": round(float(estimate), 2)}
+
+        return jsonify(results=results, count=len(listings), errors=len(listings) - len(valid))
+
+    return estimate_prices
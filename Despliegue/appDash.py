@@ -1,418 +1,673 @@
+import json
+import os
+
 import dash
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
-
-# Cargar datos
-datos = pd.read_csv("datosPreparados.csv")
-coeficientes = pd.read_csv("modeloFinal.csv")
-
-# Obtener la lista de ciudades, estados, fuentes, mascotas y amenities
-ciudades = [col for col in datos.columns if col.startswith("cityname_")]
-estados = [col for col in datos.columns if col.startswith("state_")]
-fuentes = [col for col in datos.columns if col.startswith("source_")]
-mascotas = [col for col in datos.columns if col.startswith("pets_allowed_")]
-fotos = [col for col in datos.columns if col.startswith("has_photo_")]
+import numpy as np
+from agregacion import DashboardAggregator
+from api import register_scoring_api
+from cache_datos import load_dataset, load_coefficients, load_filter_engine
+from cache_resultados import ResultCache, filter_signature, snap_range
+from correlaciones import CorrelationEngine
+from cubo import KpiCube
+from espacial import SpatialIndex, bbox_region
+from ingesta import DeltaIngestor, watch_directory
+from mapa import MapAsset, register_map_route
+from modelo import PriceModel, city_state_map, simulator_payload
+from registro import Registry
+from teselas import PriceTiles, inverse_mercator, mercator, register_tile_route, tile_payload, tiles_for_viewport
+
+# Amenities del tablero (cada una ocupa un bit de la máscara de amenities)
 amenities = ["TV", "Dishwasher", "Wood Floors", "Elevator", "Clubhouse", "Doorman", "Parking", "Patio/Deck", "Luxury", "Storage", "View", "Refrigerator", "Playground", "Internet Access", "Tennis", "Gated", "Basketball", "Golf", "Garbage Disposal", "AC", "Gym", "Washer Dryer", "Pool", "Alarm", "Hot Tub", "Fireplace", "Cable or Satellite"]
 
+# Con DATOS_MMAP=1 las columnas se abren como mapas de memoria de solo lectura compartidos por
+# todos los procesos del servidor
+usar_mmap = os.environ.get("DATOS_MMAP", "0") == "1"
+paso_tamano = 100
+
+# Con DELTAS_DIR se aplican los deltas de anuncios de ese directorio (ver ingesta.py) a cada versión y se
+# revisa cada DELTAS_INTERVALO segundos
+directorio_deltas = os.environ.get("DELTAS_DIR")
+
+# Archivos de los que depende una versión del tablero; al cambiar cualquiera se construye una nueva
+RUTA_DATOS = "datosPreparados.csv"
+RUTAS_MODELO = ["modeloFinal.bin", "modeloFinal.csv"]
+RUTA_MAPA = "mapa_precios.html"
+
+# Con MAPA_INTERACTIVO=1 (por defecto) el mapa de calor se arma con teselas agregadas en el servidor que
+# responden a los filtros (ver teselas.py); con 0 se muestra el documento estático de mapa_precios.html
+mapa_interactivo = os.environ.get("MAPA_INTERACTIVO", "1") == "1"
+# Zoom inicial del mapa (el del mapa del cuaderno) y tamaño de vista supuesto antes de que el navegador
+# informe los límites reales
+ZOOM_INICIAL_MAPA = 4
+VISTA_MAPA_PX = (1100, 500)
+
+
+def construir_version():
+    """Carga los datos, el modelo y el mapa y construye todos sus índices y agregados."""
+    # Representación compacta (familias one-hot como códigos y amenities como máscara de bits) desde la
+    # caché binaria, que se reconstruye solo cuando cambia el contenido de los CSV
+    datos = load_dataset(RUTA_DATOS, amenities, mmap=usar_mmap)
+
+    # Motor de estimación. Se usa el artefacto binario que exporta SeleccionModelo.ipynb si existe; si no,
+    # modeloFinal.csv. Se carga antes de aplicar los deltas: las ciudades o estados nuevos que agregan
+    # cambian las columnas (el modelo los estima con coeficiente 0) y no coincidirían con el esquema. Un
+    # modelo con variables que el simulador no codifica (p. ej. bedrooms) se rechaza
+    if os.path.exists(RUTAS_MODELO[0]):
+        modelo_precios = PriceModel.load(RUTAS_MODELO[0], columns=list(datos.columns), amenities=amenities)
+    else:
+        modelo_precios = PriceModel.from_frame(load_coefficients(RUTAS_MODELO[1]), amenities=amenities)
+
+    # Obtener la lista de ciudades y estados
+    ciudades = [col for col in datos.columns if col.startswith("cityname_")]
+    estados = [col for col in datos.columns if col.startswith("state_")]
+
+    # Índices de filtrado precalculados (bitsets por estado, baños y amenity)
+    motor_filtros = load_filter_engine(datos, estados, amenities, mmap=usar_mmap)
+    tamano_min = int(datos.column("square_feet").min())
+    tamano_max = int(datos.column("square_feet").max())
+
+    # Cubo de KPIs por (estado, baños, franja de tamaño) para las consultas sin amenities
+    cubo_kpis = KpiCube(datos, motor_filtros, tamano_min, tamano_max, paso_tamano)
+
+    # Estadísticos suficientes de la correlación de cada amenity (y de las fotos) con el precio
+    columnas_heatmap = [col for col in datos.columns if col.startswith("has_") or col in amenities]
+    motor_correlaciones = CorrelationEngine(datos, motor_filtros, columnas_heatmap, tamano_min, tamano_max,
+                                            paso_tamano)
+
+    # Índice espacial de las coordenadas para limitar los indicadores a la vista del mapa
+    espacial = SpatialIndex(datos)
+
+    agregador = DashboardAggregator(datos, motor_filtros, amenities, cubo=cubo_kpis,
+                                    correlaciones=motor_correlaciones,
+                                    box_max_points=int(os.environ.get("BOXPLOT_MAX_PUNTOS", 200)),
+                                    espacial=espacial)
+
+    # Celdas de anuncios y precios por nivel de zoom para las teselas del mapa de calor
+    teselas = PriceTiles(datos, motor_filtros)
+
+    # Ingesta incremental; cada delta cambia datos.version, la llave de la caché de resultados
+    ingesta = DeltaIngestor(datos, motor_filtros, [cubo_kpis, motor_correlaciones, teselas, espacial])
+    if directorio_deltas:
+        ingesta.ingest_directory(directorio_deltas)
+
+    # Estado de cada ciudad para el simulador, y ciudades y estados del endpoint de estimación, con los
+    # que agregaron los deltas
+    estado_por_ciudad = city_state_map(datos)
+    ciudades = [col for col in datos.columns if col.startswith("cityname_")]
+    estados = [col for col in datos.columns if col.startswith("state_")]
+
+    # El documento estático del mapa se lee y se comprime aquí, una vez por versión; con el mapa
+    # interactivo no se usa y el archivo puede no existir
+    mapa = None if mapa_interactivo else MapAsset(RUTA_MAPA)
+
+    return {
+        "datos": datos,
+        "tamano_min": tamano_min,
+        "tamano_max": tamano_max,
+        "agregador": agregador,
+        "ingesta": ingesta,
+        "modelo_precios": modelo_precios,
+        "estado_por_ciudad": estado_por_ciudad,
+        # Contexto del endpoint de estimación (ciudades, estados y amenities como conjuntos)
+        "api": (modelo_precios, set(ciudades), set(estados), set(amenities), estado_por_ciudad),
+        "mapa": mapa,
+        "teselas": teselas,
+        "centro_mapa": (float(datos.column("latitude").mean()), float(datos.column("longitude").mean())),
+    }
+
+
+# Versión vigente del tablero. Con RECARGA_INTERVALO > 0 un hilo de fondo revisa los archivos cada
+# tantos segundos y, si cambian, construye la nueva versión y la publica sin reiniciar el servidor;
+# cada callback toma registro.current una sola vez y termina con esa versión
+registro = Registry(construir_version, [RUTA_DATOS, *RUTAS_MODELO, *([] if mapa_interactivo else [RUTA_MAPA])],
+                    interval=float(os.environ.get("RECARGA_INTERVALO", 5)))
+
+# Caché LRU de los resultados por selección de filtros (tamaño configurable por variables de entorno). Las
+# llaves incluyen la versión de los datos; al publicar una versión nueva se vacía
+cache_resultados = ResultCache(
+    max_entries=int(os.environ.get("CACHE_RESULTADOS_MAX_ENTRADAS", 256)),
+    max_bytes=int(os.environ.get("CACHE_RESULTADOS_MAX_BYTES", 64 * 1024 * 1024)),
+)
+# Caché de las teselas del mapa por (zoom, tesela, firma de filtros)
+cache_teselas = ResultCache(
+    max_entries=int(os.environ.get("CACHE_TESELAS_MAX_ENTRADAS", 4096)),
+    max_bytes=int(os.environ.get("CACHE_TESELAS_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+
+def vaciar_caches(*_):
+    cache_resultados.clear()
+    cache_teselas.clear()
+
+
+registro.on_swap(vaciar_caches)
+if registro.interval > 0:
+    registro.watch()
+
+if directorio_deltas:
+    watch_directory(directorio_deltas, lambda: registro.current["ingesta"],
+                    interval=float(os.environ.get("DELTAS_INTERVALO", 60)),
+                    on_ingest=vaciar_caches)
+
+# Con SIMULADOR_EN_CLIENTE=1 (por defecto) los coeficientes se embeben una vez en la página y el
+# simulador se evalúa en el navegador (assets/simulador.js); con 0 se usa el callback del servidor
+simulador_en_cliente = os.environ.get("SIMULADOR_EN_CLIENTE", "1") == "1"
+
 # Inicializar la aplicación Dash
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "Alquileres de Vivienda"
 
-# Layout del tablero
-app.layout = dbc.Container([
-    # Header
-    dbc.Row([
-        dbc.Col(html.H1("Alquileres de Vivienda"), width=12)
-    ], style={"margin-top": "50px", "text-align": "center", "background-color": "#f0f0f0"}),
+# Endpoint de estimación por lotes sobre el servidor Flask del tablero
+register_scoring_api(
+    app.server, lambda: registro.current["api"],
+    max_rows=int(os.environ.get("API_MAX_FILAS", 10_000)),
+    max_bytes=int(os.environ.get("API_MAX_BYTES", 5 * 1024 * 1024)),
+)
+
+# Mapa de precios estático como recurso cacheable (ETag, Cache-Control y variantes comprimidas) en lugar
+# de embeberlo en el layout
+if not mapa_interactivo:
+    register_map_route(app.server, lambda: registro.current["mapa"])
+
+
+def contexto_teselas():
+    version = registro.current
+    return version["teselas"], version["ingesta"].lock
+
+
+# Teselas del mapa de calor para otros clientes (el tablero las arma en el callback del mapa)
+register_tile_route(app.server, contexto_teselas, cache_teselas)
+
+# Layout del tablero. Se arma en cada carga de la página con la versión vigente (ciudades, estados,
+# rango del slider, coeficientes del simulador y mapa)
+def serve_layout():
+    version = registro.current
+    tamano_min, tamano_max = version["tamano_min"], version["tamano_max"]
+    modelo_precios, estado_por_ciudad = version["modelo_precios"], version["estado_por_ciudad"]
+    # Las columnas se leen en cada carga para incluir las ciudades y estados que agregan los deltas
+    ciudades = [col for col in version["datos"].columns if col.startswith("cityname_")]
+    estados = [col for col in version["datos"].columns if col.startswith("state_")]
+
+    return dbc.Container([
+        # Header
+        dbc.Row([
+            dbc.Col(html.H1("Alquileres de Vivienda"), width=12)
+        ], style={"margin-top": "50px", "text-align": "center", "background-color": "#f0f0f0"}),
     
-    # Mapa
-    dbc.Row([
-        dbc.Col(html.Div(
-            style={
-                "position": "relative",  # Permite superponer elementos
-                "width": "100%",
-                "height": "500px",
-            },
-            children=[
-                # Mapa
-                html.Iframe(
-                    srcDoc=open("mapa_precios.html", "r", encoding="utf-8").read(),
-                    style={
-                        "width": "100%",
-                        "height": "100%",
-                        "border": "none",
-                    }
+        # Mapa
+        dbc.Row([
+            dbc.Col(html.Div(
+                style={
+                    "position": "relative",  # Permite superponer elementos
+                    "width": "100%",
+                    "height": "500px",
+                },
+                children=[
+                    # Mapa
+                    dcc.Graph(
+                        id="mapa-precios",
+                        config={"scrollZoom": True, "displayModeBar": False},
+                        style={"width": "100%", "height": "100%"},
+                    ) if mapa_interactivo else html.Iframe(
+                        src=app.get_relative_path(f"/mapa/precios.html?v={version['mapa'].fingerprint}"),
+                        style={
+                            "width": "100%",
+                            "height": "100%",
+                            "border": "none",
+                        }
+                    ),
+                    # Leyenda con degradado
+                    html.Div(
+                        style={
+                            "position": "absolute",  
+                            "top": "20px",  
+                            "right": "20px", 
+                            "background": "white", 
+                            "padding": "15px", 
+                            "border": "1px solid #ddd",
+                            "border-radius": "10px", 
+                            "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.2)", 
+                            "z-index": "1000", 
+                            "width": "180px",
+                            "font-family": "Arial, sans-serif",  
+                        },
+                        children=[
+                            # Cuadro degradado
+                            html.Div(
+                                style={
+                                    "background": "linear-gradient(to right, blue, green, yellow, red)",  # Degradado
+                                    "height": "20px",  # Alto del cuadro degradado
+                                    "border-radius": "5px",  # Bordes redondeados
+                                    "margin-bottom": "10px",  # Espacio debajo del cuadro
+                                }
+                            ),
+                            # Etiquetas de precio
+                            html.Div(
+                                style={
+                                    "display": "flex",
+                                    "justify-content": "flex-end",  # Alinea el texto a la derecha
+                                },
+                                children=[
+                                    html.Div(
+                                        "Precios más altos",
+                                        style={
+                                            "font-size": "12px",
+                                            "color": "red",
+                                        }
+                                    ),
+                                ]
+                            ),
+                        ]
+                    ),
+                    html.Div(
+                        "Puede acercar o alejar el mapa para ver la distribución de precios en diferentes regiones.",
+                        style={
+                            "text-align": "left",
+                            "font-size": "12px", 
+                            "color": "#666",  
+                            "margin-top": "2px" 
+                        }),
+                    # Filtro por región: los indicadores se calculan solo con los anuncios de la vista del mapa
+                    dbc.Checklist(
+                        id="region-mapa",
+                        options=[{"label": "Limitar los indicadores a la zona visible del mapa", "value": "vista"}],
+                        value=[],
+                        switch=True,
+                        style={"font-size": "12px"}
+                    ) if mapa_interactivo else None,
+                ]
+            ))
+        ], style={"margin-top": "50px"}),
+
+        # Filtros Globales
+        dbc.Row(
+            [
+                dbc.Col(
+                    [
+                # Dropdown para seleccionar el estado
+                dbc.Row(
+                
+                    dbc.Card(
+                        dbc.CardBody([
+                            dbc.Label("Seleccione un estado", className="font-weight-bold"),
+                            dcc.Dropdown(
+                                id="state-dropdown",
+                                placeholder="Seleccione un estado",
+                                options=[{"label": estado.replace("state_", ""), "value": estado} for estado in estados],
+                                className="mb-3"  # Margen inferior
+                            )
+                        ]),
+                        style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
+                    ),
                 ),
-                # Leyenda con degradado
-                html.Div(
-                    style={
-                        "position": "absolute",  
-                        "top": "20px",  
-                        "right": "20px", 
-                        "background": "white", 
-                        "padding": "15px", 
-                        "border": "1px solid #ddd",
-                        "border-radius": "10px", 
-                        "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.2)", 
-                        "z-index": "1000", 
-                        "width": "180px",
-                        "font-family": "Arial, sans-serif",  
-                    },
-                    children=[
-                        # Cuadro degradado
-                        html.Div(
-                            style={
-                                "background": "linear-gradient(to right, blue, green, yellow, red)",  # Degradado
-                                "height": "20px",  # Alto del cuadro degradado
-                                "border-radius": "5px",  # Bordes redondeados
-                                "margin-bottom": "10px",  # Espacio debajo del cuadro
-                            }
-                        ),
-                        # Etiquetas de precio
-                        html.Div(
-                            style={
-                                "display": "flex",
-                                "justify-content": "flex-end",  # Alinea el texto a la derecha
-                            },
-                            children=[
-                                html.Div(
-                                    "Precios más altos",
-                                    style={
-                                        "font-size": "12px",
-                                        "color": "red",
-                                    }
-                                ),
-                            ]
-                        ),
-                    ]
+                # Input para el número de baños
+                dbc.Row(
+                    dbc.Card(
+                        dbc.CardBody([
+                            dbc.Label("Número de baños", className="font-weight-bold"),
+                            dbc.Input(
+                                id="bathrooms-input",
+                                type="number",
+                                placeholder="Ej: 2",
+                                min=1,
+                                max=10,
+                                className="mb-3"  # Margen inferior
+                            )
+                        ]),
+                        style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
+                    ),
+                )
+                    ], width=4
+                ),
+                # Checklist para las amenities
+                dbc.Col(
+                    dbc.Card(
+                        dbc.CardBody([
+                            dbc.Label("Seleccione los Amenities", className="font-weight-bold"),
+                            dbc.Checklist(
+                                id="amenities-checklist",
+                                options=[{"label": amenity, "value": amenity} for amenity in amenities],
+                                inline=True,
+                                switch=True,
+                                className="mb-10"
+                            )
+                        ]),
+                        style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
+                    ),
+                    width=6
                 ),
+            ],
+            # Centrar horizontal y verticalmente
+            justify="center",  # Centrar horizontalmente
+            align="center",    # Centrar verticalmente
+            className="h-100",  # Asegura que la fila ocupe toda la altura disponible
+            style={"margin-top": "50px"}
+        ),
+    
+        # Slider tamaño
+        dbc.Row([
+            dbc.Col([
+                # RangeSlider para el tamaño del apartamento
+                dcc.RangeSlider(
+                    id="square-feet-range",
+                    min=tamano_min,
+                    max=tamano_max,
+                    step=paso_tamano,
+                    value=[tamano_min, tamano_max],
+                    marks={i: str(i) for i in range(tamano_min, tamano_max + 1, 500)},
+                    tooltip={"placement": "bottom", "always_visible": True}
+                ),
+                # Título debajo del slider
                 html.Div(
-                    "Puede acercar o alejar el mapa para ver la distribución de precios en diferentes regiones.",
+                    "Seleccione el rango del tamaño del apartamento (sq ft)",
                     style={
-                        "text-align": "left",
-                        "font-size": "12px", 
-                        "color": "#666",  
-                        "margin-top": "2px" 
-                    })
-            ]
-        ))
-    ], style={"margin-top": "50px"}),
-
-    # Filtros Globales
-    dbc.Row(
-        [
+                        "text-align": "center",  # Centrar el texto
+                        "margin-top": "10px",  # Espacio entre el slider y el título
+                        "font-size": "14px",  # Tamaño de la fuente
+                        "color": "#333",  # Color del texto
+                    }
+                )
+            ]),
+            html.Div(
+                "Puede modificar los valores en los filtros para observar el comportamiento de los indicadores abajo.",
+                style={
+                    "text-align": "left",
+                    "font-size": "12px", 
+                    "color": "#666",  
+                    "margin-top": "2px" 
+                })
+        ], style={"margin-top": "20px"}),
+
+        # KPIs
+        # Fila para los KPIs
+        dbc.Row([
+            # KPI 1: Total de ciudades
             dbc.Col(
-                [
-            # Dropdown para seleccionar el estado
-            dbc.Row(
-                
                 dbc.Card(
                     dbc.CardBody([
-                        dbc.Label("Seleccione un estado", className="font-weight-bold"),
-                        dcc.Dropdown(
-                            id="state-dropdown",
-                            placeholder="Seleccione un estado",
-                            options=[{"label": estado.replace("state_", ""), "value": estado} for estado in estados],
-                            className="mb-3"  # Margen inferior
-                        )
+                        html.H4("Total de Ciudades", className="card-title"),
+                        html.P("Cargando...", id="total-cities-kpi", className="card-text"),
                     ]),
                     style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
                 ),
+                width=3
             ),
-            # Input para el número de baños
-            dbc.Row(
+            # KPI 2: Total de apartamentos
+            dbc.Col(
                 dbc.Card(
                     dbc.CardBody([
-                        dbc.Label("Número de baños", className="font-weight-bold"),
-                        dbc.Input(
-                            id="bathrooms-input",
-                            type="number",
-                            placeholder="Ej: 2",
-                            min=1,
-                            max=10,
-                            className="mb-3"  # Margen inferior
-                        )
+                        html.H4("Total de Apartamentos", className="card-title"),
+                        html.P("Cargando...", id="total-apartments-kpi", className="card-text"),
                     ]),
                     style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
                 ),
-            )
-                ], width=4
+                width=3
             ),
-            # Checklist para las amenities
+            # KPI 3: Precio promedio
             dbc.Col(
                 dbc.Card(
                     dbc.CardBody([
-                        dbc.Label("Seleccione los Amenities", className="font-weight-bold"),
-                        dbc.Checklist(
-                            id="amenities-checklist",
-                            options=[{"label": amenity, "value": amenity} for amenity in amenities],
-                            inline=True,
-                            switch=True,
-                            className="mb-10"
-                        )
+                        html.H4("Precio Promedio", className="card-title"),
+                        html.P("Cargando...", id="avg-price-kpi", className="card-text"),
                     ]),
                     style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
                 ),
-                width=6
-            ),
-        ],
-        # Centrar horizontal y verticalmente
-        justify="center",  # Centrar horizontalmente
-        align="center",    # Centrar verticalmente
-        className="h-100",  # Asegura que la fila ocupe toda la altura disponible
-        style={"margin-top": "50px"}
-    ),
-    
-    # Slider tamaño
-    dbc.Row([
-        dbc.Col([
-            # RangeSlider para el tamaño del apartamento
-            dcc.RangeSlider(
-                id="square-feet-range",
-                min=datos["square_feet"].min(),
-                max=datos["square_feet"].max(),
-                step=100,
-                value=[datos["square_feet"].min(), datos["square_feet"].max()],
-                marks={i: str(i) for i in range(datos["square_feet"].min(), datos["square_feet"].max() + 1, 500)},
-                tooltip={"placement": "bottom", "always_visible": True}
-            ),
-            # Título debajo del slider
-            html.Div(
-                "Seleccione el rango del tamaño del apartamento (sq ft)",
-                style={
-                    "text-align": "center",  # Centrar el texto
-                    "margin-top": "10px",  # Espacio entre el slider y el título
-                    "font-size": "14px",  # Tamaño de la fuente
-                    "color": "#333",  # Color del texto
-                }
-            )
-        ]),
-        html.Div(
-            "Puede modificar los valores en los filtros para observar el comportamiento de los indicadores abajo.",
-            style={
-                "text-align": "left",
-                "font-size": "12px", 
-                "color": "#666",  
-                "margin-top": "2px" 
-            })
-    ], style={"margin-top": "20px"}),
-
-    # KPIs
-    # Fila para los KPIs
-    dbc.Row([
-        # KPI 1: Total de ciudades
-        dbc.Col(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H4("Total de Ciudades", className="card-title"),
-                    html.P("Cargando...", id="total-cities-kpi", className="card-text"),
-                ]),
-                style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
-            ),
-            width=3
-        ),
-        # KPI 2: Total de apartamentos
-        dbc.Col(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H4("Total de Apartamentos", className="card-title"),
-                    html.P("Cargando...", id="total-apartments-kpi", className="card-text"),
-                ]),
-                style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
-            ),
-            width=3
-        ),
-        # KPI 3: Precio promedio
-        dbc.Col(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H4("Precio Promedio", className="card-title"),
-                    html.P("Cargando...", id="avg-price-kpi", className="card-text"),
-                ]),
-                style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
+                width=3
             ),
-            width=3
-        ),
-        # KPI 4: Longitud promedio de la descripción
-        dbc.Col(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H4("Longitud Descripción", className="card-title"),
-                    html.P("Cargando...", id="avg-description-length-kpi", className="card-text"),
-                ]),
-                style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
+            # KPI 4: Longitud promedio de la descripción
+            dbc.Col(
+                dbc.Card(
+                    dbc.CardBody([
+                        html.H4("Longitud Descripción", className="card-title"),
+                        html.P("Cargando...", id="avg-description-length-kpi", className="card-text"),
+                    ]),
+                    style={"border": "1px solid #ddd", "border-radius": "10px", "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"}
+                ),
+                width=3
             ),
-            width=3
-        ),
-    ], style={"margin-top": "50px"}),
-
-    # Gráficos Descriptivos
-    dbc.Row([
-        dbc.Col(dcc.Graph(id="pie-plot"), width=6),
-        dbc.Col([dcc.Graph(id="boxplot"),
-                dcc.RadioItems(
-                    id="boxplot-category",
-                    options=[
-                        {"label": "Tiene fotos", "value": "photos"},
-                        {"label": "Permite mascotas", "value": "pets"}
-                    ],
-                    value="photos",
-                    style={"text-align": "center"},
-                    inline=True
+        ], style={"margin-top": "50px"}),
+
+        # Gráficos Descriptivos
+        dbc.Row([
+            dbc.Col(dcc.Graph(id="pie-plot"), width=6),
+            dbc.Col([dcc.Graph(id="boxplot"),
+                    dcc.RadioItems(
+                        id="boxplot-category",
+                        options=[
+                            {"label": "Tiene fotos", "value": "photos"},
+                            {"label": "Permite mascotas", "value": "pets"}
+                        ],
+                        value="photos",
+                        style={"text-align": "center"},
+                        inline=True
             
-                    ),
-                html.Div(
-                "Seleccione si desea observar la distribución de los precios por presencia de fotos o permisos de mascotas.",
+                        ),
+                    html.Div(
+                    "Seleccione si desea observar la distribución de los precios por presencia de fotos o permisos de mascotas.",
+                    style={
+                        "text-align": "left",
+                        "font-size": "12px", 
+                        "color": "#666",  
+                        "margin-top": "2px" 
+                        }
+                )],
+                width=6),
+        ]),
+        dbc.Row([
+            dbc.Col(dcc.Graph(id="amenities-heatmap")),
+            html.Div(
+                "Una correlación cercana a -1 indica una relación inversa fuerte, cercana a 1 indica una relación directa fuerte, y cercana a 0 indica que no hay relación lineal entre la variable y el precio.",
                 style={
                     "text-align": "left",
                     "font-size": "12px", 
                     "color": "#666",  
                     "margin-top": "2px" 
-                    }
-            )],
-            width=6),
-    ]),
-    dbc.Row([
-        dbc.Col(dcc.Graph(id="amenities-heatmap")),
-        html.Div(
-            "Una correlación cercana a -1 indica una relación inversa fuerte, cercana a 1 indica una relación directa fuerte, y cercana a 0 indica que no hay relación lineal entre la variable y el precio.",
-            style={
-                "text-align": "left",
-                "font-size": "12px", 
-                "color": "#666",  
-                "margin-top": "2px" 
-            })
-    ], style={"margin-top": "20px"}),
-
-    # Simulador de Precios
-    dbc.Row([
-        dbc.Col(
-            dbc.Card(
-                dbc.CardBody([
-                    html.H3("Simulador de Precios", className="text-center mb-4", style={"background-color":"#f0f0f0"}),  # Título centrado
+                })
+        ], style={"margin-top": "20px"}),
+
+        # Simulador de Precios
+        dbc.Row([
+            dbc.Col(
+                dbc.Card(
+                    dbc.CardBody([
+                        html.H3("Simulador de Precios", className="text-center mb-4", style={"background-color":"#f0f0f0"}),  # Título centrado
                     
-                    # Input para el número de baños
-                    dbc.Label("Número de baños", className="font-weight-bold"),
-                    dbc.Input(
-                        id="sim-bathrooms",
-                        type="number",
-                        placeholder="Ej: 2",
-                        min=1,
-                        max=10,
-                        className="mb-3"
-                    ),
+                        # Input para el número de baños
+                        dbc.Label("Número de baños", className="font-weight-bold"),
+                        dbc.Input(
+                            id="sim-bathrooms",
+                            type="number",
+                            placeholder="Ej: 2",
+                            min=1,
+                            max=10,
+                            className="mb-3"
+                        ),
                     
-                    # Input para el tamaño (sq ft)
-                    dbc.Label("Tamaño (sq ft)", className="font-weight-bold"),
-                    dbc.Input(
-                        id="sim-square-feet",
-                        type="number",
-                        placeholder="Ej: 1000",
-                        className="mb-3"
-                    ),
+                        # Input para el tamaño (sq ft)
+                        dbc.Label("Tamaño (sq ft)", className="font-weight-bold"),
+                        dbc.Input(
+                            id="sim-square-feet",
+                            type="number",
+                            placeholder="Ej: 1000",
+                            className="mb-3"
+                        ),
                     
-                    # Dropdown para la ciudad
-                    dbc.Label("Ciudad", className="font-weight-bold"),
-                    dcc.Dropdown(
-                        id="sim-city",
-                        placeholder="Seleccione una ciudad",
-                        options=[{"label": city.replace("cityname_", ""), "value": city} for city in ciudades],
-                        className="mb-3"
-                    ),
+                        # Dropdown para la ciudad
+                        dbc.Label("Ciudad", className="font-weight-bold"),
+                        dcc.Dropdown(
+                            id="sim-city",
+                            placeholder="Seleccione una ciudad",
+                            options=[{"label": city.replace("cityname_", ""), "value": city} for city in ciudades],
+                            className="mb-3"
+                        ),
                     
-                    # Checklist para las amenities
-                    dbc.Label("Amenities", className="font-weight-bold"),
-                    dbc.Checklist(
-                        id="sim-amenities",
-                        options=[{"label": amenity, "value": amenity} for amenity in amenities],
-                        inline=True,
-                        switch=True,  # Hace que los checkboxes se vean como interruptores
-                        className="mb-3"
-                    ),
+                        # Checklist para las amenities
+                        dbc.Label("Amenities", className="font-weight-bold"),
+                        dbc.Checklist(
+                            id="sim-amenities",
+                            options=[{"label": amenity, "value": amenity} for amenity in amenities],
+                            inline=True,
+                            switch=True,  # Hace que los checkboxes se vean como interruptores
+                            className="mb-3"
+                        ),
                     
-                    # Resultado del simulador
-                    html.H4(id="sim-output", className="text-center mt-4", 
-                            style={
-                            "font-weight": "bold",  
-                            "padding": "10px",
-                            "background-color": "#e9fff8",
-                            "border-radius": "5px",
-                            "border": "1px solid #ddd"
-                        }), 
-                ]),
-                style={
-                    "border": "1px solid #ddd",
-                    "border-radius": "10px",
-                    "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)",
-                    "padding": "20px"
-                }
-            ),
-            width=6
-        )
-    ], justify="center", className="mt-4")
-])
+                        # Coeficientes del modelo y estado de cada ciudad para el simulador en el navegador
+                        dcc.Store(id="sim-modelo", data=simulator_payload(modelo_precios, estado_por_ciudad)
+                                  if simulador_en_cliente else None),
+
+                        # Resultado del simulador
+                        html.H4(id="sim-output", className="text-center mt-4", 
+                                style={
+                                "font-weight": "bold",  
+                                "padding": "10px",
+                                "background-color": "#e9fff8",
+                                "border-radius": "5px",
+                                "border": "1px solid #ddd"
+                            }), 
+                    ]),
+                    style={
+                        "border": "1px solid #ddd",
+                        "border-radius": "10px",
+                        "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)",
+                        "padding": "20px"
+                    }
+                ),
+                width=6
+            )
+        ], justify="center", className="mt-4")
+    ])
+
+
+
+app.layout = serve_layout
 
 # Callbacks
 @app.callback(
     [Output("total-cities-kpi", "children"),
      Output("total-apartments-kpi", "children"),
      Output("avg-price-kpi", "children"),
-     Output("avg-description-length-kpi", "children")],
+     Output("avg-description-length-kpi", "children"),
+     Output("pie-plot", "figure"),
+     Output("boxplot", "figure"),
+     Output("amenities-heatmap", "figure")],
     [Input("state-dropdown", "value"),
      Input("bathrooms-input", "value"),
      Input("square-feet-range", "value"),
-     Input("amenities-checklist", "value")]
+     Input("amenities-checklist", "value"),
+     Input("boxplot-category", "value")]
+    # Con el mapa interactivo, la vista del mapa puede limitar la selección
+    + ([Input("region-mapa", "value"), Input("mapa-precios", "relayoutData")] if mapa_interactivo else [])
 )
-def update_kpis(state, bathrooms, square_feet_range, amenities):
-    filtered_data = datos.copy()
-    if state:
-        filtered_data = filtered_data[filtered_data[state] == 1]
-    if bathrooms:
-        filtered_data = filtered_data[filtered_data["bathrooms"] == bathrooms]
-    if square_feet_range:
-        filtered_data = filtered_data[(filtered_data["square_feet"] >= square_feet_range[0]) & (filtered_data["square_feet"] <= square_feet_range[1])]
-    if amenities:
-        for amenity in amenities:
-            filtered_data = filtered_data[filtered_data[amenity] == 1]
-
-    total_cities = filtered_data[[col for col in ciudades]].sum().sum()
-    total_apartments = len(filtered_data)
-    avg_price = filtered_data["price"].mean()
-    avg_description_length = filtered_data["longitud_descripcion"].mean()
-
-    return (f"Ciudades: {total_cities}", f"Apartamentos: {total_apartments}", f"Precio Promedio: ${avg_price:.2f}", f"Longitud Descripción: {avg_description_length:.2f}")
+def update_dashboard(state, bathrooms, square_feet_range, amenities, category, limitar_region=None, relayout=None):
+    # Toda la solicitud usa la misma versión aunque se publique otra mientras tanto
+    version = registro.current
 
-@app.callback(
-    Output("pie-plot", "figure"),
-    [Input("state-dropdown", "value"),
-     Input("bathrooms-input", "value"),
-     Input("square-feet-range", "value"),
-     Input("amenities-checklist", "value")]
-)
-def update_pieplot(state, bathrooms, square_feet_range, amenities):
-    # Filtrar los datos según los filtros
-    filtered_data = datos.copy()
-    
-    if state:
-        filtered_data = filtered_data[filtered_data[state] == 1]
-    if bathrooms:
-        filtered_data = filtered_data[filtered_data["bathrooms"] == bathrooms]
-    if square_feet_range:
-        filtered_data = filtered_data[
-            (filtered_data["square_feet"] >= square_feet_range[0]) & 
-            (filtered_data["square_feet"] <= square_feet_range[1])
-        ]
-    if amenities:
-        for amenity in amenities:
-            filtered_data = filtered_data[filtered_data[amenity] == 1]
-    
-    # Contar el número de dormitorios
-    bedroom_counts = filtered_data["bedrooms"].value_counts().reset_index()
-    bedroom_counts.columns = ["bedrooms", "count"]
-    
+    # Ajustar el rango a la grilla del slider
+    square_feet_range = snap_range(square_feet_range, version["tamano_min"], version["tamano_max"], paso_tamano)
+    region = bbox_region(*vista_mapa(relayout, version["centro_mapa"])[0]) if limitar_region else None
+
+    # La ingesta de deltas no modifica los datos mientras se calcula una selección
+    with version["ingesta"].lock.read():
+        llave = filter_signature(state, bathrooms, square_feet_range, amenities, category, version["datos"].version,
+                                 region)
+        salida = cache_resultados.get(llave)
+        if salida is not None:
+            return salida
+
+        # Filtrar una sola vez y calcular todos los agregados a partir de la misma selección
+        resultado = version["agregador"].aggregate(state, bathrooms, square_feet_range, amenities, category, region)
+
+    kpis = (
+        f"Ciudades: {resultado['total_cities']}",
+        f"Apartamentos: {resultado['total_apartments']}",
+        f"Precio Promedio: ${resultado['avg_price']:.2f}",
+        f"Longitud Descripción: {resultado['avg_description_length']:.2f}",
+    )
+    figuras_json = [
+        build_pieplot(resultado["bedroom_counts"]).to_json(),
+        build_boxplot(resultado["box_stats"], category).to_json(),
+        build_amenities_heatmap(resultado["correlations"]).to_json(),
+    ]
+
+    salida = kpis + tuple(json.loads(figura) for figura in figuras_json)
+    cache_resultados.put(llave, salida, sum(len(texto) for texto in kpis + tuple(figuras_json)))
+    return salida
+
+def vista_mapa(relayout, centro):
+    """Límites (oeste, sur, este, norte) y zoom de la vista del mapa según su último ``relayoutData``."""
+    relayout = relayout or {}
+    zoom = relayout.get("map.zoom", ZOOM_INICIAL_MAPA)
+    esquinas = (relayout.get("map._derived") or {}).get("coordinates")
+    if esquinas:
+        longitudes, latitudes = zip(*esquinas)
+        return (min(longitudes), min(latitudes), max(longitudes), max(latitudes)), zoom
+
+    # Sin límites informados se estima la vista desde el centro (el mapa usa teselas de 512 px)
+    centro = relayout.get("map.center", {"lat": centro[0], "lon": centro[1]})
+    ancho, alto = (lado / (512 * 2 ** zoom) for lado in VISTA_MAPA_PX)
+    x, y = mercator(centro["lat"], centro["lon"])
+    (norte, sur), (oeste, este) = inverse_mercator([x - ancho / 2, x + ancho / 2], [y - alto / 2, y + alto / 2])
+    return (oeste, sur, este, norte), zoom
+
+
+def update_map(state, bathrooms, square_feet_range, amenities, relayout):
+    version = registro.current
+    square_feet_range = snap_range(square_feet_range, version["tamano_min"], version["tamano_max"], paso_tamano)
+    # El rango completo del slider no filtra: así el mapa sin filtros sale de la pirámide precalculada
+    if square_feet_range == [version["tamano_min"], version["tamano_max"]]:
+        square_feet_range = None
+
+    teselas = version["teselas"]
+    limites, zoom = vista_mapa(relayout, version["centro_mapa"])
+    # Cada celda de una tesela de nivel z ocupa 16 px a zoom z (32 celdas por lado y teselas de 512 px)
+    nivel = int(min(max(np.floor(zoom), 0), teselas.max_zoom))
+    with version["ingesta"].lock.read():
+        celdas = [json.loads(tile_payload(teselas, nivel, x, y, state, bathrooms, square_feet_range, amenities,
+                                          cache_teselas))
+                  for x, y in tiles_for_viewport(*limites, nivel)]
+    return build_price_map(celdas, version["centro_mapa"])
+
+
+def build_price_map(celdas, centro):
+    # Peso de cada celda: suma de precios de sus anuncios, como los pesos del HeatMap del cuaderno
+    lat = [valor for celda in celdas for valor in celda["lat"]]
+    lon = [valor for celda in celdas for valor in celda["lon"]]
+    cantidad = np.array([valor for celda in celdas for valor in celda["count"]])
+    precio = np.array([valor for celda in celdas for valor in celda["price"]])
+    fig = go.Figure(go.Densitymap(
+        lat=lat,
+        lon=lon,
+        z=cantidad * precio,
+        customdata=np.column_stack([cantidad, precio]) if len(cantidad) else None,
+        hovertemplate="Anuncios: %{customdata[0]}<br>Precio promedio: $%{customdata[1]:.2f}<extra></extra>",
+        radius=16,
+        colorscale=[[0, "blue"], [0.33, "green"], [0.66, "yellow"], [1, "red"]],  # Mismo degradado de la leyenda
+        showscale=False,
+    ))
+    fig.update_layout(
+        map=dict(style="open-street-map", center=dict(lat=centro[0], lon=centro[1]), zoom=ZOOM_INICIAL_MAPA),
+        margin=dict(l=0, r=0, t=0, b=0),
+        uirevision="mapa",  # Conserva el encuadre del usuario al cambiar los filtros
+    )
+    return fig
+
+
+if mapa_interactivo:
+    app.callback(
+        Output("mapa-precios", "figure"),
+        [Input("state-dropdown", "value"),
+         Input("bathrooms-input", "value"),
+         Input("square-feet-range", "value"),
+         Input("amenities-checklist", "value"),
+         Input("mapa-precios", "relayoutData")]
+    )(update_map)
+
+
+def build_pieplot(bedroom_counts):
     # Filtrar porcentajes muy pequeños (menos del 2%)
     total_count = bedroom_counts["count"].sum()
     bedroom_counts = bedroom_counts[bedroom_counts["count"] / total_count >= 0.02]  # Mantener solo valores >= 2%
@@ -444,76 +699,49 @@ def update_pieplot(state, bathrooms, square_feet_range, amenities):
     
     return fig
 
-@app.callback(
-    Output("boxplot", "figure"),
-    [Input("state-dropdown", "value"),
-     Input("bathrooms-input", "value"),
-     Input("square-feet-range", "value"),
-     Input("amenities-checklist", "value"),
-     Input("boxplot-category", "value")]
-)
-def update_boxplot(state, bathrooms, square_feet_range, amenities, category):
-    filtered_data = datos.copy()
-
-    if state:
-        filtered_data = filtered_data[filtered_data[state] == 1]
-    if bathrooms:
-        filtered_data = filtered_data[filtered_data["bathrooms"] == bathrooms]
-    if square_feet_range:
-        filtered_data = filtered_data[
-            (filtered_data["square_feet"] >= square_feet_range[0]) & 
-            (filtered_data["square_feet"] <= square_feet_range[1])
-        ]
-    if amenities:
-        for amenity in amenities:
-            filtered_data = filtered_data[filtered_data[amenity] == 1]
-
+def build_boxplot(box_stats, category):
     # Definir la categoría seleccionada
     if category == "photos":
-        # Identificar qué columna de fotos tiene un valor de 1 y asignarla a una nueva columna
-        photo_columns = ["has_photo_No", "has_photo_Thumbnail", "has_photo_Yes"]
-        filtered_data["photo_category"] = filtered_data[photo_columns].idxmax(axis=1)
-        
-        # Traducir las categorías al español
-        filtered_data["photo_category"] = filtered_data["photo_category"].replace({
-            "has_photo_No": "Sin Foto",
-            "has_photo_Thumbnail": "Miniatura",
-            "has_photo_Yes": "Con Foto"
-        })
-        
-        x_axis = "photo_category"
         title = "Distribución de Precios por Presencia de Fotos"
     
     elif category == "pets":
-        # Identificar qué columna de mascotas tiene un valor de 1 y asignarla a una nueva columna
-        pet_columns = ["pets_allowed_Cats", "pets_allowed_Cats,Dogs", "pets_allowed_Dogs", "pets_allowed_No permitido"]
-        filtered_data["pet_category"] = filtered_data[pet_columns].idxmax(axis=1)
-        
-        # Traducir las categorías al español
-        filtered_data["pet_category"] = filtered_data["pet_category"].replace({
-            "pets_allowed_Cats": "Gatos",
-            "pets_allowed_Cats,Dogs": "Gatos y Perros",
-            "pets_allowed_Dogs": "Perros",
-            "pets_allowed_No permitido": "No Permitidas"
-        })
-        
-        x_axis = "pet_category"
         title = "Distribución de Precios por Política de Mascotas"
     
     else:
         return px.box(title="Categoría no disponible en los datos")
 
-    # Crear el boxplot con la categoría seleccionada
-    fig = px.box(
-        filtered_data,
-        x=x_axis,
-        y="price",
-        points="all",
-        title=title,
-        labels={x_axis: "Categoría", "price": "Precio (USD)"}
-    )
+    # Crear el boxplot con los estadísticos calculados en el servidor
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=[caja["category"] for caja in box_stats],
+        q1=[caja["q1"] for caja in box_stats],
+        median=[caja["median"] for caja in box_stats],
+        q3=[caja["q3"] for caja in box_stats],
+        lowerfence=[caja["lowerfence"] for caja in box_stats],
+        upperfence=[caja["upperfence"] for caja in box_stats],
+        name="price",
+        showlegend=False
+    ))
+    
+    # Puntos: todos los atípicos y una muestra acotada de los demás por categoría
+    puntos = [(caja["category"], np.concatenate([caja["outliers"], caja["sample"]])) for caja in box_stats]
+    fig.add_trace(go.Box(
+        x=[categoria for categoria, valores in puntos for _ in valores],
+        y=np.concatenate([valores for _, valores in puntos]) if puntos else [],
+        boxpoints="all",
+        jitter=0.5,
+        pointpos=0,
+        fillcolor="rgba(0, 0, 0, 0)",
+        line=dict(color="rgba(0, 0, 0, 0)"),
+        marker=dict(color="#636efa", size=4),
+        hoveron="points",
+        name="price",
+        showlegend=False
+    ))
     
     fig.update_layout(
+        title_text=title,
+        boxmode="overlay",
         title_x=0.5,  # Centrar el título
         title_font_size=20,  # Tamaño del título
         xaxis_title_font_size=16,  # Tamaño del título del eje x
@@ -525,56 +753,21 @@ def update_boxplot(state, bathrooms, square_feet_range, amenities, category):
     )
 
     fig.update_xaxes(
+        title_text="Categoría",
         tickfont=dict(size=14),  # Tamaño de las etiquetas del eje x
-        categoryorder="total ascending"  # Ordenar categorías por precio ascendente
+        categoryorder="array",  # Ordenar categorías por precio ascendente
+        categoryarray=[caja["category"] for caja in sorted(box_stats, key=lambda caja: caja["total"])]
     )
     
     fig.update_yaxes(
+        title_text="Precio (USD)",
         tickfont=dict(size=14)  # Tamaño de las etiquetas del eje y
     )
 
     return fig
 
 
-@app.callback(
-    Output("amenities-heatmap", "figure"),
-    [Input("state-dropdown", "value"),
-     Input("bathrooms-input", "value"),
-     Input("square-feet-range", "value"),
-     Input("amenities-checklist", "value")]
-)
-def update_amenities_heatmap(state, bathrooms, square_feet_range, amenities):
-    filtered_data = datos.copy()
-    
-    # Filtrar por estado
-    if state:
-        filtered_data = filtered_data[filtered_data[state] == 1]
-    
-    # Filtrar por número de baños
-    if bathrooms:
-        filtered_data = filtered_data[filtered_data["bathrooms"] == bathrooms]
-    
-    # Filtrar por rango de tamaño
-    if square_feet_range:
-        filtered_data = filtered_data[
-            (filtered_data["square_feet"] >= square_feet_range[0]) & 
-            (filtered_data["square_feet"] <= square_feet_range[1])
-        ]
-    
-    # Si no se selecciona ninguna amenidad, usar todas
-    if amenities is None or len(amenities) == 0:
-        amenities = [col for col in datos.columns if col.startswith("has_") or col in ["TV", "Dishwasher", "Wood Floors", "Elevator", "Clubhouse", "Doorman", "Parking", "Patio/Deck", "Luxury", "Storage", "View", "Refrigerator", "Playground", "Internet Access", "Tennis", "Gated", "Basketball", "Golf", "Garbage Disposal", "AC", "Gym", "Washer Dryer", "Pool", "Alarm", "Hot Tub", "Fireplace", "Cable or Satellite"]]
-    
-    # Seleccionar solo las columnas de amenities y el precio
-    columns_to_include = amenities + ["price"]
-    filtered_data = filtered_data[columns_to_include]
-    
-    # Calcular la correlación entre amenities y precio
-    correlation = filtered_data.corr()
-    
-    # Filtrar la correlación para mostrar solo la fila del precio
-    correlation_with_price = correlation[["price"]].drop("price")
-    
+def build_amenities_heatmap(correlation_with_price):
     # Crear el gráfico de calor
     fig = px.imshow(
         correlation_with_price.T,  # Transponer para que las amenities estén en el eje x
@@ -602,40 +795,37 @@ def update_amenities_heatmap(state, bathrooms, square_feet_range, amenities):
     return fig
 
 
-@app.callback(
-    Output("sim-output", "children"),
-    [Input("sim-bathrooms", "value"),
-     Input("sim-square-feet", "value"),
-     Input("sim-city", "value"),
-     Input("sim-amenities", "value")]
-)
 def update_simulator(bathrooms, square_feet, city, amenities):
     if not all([bathrooms, square_feet, city]):
         return "Ingrese todos los valores para obtener una estimación."
-    df_ciudades = coeficientes[coeficientes["Variables"].str.startswith("cityname_")]
-    price = (bathrooms * 297) + (square_feet * 0.63)
-    
-    for index, row in df_ciudades.iterrows():
-        if city == row["Variables"]:
-            price += row["Coeficientes"]
-    if amenities:
-        if "Elevator" in amenities:
-            price += 251.1930144710353
-        if "Parking" in amenities:
-            price += 160.13931935370934
-        if "Clubhouse" in amenities:
-            price += 50.78495715235734
-        if "Playground" in amenities:
-            price -= 87.51470430284112
-        if "Internet Access" in amenities:
-            price += 86.6327185048433
-        if "Garbage Disposal" in amenities:
-            price -= 91.06921202021972
-        if "Pool" in amenities:
-            price += 87.19850857859029
+    # El estado de la ciudad también tiene coeficiente en el modelo
+    version = registro.current
+    modelo_precios, estado_por_ciudad = version["modelo_precios"], version["estado_por_ciudad"]
+    price = modelo_precios.score(bathrooms, square_feet, city=city, state=estado_por_ciudad.get(city),
+                                 amenities=amenities)
 
     return f"Precio Estimado: ${price:.2f}"
 
+
+if simulador_en_cliente:
+    app.clientside_callback(
+        dash.ClientsideFunction(namespace="simulador", function_name="estimar"),
+        Output("sim-output", "children"),
+        [Input("sim-bathrooms", "value"),
+         Input("sim-square-feet", "value"),
+         Input("sim-city", "value"),
+         Input("sim-amenities", "value")],
+        State("sim-modelo", "data"),
+    )
+else:
+    app.callback(
+        Output("sim-output", "children"),
+        [Input("sim-bathrooms", "value"),
+         Input("sim-square-feet", "value"),
+         Input("sim-city", "value"),
+         Input("sim-amenities", "value")]
+    )(update_simulator)
+
 # Ejecutar la aplicación
 if __name__ == "__main__":
     app.run_server(debug=True, host='0.0.0.0', port = 8050)
\ No newline at end of file
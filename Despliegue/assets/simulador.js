@@ -0,0 +1,29 @@
+// Simulador de precios evaluado en el navegador.
+//
+// Replica PriceModel.score de modelo.py con los coeficientes que el servidor
+// embebe una sola vez en el Store "sim-modelo": suma los coeficientes en el
+// mismo orden (baños, tamaño, ciudad, estado, amenities) para obtener el mismo
+// resultado que el callback del servidor.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    simulador: {
+        estimar: function (bathrooms, squareFeet, city, amenities, modelo) {
+            if (!bathrooms || !squareFeet || !city) {
+                return "Ingrese todos los valores para obtener una estimación.";
+            }
+            var coef = modelo.coeficientes;
+            var coefficient = function (name) {
+                return Object.prototype.hasOwnProperty.call(coef, name) ? coef[name] : 0;
+            };
+
+            var price = coefficient("bathrooms") * bathrooms + coefficient("square_feet") * squareFeet;
+            // El estado de la ciudad también tiene coeficiente en el modelo
+            var names = [city, modelo.estados[city]].concat(amenities || []);
+            for (var i = 0; i < names.length; i++) {
+                if (names[i]) {
+                    price += coefficient(names[i]);
+                }
+            }
+            return "Precio Estimado: $" + price.toFixed(2);
+        }
+    }
+});
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from datos_compactos import CompactDataset
+from filtros import FilterEngine
+
+# Directorio donde se guardan las versiones binarias de los CSV
+CACHE_DIR = ".cache_datos"
+
+
+def file_hash(path, cache_dir=CACHE_DIR):
+    """SHA-256 del contenido de ``path``.
+
+    El hash se recuerda junto con el tamaño y la fecha de modificación del
+    archivo, de modo que solo se vuelve a leer el CSV completo cuando cambia.
+    """
+    index_path = os.path.join(cache_dir, "hashes.json")
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    entry = index.get(key)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+    index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_json_atomic(index_path, index)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, content):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def _cache_path(path, sha, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{sha[:16]}")
+
+
+def _prune(target):
+    # Borra las versiones anteriores de la misma caché (mismo prefijo, otro hash). Los directorios
+    # temporales de otros procesos no coinciden con el patrón; un proceso que aún tenga abiertos
+    # mapas de memoria de una versión borrada los sigue leyendo hasta cerrarlos
+    cache_dir, name = os.path.split(target)
+    pattern = re.compile(re.escape(name.rsplit("-", 1)[0]) + r"-[0-9a-f]{16}")
+    for entry in os.listdir(cache_dir):
+        if entry != name and pattern.fullmatch(entry):
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+
+
+def _build(target, writer):
+    # Se escribe en un directorio temporal y se renombra al final para que otro
+    # proceso nunca lea una caché a medio construir
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(target), prefix=".tmp-")
+    try:
+        writer(tmp_dir)
+        os.rename(tmp_dir, target)
+    except OSError:
+        # Otro proceso terminó primero la misma versión
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    else:
+        _prune(target)
+
+
+def load_dataset(path, amenities, mmap=False, cache_dir=CACHE_DIR):
+    """Carga ``datosPreparados.csv`` desde su caché binaria columnar.
+
+    La caché se identifica por el hash del contenido del CSV; si el archivo
+    cambia se reconstruye automáticamente en el siguiente arranque y se
+    borran las cachés de versiones anteriores del mismo archivo. Con
+    ``mmap=True`` las columnas se abren como mapas de memoria de solo lectura.
+    """
+    sha = file_hash(path, cache_dir)
+    target = _cache_path(path, sha, cache_dir)
+    if not os.path.isdir(target):
+        def writer(directory):
+            datos = CompactDataset.from_csv(path, amenities)
+            datos.version = sha
+            datos.save(directory)
+        _build(target, writer)
+    return CompactDataset.load(target, mmap_mode="r" if mmap else None)
+
+
+def load_filter_engine(datos, estados, amenities, mmap=False, cache_dir=CACHE_DIR):
+    """Carga (o construye y guarda) los índices de filtrado de la versión de ``datos``."""
+    if datos.version is None:
+        return FilterEngine(datos, estados, amenities)
+
+    columns = json.dumps([list(estados), list(amenities)], ensure_ascii=False)
+    key = hashlib.sha256((datos.version + columns).encode("utf-8")).hexdigest()
+    target = os.path.join(cache_dir, f"filtros-{key[:16]}")
+    if not os.path.isdir(target):
+        _build(target, FilterEngine(datos, estados, amenities).save)
+    return FilterEngine.load(target, datos, mmap_mode="r" if mmap else None)
+
+
+def load_coefficients(path, cache_dir=CACHE_DIR):
+    """Carga ``modeloFinal.csv`` (columnas ``Variables`` y ``Coeficientes``) desde su caché binaria."""
+    sha = file_hash(path, cache_dir)
+    target = _cache_path(path, sha, cache_dir)
+    if not os.path.isdir(target):
+        def writer(directory):
+            coeficientes = pd.read_csv(path)
+            np.save(os.path.join(directory, "variables.npy"), coeficientes["Variables"].to_numpy(dtype=str))
+            np.save(os.path.join(directory, "coeficientes.npy"), coeficientes["Coeficientes"].to_numpy(dtype=np.float64))
+        _build(target, writer)
+    return pd.DataFrame({
+        "Variables": np.load(os.path.join(target, "variables.npy")),
+        "Coeficientes": np.load(os.path.join(target, "coeficientes.npy")),
+    })
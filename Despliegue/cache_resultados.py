@@ -0,0 +1,97 @@
+import math
+import threading
+from collections import OrderedDict
+
+
+def snap_range(square_feet_range, slider_min, slider_max, step=100):
+    """Ajusta el rango del slider a su grilla (``slider_min + k * step``).
+
+    El extremo superior puede ser ``slider_max`` aunque no caiga en la grilla,
+    igual que el valor inicial del ``RangeSlider``: se ajusta hacia arriba y
+    se limita a ``slider_max``, así que el rango completo no pierde filas.
+    """
+    if not square_feet_range:
+        return square_feet_range
+
+    def snap(value, rounding):
+        snapped = slider_min + rounding((value - slider_min) / step) * step
+        return int(min(max(snapped, slider_min), slider_max))
+
+    return [snap(square_feet_range[0], round), snap(square_feet_range[1], math.ceil)]
+
+
+def filter_signature(state, bathrooms, square_feet_range, amenities, category, version, region=None):
+    """Firma canónica de una selección de filtros para usar como llave de caché.
+
+    ``square_feet_range`` debe venir ya ajustado con :func:`snap_range` y
+    ``region`` con las funciones de ``espacial.py``.
+    """
+    return (
+        version,
+        state or None,
+        float(bathrooms) if bathrooms else None,
+        tuple(square_feet_range) if square_feet_range else None,
+        tuple(sorted(amenities)) if amenities else (),
+        category,
+        region,
+    )
+
+
+class ResultCache:
+    """Caché LRU acotada por número de entradas y por tamaño total en bytes.
+
+    Guarda los resultados ya agregados (textos de los KPIs y figuras) de los
+    callbacks que dependen de los filtros, y lleva contadores de aciertos,
+    fallos y desalojos. Es segura para usarse desde varios hilos del servidor.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Devuelve el valor guardado para ``key`` o ``None`` si no está."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """Guarda ``value`` (que ocupa ``size`` bytes) y desaloja las entradas menos recientes."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
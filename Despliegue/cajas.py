@@ -0,0 +1,55 @@
+import numpy as np
+
+
+def box_statistics(codes, prices, labels, max_points=200, seed=0):
+    """Estadísticos del boxplot calculados en el servidor para cada categoría.
+
+    ``codes`` es la columna de códigos de la familia (``-1`` = sin categoría) y
+    ``labels`` las etiquetas de cada código. Para cada categoría presente
+    devuelve los cuartiles (método de Hazen: interpola en la posición
+    ``n*p - 0.5``, igual que el método "linear" por defecto de plotly), los
+    bigotes (dato más extremo dentro de 1.5 veces el rango intercuartílico,
+    sin quedar dentro de la caja), todos los valores atípicos y una muestra
+    aleatoria de a lo sumo ``max_points`` puntos no atípicos. La muestra usa
+    una semilla fija para que la misma selección produzca siempre la misma
+    figura.
+    """
+    codes = np.asarray(codes)
+    prices = np.asarray(prices, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+
+    # Agrupar una sola vez: precios ordenados por (código, precio)
+    order = np.lexsort((prices, codes))
+    codes, prices = codes[order], prices[order]
+    present, starts = np.unique(codes, return_index=True)
+    stops = np.append(starts[1:], len(codes))
+
+    estadisticas = []
+    for code, start, stop in zip(present, starts, stops):
+        if code < 0:
+            continue
+        values = prices[start:stop]
+        q1, median, q3 = np.percentile(values, [25, 50, 75], method="hazen")
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        # Como en plotly, los bigotes nunca quedan dentro de la caja
+        lowerfence, upperfence = min(inside[0], q1), max(inside[-1], q3)
+        outlier = (values < lowerfence) | (values > upperfence)
+
+        regular = values[~outlier]
+        if len(regular) > max_points:
+            regular = rng.choice(regular, size=max_points, replace=False)
+
+        estadisticas.append({
+            "category": labels[code],
+            "count": len(values),
+            "total": values.sum(),
+            "q1": q1,
+            "median": median,
+            "q3": q3,
+            "lowerfence": lowerfence,
+            "upperfence": upperfence,
+            "outliers": values[outlier],
+            "sample": regular,
+        })
+    return estadisticas
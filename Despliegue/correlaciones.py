@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from cubo import AggregateCube
+
+
+def _correlation_from_sums(n, sum_price, sum_price2, sum_a, sum_a_price):
+    # Correlación de Pearson entre cada columna 0/1 y el precio a partir de sus sumas
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = n * sum_a_price - sum_a * sum_price
+        variance_a = n * sum_a - sum_a * sum_a
+        variance_price = n * sum_price2 - sum_price * sum_price
+        correlation = covariance / np.sqrt(variance_a * variance_price)
+    correlation[(variance_a <= 0) | (variance_price <= 0) | (n < 2)] = np.nan
+    return np.clip(correlation, -1, 1)
+
+
+class CorrelationEngine:
+    """Correlaciones amenity–precio a partir de estadísticos suficientes.
+
+    Por cada celda (estado, baños, franja de tamaño) se acumulan n, Σprecio,
+    Σprecio², y para cada columna Σa y Σa·precio. Con esas sumas la correlación
+    de cualquier selección sin amenities se combina sin tocar filas. Cuando hay
+    que recorrer filas (rango fuera de la grilla) solo se calculan las k
+    correlaciones con el precio en una pasada vectorizada, en lugar de la
+    matriz completa de ``DataFrame.corr()``.
+    """
+
+    def __init__(self, datos, motor, columns, slider_min, slider_max, step=100):
+        self.datos = datos
+        self.motor = motor
+        self.columns = list(columns)
+        self._position = {col: i for i, col in enumerate(self.columns)}
+
+        # El precio se centra en su media global: la correlación no cambia y las
+        # sumas acumuladas conservan mejor la precisión
+        price = datos.column("price").astype(np.float64)
+        self._shift = price.mean() if len(price) else 0.0
+
+        def centered_price(rows):
+            return datos.column("price", rows).astype(np.float64) - self._shift
+
+        def ones(rows):
+            return np.ones(len(datos) if rows is None else len(rows))
+
+        def price_squared(rows):
+            return centered_price(rows) ** 2
+
+        def indicator(col):
+            return lambda rows: datos.column(col, rows).astype(np.float64)
+
+        def indicator_price(col):
+            return lambda rows: datos.column(col, rows) * centered_price(rows)
+
+        measures = [ones, centered_price, price_squared]
+        for col in self.columns:
+            measures += [indicator(col), indicator_price(col)]
+        self.cube = AggregateCube(datos, motor, measures, slider_min, slider_max, step)
+
+    def update(self, rows, sign=1):
+        """Suma (``sign=1``) o resta (``sign=-1``) los estadísticos de las filas ``rows`` (ver ``AggregateCube.update``)."""
+        self.cube.update(rows, sign)
+
+    def _row_sums(self, rows, columns):
+        # Una sola pasada vectorizada sobre las filas para las k columnas pedidas
+        price = self.datos.column("price", rows).astype(np.float64) - self._shift
+        matrix = np.column_stack([self.datos.column(col, rows) for col in columns]).astype(np.float64) \
+            if columns else np.empty((len(rows), 0))
+        return len(rows), price.sum(), price @ price, matrix.sum(axis=0), price @ matrix
+
+    def correlations(self, state, bathrooms, square_feet_range, columns=None, rows=None, use_cube=True):
+        """Correlación de cada columna con ``price`` como DataFrame (índice = columnas).
+
+        Con ``use_cube=False`` se calcula sobre ``rows``, para selecciones que
+        el cubo no conoce (por ejemplo una región del mapa).
+        """
+        columns = self.columns if not columns else list(columns)
+
+        totals = None
+        if use_cube and all(col in self._position for col in columns):
+            totals = self.cube.totals(state, bathrooms, square_feet_range)
+
+        if totals is not None:
+            positions = np.array([self._position[col] for col in columns], dtype=np.int64)
+            sums = (totals[0], totals[1], totals[2], totals[3 + 2 * positions], totals[4 + 2 * positions])
+        else:
+            if rows is None:
+                rows = self.motor.resolve(state, bathrooms, square_feet_range)
+            sums = self._row_sums(rows, columns)
+
+        return pd.DataFrame({"price": _correlation_from_sums(*sums)}, index=columns)
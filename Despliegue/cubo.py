@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+
+class AggregateCube:
+    """Sumas precalculadas de varias medidas por celda (estado, baños, franja de tamaño).
+
+    Cada fila cae en una celda (estado, número de baños, franja de ``step``
+    pies cuadrados anclada en el mínimo del slider). Solo se guardan las celdas
+    no vacías, ordenadas por llave, junto con las sumas prefijas de cada medida;
+    así la suma de cualquier selección sin amenities es una diferencia de dos
+    filas por cada par (estado, baños) y no depende del número de filas.
+
+    ``measures`` es una lista de funciones ``f(rows)`` que devuelven el valor de
+    la medida para las filas ``rows`` (todas si ``rows`` es ``None``).
+
+    Las filas con un tamaño fuera de ``[slider_min, slider_max]`` no caen en
+    ninguna celda; solo se cuentan, y las consultas que las incluirían
+    devuelven ``None`` para que se respondan con el motor de filtros.
+    """
+
+    def __init__(self, datos, motor, measures, slider_min, slider_max, step=100):
+        self.datos = datos
+        self.motor = motor
+        self.measures = measures
+        self.slider_min = slider_min
+        self.slider_max = slider_max
+        self.step = step
+
+        # Índice de estado 0 = filas sin estado (código -1)
+        self._state_index = {}
+        self.n_states = 1
+        self._bath_values = [float(value) for value in np.unique(datos.column("bathrooms"))]
+        self._bath_index = {value: i for i, value in enumerate(self._bath_values)}
+        self.n_baths = len(self._bath_values)
+        self._extend_grid(None)
+        self.n_buckets = int((slider_max - slider_min) // step) + 1
+
+        keys, inside = self._cell_keys(None)
+        self._keys, cells = np.unique(keys[inside], return_inverse=True)
+        self._below, self._above = self._outside(None)
+
+        # Totales por celda y sumas prefijas con una fila inicial en cero: celdas [i, j) = P[j] - P[i]
+        self._totals = np.column_stack([
+            np.bincount(cells, weights=measure(None)[inside], minlength=len(self._keys)) for measure in measures
+        ]) if measures else np.zeros((len(self._keys), 0))
+        self._prefix = self._prefix_sums(self._totals)
+
+    @staticmethod
+    def _prefix_sums(totals):
+        prefix = np.zeros((len(totals) + 1, totals.shape[1]))
+        np.cumsum(totals, axis=0, out=prefix[1:])
+        return prefix
+
+    def _extend_grid(self, rows):
+        # Registra los estados y números de baños que aparecieron después de construir el cubo. Un
+        # estado nuevo va al final del eje más significativo de la llave, así que las llaves
+        # existentes no cambian; un número de baños nuevo obliga a recalcularlas (sin cambiar su orden)
+        labels = self.datos.labels("state")
+        for code in range(self.n_states - 1, len(labels)):
+            self._state_index[f"state_{labels[code]}"] = code + 1
+        self.n_states = len(labels) + 1
+
+        if rows is None:
+            return
+        new = [float(value) for value in np.unique(self.datos.column("bathrooms", rows))
+               if float(value) not in self._bath_index]
+        if not new:
+            return
+        old = self.n_baths
+        for value in new:
+            self._bath_index[value] = len(self._bath_values)
+            self._bath_values.append(value)
+        self.n_baths = len(self._bath_values)
+        groups, buckets = np.divmod(self._keys, self.n_buckets)
+        states, baths = np.divmod(groups, old)
+        self._keys = (states * self.n_baths + baths) * self.n_buckets + buckets
+
+    def _cell_keys(self, rows):
+        # Llave de la celda de cada fila y si su tamaño cae dentro de la grilla del slider
+        state_codes = self.datos.codes("state")
+        state_codes = (state_codes if rows is None else state_codes[rows]).astype(np.int64) + 1
+        bath_index = pd.Index(self._bath_values).get_indexer(self.datos.column("bathrooms", rows))
+        square_feet = self.datos.column("square_feet", rows)
+        buckets = ((square_feet - self.slider_min) // self.step).astype(np.int64)
+        inside = (square_feet >= self.slider_min) & (square_feet <= self.slider_max)
+        return (state_codes * self.n_baths + bath_index) * self.n_buckets + buckets, inside
+
+    def _outside(self, rows):
+        # Filas con un tamaño por debajo y por encima de la grilla del slider
+        square_feet = self.datos.column("square_feet", rows)
+        return (int(np.count_nonzero(square_feet < self.slider_min)),
+                int(np.count_nonzero(square_feet > self.slider_max)))
+
+    def update(self, rows, sign=1):
+        """Suma (``sign=1``) o resta (``sign=-1``) las filas ``rows`` en sus celdas.
+
+        Las filas de ``rows`` se ubican en sus celdas con búsquedas binarias;
+        las sumas prefijas se recalculan desde la primera celda modificada, así
+        que el costo es O(k log celdas + celdas) para k filas. El número de
+        celdas está acotado por estados x baños x franjas y no crece con el
+        total de filas; solo una celda nueva obliga a reordenar las llaves.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        self._extend_grid(rows)
+        below, above = self._outside(rows)
+        self._below += sign * below
+        self._above += sign * above
+        keys, inside = self._cell_keys(rows)
+        rows, keys = rows[inside], keys[inside]
+        if not len(rows):
+            return
+        values = sign * np.column_stack([measure(rows) for measure in self.measures])
+
+        positions = np.searchsorted(self._keys, keys)
+        known = positions < len(self._keys)
+        known[known] = self._keys[positions[known]] == keys[known]
+        if known.all():
+            # Todas las celdas existen: se suman en su lugar y las llaves no cambian
+            np.add.at(self._totals, positions, values)
+            first = positions.min()
+            np.cumsum(self._totals[first:], axis=0, out=self._prefix[first + 1:])
+            self._prefix[first + 1:] += self._prefix[first]
+            return
+
+        self._keys, cells = np.unique(np.concatenate([self._keys, keys]), return_inverse=True)
+        stacked = np.concatenate([self._totals, values])
+        self._totals = np.zeros((len(self._keys), stacked.shape[1]))
+        np.add.at(self._totals, cells, stacked)
+        self._prefix = self._prefix_sums(self._totals)
+
+    def _bucket_bounds(self, square_feet_range):
+        # Franjas completas [first, last) cubiertas por el rango y borde exacto pendiente. Un rango
+        # que incluye filas fuera de la grilla no se puede responder con las celdas
+        if not square_feet_range:
+            return None if self._below or self._above else (0, self.n_buckets, None)
+        low, high = square_feet_range
+        if (low - self.slider_min) % self.step or low < self.slider_min:
+            return None
+        first = min(int((low - self.slider_min) // self.step), self.n_buckets)
+        if high > self.slider_max and self._above:
+            return None
+        if high >= self.slider_max:
+            return first, self.n_buckets, None
+        if (high - self.slider_min) % self.step:
+            return None
+        # El extremo superior es inclusivo: sus filas caen al inicio de la franja ``last``
+        last = min(int((high - self.slider_min) // self.step), self.n_buckets)
+        return first, max(last, first), high
+
+    def totals(self, state, bathrooms, square_feet_range):
+        """Suma de cada medida sobre la selección.
+
+        Devuelve ``None`` si el rango no cae en la grilla o si incluiría filas
+        con un tamaño fuera de ella.
+        """
+        bounds = self._bucket_bounds(square_feet_range)
+        if bounds is None:
+            return None
+        first, last, edge = bounds
+
+        if state:
+            if state not in self._state_index:
+                return np.zeros(len(self.measures))
+            states = np.array([self._state_index[state]])
+        else:
+            states = np.arange(self.n_states)
+        if bathrooms:
+            if float(bathrooms) not in self._bath_index:
+                return np.zeros(len(self.measures))
+            baths = np.array([self._bath_index[float(bathrooms)]])
+        else:
+            baths = np.arange(self.n_baths)
+
+        groups = (states[:, None] * self.n_baths + baths[None, :]).ravel() * self.n_buckets
+        start = np.searchsorted(self._keys, groups + first)
+        stop = np.searchsorted(self._keys, groups + last)
+        totals = (self._prefix[stop] - self._prefix[start]).sum(axis=0)
+
+        # Filas exactamente en el extremo superior del rango
+        if edge is not None and square_feet_range[0] <= edge:
+            rows = self.motor.resolve(state, bathrooms, [edge, edge])
+            if len(rows):
+                totals += [np.sum(measure(rows), dtype=np.float64) for measure in self.measures]
+
+        return totals
+
+
+class KpiCube(AggregateCube):
+    """Cubo de agregados para las tarjetas de KPIs.
+
+    Guarda por celda el número de apartamentos, el número de filas con ciudad,
+    la suma de ``price`` y la suma de ``longitud_descripcion``.
+    """
+
+    def __init__(self, datos, motor, slider_min, slider_max, step=100):
+        def ones(rows):
+            return np.ones(len(datos) if rows is None else len(rows))
+
+        def cities(rows):
+            # Los códigos se leen en cada llamada: la columna cambia al agregar filas
+            city_codes = datos.codes("cityname")
+            return ((city_codes if rows is None else city_codes[rows]) >= 0).astype(np.float64)
+
+        def price(rows):
+            return datos.column("price", rows).astype(np.float64)
+
+        def description(rows):
+            return datos.column("longitud_descripcion", rows).astype(np.float64)
+
+        super().__init__(datos, motor, [ones, cities, price, description], slider_min, slider_max, step)
+
+    def query(self, state, bathrooms, square_feet_range):
+        """KPIs de la selección, o ``None`` si el rango no cae en la grilla del cubo."""
+        totals = self.totals(state, bathrooms, square_feet_range)
+        if totals is None:
+            return None
+        count, cities, price, description = totals
+        return {
+            "total_cities": int(round(cities)),
+            "total_apartments": int(round(count)),
+            "avg_price": price / count if count else np.nan,
+            "avg_description_length": description / count if count else np.nan,
+        }
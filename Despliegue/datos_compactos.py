@@ -0,0 +1,288 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Familias one-hot generadas con get_dummies en Preparacion_Datos.ipynb
+ONE_HOT_FAMILIES = ["category", "pets_allowed", "has_photo", "cityname", "state", "source", "price_type"]
+
+# Traducción al español de los valores de cada familia (los que no aparecen se muestran tal cual)
+ETIQUETAS = {
+    "has_photo": {
+        "No": "Sin Foto",
+        "Thumbnail": "Miniatura",
+        "Yes": "Con Foto"
+    },
+    "pets_allowed": {
+        "Cats": "Gatos",
+        "Cats,Dogs": "Gatos y Perros",
+        "Dogs": "Perros",
+        "No permitido": "No Permitidas"
+    },
+}
+
+
+def _code_dtype(n_labels):
+    # Tipo entero más pequeño que admite los códigos (-1 = sin categoría)
+    if n_labels < np.iinfo(np.int8).max:
+        return np.int8
+    if n_labels < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+
+def _downcast(values):
+    # Reduce el tipo numérico solo si la conversión no pierde información
+    if np.issubdtype(values.dtype, np.integer):
+        return pd.to_numeric(pd.Series(values), downcast="integer").to_numpy()
+    if np.issubdtype(values.dtype, np.floating):
+        reduced = values.astype(np.float32)
+        if np.array_equal(reduced.astype(values.dtype), values, equal_nan=True):
+            return reduced
+    return values
+
+
+class CompactDataset:
+    """Representación columnar compacta de ``datosPreparados``.
+
+    Cada familia one-hot (ciudad, estado, fuente, mascotas, fotos, ...) se guarda
+    como una única columna de códigos enteros pequeños, las amenities como una
+    máscara de bits ``uint32`` y las columnas numéricas con el tipo más pequeño
+    que no pierde información. Las columnas de texto no se cargan.
+
+    Los nombres de columna originales siguen funcionando: ``datos["state_CA"]``
+    devuelve la columna one-hot (0/1) decodificada bajo demanda, de modo que
+    expresiones como ``filtered_data[state] == 1`` se mantienen.
+    """
+
+    def __init__(self, numeric, codes, labels, amenity_mask, amenities, columns, version=None):
+        self.version = version
+        self._numeric = numeric
+        self._codes = codes
+        self._labels = labels
+        self._amenity_mask = amenity_mask
+        self.amenities = list(amenities)
+        self._columns = list(columns)
+        self._n_rows = len(amenity_mask)
+        # Arreglos de respaldo con espacio libre al final para agregar filas (ver ``append``)
+        self._buffers = {}
+
+        # Nombre de columna virtual -> (familia, código) o bit de la amenity
+        self._virtual = {}
+        for family, family_labels in labels.items():
+            for code, label in enumerate(family_labels):
+                self._virtual[f"{family}_{label}"] = (family, code)
+        self._amenity_bits = {amenity: bit for bit, amenity in enumerate(self.amenities)}
+
+    @classmethod
+    def from_frame(cls, df, amenities):
+        """Construye la representación compacta a partir del DataFrame one-hot."""
+        amenities = [amenity for amenity in amenities if amenity in df.columns]
+        if len(amenities) > 32:
+            raise ValueError("La máscara de amenities admite como máximo 32 columnas")
+
+        numeric, codes, labels = {}, {}, {}
+        columns = []
+        for family in ONE_HOT_FAMILIES:
+            family_columns = [col for col in df.columns if col.startswith(family + "_")]
+            if not family_columns:
+                continue
+            one_hot = df[family_columns].to_numpy()
+            if (one_hot.sum(axis=1) > 1).any():
+                raise ValueError(f"La familia {family} tiene más de una categoría activa por fila")
+            family_codes = np.where(one_hot.any(axis=1), one_hot.argmax(axis=1), -1)
+            codes[family] = family_codes.astype(_code_dtype(len(family_columns)))
+            labels[family] = [col[len(family) + 1:] for col in family_columns]
+
+        mask = np.zeros(len(df), dtype=np.uint32)
+        for bit, amenity in enumerate(amenities):
+            mask |= (df[amenity].to_numpy() == 1).astype(np.uint32) << np.uint32(bit)
+
+        for col in df.columns:
+            family = next((f for f in codes if col.startswith(f + "_")), None)
+            if family is not None or col in amenities:
+                columns.append(col)
+            elif pd.api.types.is_numeric_dtype(df[col]):
+                numeric[col] = _downcast(df[col].to_numpy())
+                columns.append(col)
+
+        return cls(numeric, codes, labels, mask, amenities, columns)
+
+    @classmethod
+    def from_csv(cls, path, amenities, chunksize=100_000):
+        """Lee el CSV por bloques y los compacta sin materializar la tabla int64 completa."""
+        parts = [cls.from_frame(chunk, amenities) for chunk in pd.read_csv(path, chunksize=chunksize)]
+        return cls.concat(parts)
+
+    @classmethod
+    def concat(cls, parts):
+        first = parts[0]
+        numeric = {name: np.concatenate([p._numeric[name] for p in parts]) for name in first._numeric}
+        codes = {family: np.concatenate([p._codes[family] for p in parts]) for family in first._codes}
+        mask = np.concatenate([p._amenity_mask for p in parts])
+        return cls(numeric, codes, first._labels, mask, first.amenities, first._columns)
+
+    def __len__(self):
+        return self._n_rows
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def numeric_columns(self):
+        return list(self._numeric)
+
+    @property
+    def families(self):
+        return list(self._labels)
+
+    def codes(self, family):
+        """Columna de códigos de una familia one-hot (-1 si la fila no tiene categoría)."""
+        return self._codes[family]
+
+    def labels(self, family):
+        """Valores originales de la familia, en el orden de sus códigos."""
+        return self._labels[family]
+
+    def display_labels(self, family):
+        """Etiquetas en español de la familia, en el orden de sus códigos."""
+        translations = ETIQUETAS.get(family, {})
+        return [translations.get(label, label) for label in self._labels[family]]
+
+    def categorical(self, family, rows=None):
+        """Columna categórica tipada de la familia con sus etiquetas en español."""
+        codes = self._codes[family] if rows is None else self._codes[family][rows]
+        return pd.Categorical.from_codes(codes, categories=self.display_labels(family))
+
+    @property
+    def amenity_mask(self):
+        return self._amenity_mask
+
+    def column(self, name, rows=None):
+        """Devuelve la columna ``name`` (opcionalmente solo ``rows``) como arreglo de NumPy."""
+        def gather(values):
+            return values if rows is None else values[rows]
+
+        if name in self._numeric:
+            return gather(self._numeric[name])
+        if name in self._virtual:
+            family, code = self._virtual[name]
+            return (gather(self._codes[family]) == code).astype(np.uint8)
+        if name in self._amenity_bits:
+            bit = np.uint32(self._amenity_bits[name])
+            return ((gather(self._amenity_mask) >> bit) & np.uint32(1)).astype(np.uint8)
+        raise KeyError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return pd.Series(self.column(key), name=key)
+        return pd.DataFrame({name: self.column(name) for name in key})
+
+    def add_label(self, family, label):
+        """Agrega la categoría ``label`` a ``family`` (por ejemplo una ciudad nueva) y devuelve su código.
+
+        La columna virtual ``{family}_{label}`` queda a continuación de las demás
+        columnas de la familia.
+        """
+        labels = self._labels[family] + [label]
+        self._labels = {**self._labels, family: labels}
+        name = f"{family}_{label}"
+        last = max(i for i, col in enumerate(self._columns) if self._virtual.get(col, (None,))[0] == family)
+        self._columns = self._columns[:last + 1] + [name] + self._columns[last + 1:]
+        self._virtual[name] = (family, len(labels) - 1)
+
+        dtype = _code_dtype(len(labels))
+        if np.dtype(dtype).itemsize > self._codes[family].dtype.itemsize:
+            self._codes[family] = self._codes[family].astype(dtype)
+            self._buffers.pop(("codes", family), None)
+        return len(labels) - 1
+
+    def _extend(self, key, current, values):
+        # Escribe ``values`` a continuación de ``current`` en su arreglo de respaldo. Si no hay
+        # espacio (o el tipo no admite los valores sin pérdida) el respaldo se realoja con un 25 %
+        # de holgura, de modo que el costo amortizado es proporcional a las filas agregadas
+        n, added = len(current), len(values)
+        dtype = current.dtype
+        if not np.array_equal(values.astype(dtype).astype(values.dtype), values, equal_nan=True):
+            dtype = np.result_type(dtype, values.dtype)
+        buffer = self._buffers.get(key)
+        if buffer is None or len(buffer) < n + added or buffer.dtype != dtype:
+            buffer = np.empty(n + max(added, n // 4), dtype=dtype)
+            buffer[:n] = current
+            self._buffers[key] = buffer
+        buffer[n:n + added] = values
+        return buffer[:n + added]
+
+    def append(self, numeric, codes, amenity_mask):
+        """Agrega filas al final en tiempo proporcional a su número.
+
+        ``numeric`` tiene un arreglo por cada columna de ``numeric_columns``,
+        ``codes`` los códigos de cada familia (``-1`` = sin categoría; las
+        categorías nuevas se registran antes con ``add_label``) y
+        ``amenity_mask`` la máscara de amenities de cada fila. Las columnas
+        abiertas como mapas de memoria se copian la primera vez.
+        """
+        amenity_mask = np.asarray(amenity_mask, dtype=np.uint32)
+        for name in self._numeric:
+            self._numeric[name] = self._extend(("numeric", name), self._numeric[name], np.asarray(numeric[name]))
+        for family in self._codes:
+            self._codes[family] = self._extend(("codes", family), self._codes[family], np.asarray(codes[family]))
+        self._amenity_mask = self._extend("amenity_mask", self._amenity_mask, amenity_mask)
+        self._n_rows += len(amenity_mask)
+
+    def take(self, rows):
+        """Subconjunto de filas con la misma representación compacta."""
+        numeric = {name: values[rows] for name, values in self._numeric.items()}
+        codes = {family: values[rows] for family, values in self._codes.items()}
+        return CompactDataset(numeric, codes, self._labels, self._amenity_mask[rows], self.amenities, self._columns,
+                              version=self.version)
+
+    def take_columns(self, rows, columns):
+        """Extrae únicamente ``columns`` para las filas ``rows`` como DataFrame."""
+        return pd.DataFrame({name: self.column(name, rows) for name in columns})
+
+    def save(self, directory):
+        """Guarda cada columna como un archivo ``.npy`` y la descripción en ``meta.json``."""
+        os.makedirs(directory, exist_ok=True)
+        numeric_names = list(self._numeric)
+        for i, name in enumerate(numeric_names):
+            np.save(os.path.join(directory, f"numeric_{i}.npy"), self._numeric[name])
+        for family, values in self._codes.items():
+            np.save(os.path.join(directory, f"codes_{family}.npy"), values)
+        np.save(os.path.join(directory, "amenity_mask.npy"), self._amenity_mask)
+
+        meta = {
+            "version": self.version,
+            "numeric": numeric_names,
+            "labels": self._labels,
+            "amenities": self.amenities,
+            "columns": self._columns,
+        }
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        """Carga un conjunto guardado con :meth:`save`.
+
+        Con ``mmap_mode="r"`` las columnas se abren como mapas de memoria de solo
+        lectura: todos los procesos que cargan el mismo directorio comparten una
+        única copia en la caché de páginas del sistema operativo.
+        """
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        def read(filename):
+            return np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+
+        numeric = {name: read(f"numeric_{i}.npy") for i, name in enumerate(meta["numeric"])}
+        codes = {family: read(f"codes_{family}.npy") for family in meta["labels"]}
+        return cls(numeric, codes, meta["labels"], read("amenity_mask.npy"), meta["amenities"],
+                   meta["columns"], version=meta["version"])
+
+    @property
+    def nbytes(self):
+        arrays = list(self._numeric.values()) + list(self._codes.values()) + [self._amenity_mask]
+        return sum(values.nbytes for values in arrays)
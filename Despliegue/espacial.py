@@ -0,0 +1,158 @@
+"""Índice espacial de los anuncios para filtrar el tablero por región del mapa.
+
+Los anuncios se ordenan por el código de Morton de su celda en una grilla Web
+Mercator de ``2**LEVEL`` celdas por lado (la misma codificación de las teselas
+del mapa). Un rectángulo se descompone en bloques del árbol de cuadrantes, cada
+bloque es un rango contiguo de códigos y cada rango se ubica con una búsqueda
+binaria, así que una región se resuelve a índices de fila sin recorrer todos
+los anuncios: solo se revisan las coordenadas de los candidatos de los bloques
+del borde.
+
+Una región es una tupla ``("bbox", oeste, sur, este, norte)`` o
+``("radio", latitud, longitud, km)``; forma parte de la firma de filtros.
+"""
+import math
+
+import numpy as np
+
+from teselas import mercator, morton
+
+# Celdas por lado de la grilla del índice (2**16: unos 600 m en el ecuador)
+LEVEL = 16
+
+# Niveles del árbol de cuadrantes que se recorren bajo los bloques que contienen la región
+MAX_DEPTH = 8
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def bbox_region(west, south, east, north, digits=3):
+    """Región rectangular canónica (redondeada a ``digits`` decimales, unos 100 m con 3)."""
+    return ("bbox", *(round(float(value), digits) for value in (west, south, east, north)))
+
+
+def radius_region(latitude, longitude, km, digits=3):
+    """Región canónica de los anuncios a menos de ``km`` kilómetros de un punto."""
+    return ("radio", *(round(float(value), digits) for value in (latitude, longitude, km)))
+
+
+class SpatialIndex:
+    """Anuncios ordenados por su código de Morton para resolver regiones en tiempo logarítmico.
+
+    Las filas agregadas por la ingesta entran a un índice pequeño que se
+    fusiona con el principal cuando crece (como el índice de ``square_feet``
+    del motor de filtros); las bajas no se quitan porque el motor de filtros
+    las descarta al cruzar la región con los demás filtros.
+    """
+
+    def __init__(self, datos, level=LEVEL, max_depth=MAX_DEPTH):
+        self.datos = datos
+        self.level = level
+        self.max_depth = max_depth
+        rows = np.arange(len(datos), dtype=np.int64)
+        keys = self._keys(rows)
+        order = np.argsort(keys, kind="stable")
+        self._sorted_keys, self._rows = keys[order], rows[order]
+        self._recent_keys, self._recent_rows = self._sorted_keys[:0], self._rows[:0]
+
+    def _cells(self, latitude, longitude):
+        x, y = mercator(latitude, longitude)
+        scale = float(2 ** self.level)
+        return (x * scale).astype(np.int64), (y * scale).astype(np.int64)
+
+    def _keys(self, rows):
+        return morton(*self._cells(self.datos.column("latitude", rows), self.datos.column("longitude", rows)))
+
+    def update(self, rows, sign=1):
+        """Agrega al índice las filas nuevas (``sign=1``); las bajas (``sign=-1``) no cambian el índice."""
+        if sign < 0:
+            return
+        rows = np.concatenate([self._recent_rows, np.asarray(rows, dtype=np.int64)])
+        keys = np.concatenate([self._recent_keys, self._keys(rows[len(self._recent_rows):])])
+        order = np.argsort(keys, kind="stable")
+        self._recent_keys, self._recent_rows = keys[order], rows[order]
+        if len(self._recent_rows) > len(self._rows) // 8:
+            # Fusión con el índice principal (costo amortizado constante por fila agregada)
+            keys = np.concatenate([self._sorted_keys, self._recent_keys])
+            order = np.argsort(keys, kind="stable")
+            self._sorted_keys = keys[order]
+            self._rows = np.concatenate([self._rows, self._recent_rows])[order]
+            self._recent_keys, self._recent_rows = self._sorted_keys[:0], self._rows[:0]
+
+    def _ranges(self, ix0, iy0, ix1, iy1):
+        # Rangos [inicio, fin) de códigos de los bloques del árbol de cuadrantes que cubren las celdas
+        # [ix0, ix1] x [iy0, iy1]. Se parte de bloques del tamaño de la región (a lo sumo 2 x 2) y se
+        # subdividen los del borde hasta max_depth niveles más abajo
+        top = min(self.level, max(ix1 - ix0, iy1 - iy0).bit_length())
+        stop = max(top - self.max_depth, 0)
+        stack = [(top, bx, by, int(morton(bx, by)))
+                 for by in range(iy0 >> top, (iy1 >> top) + 1) for bx in range(ix0 >> top, (ix1 >> top) + 1)]
+        ranges = []
+        while stack:
+            size, bx, by, prefix = stack.pop()
+            x0, y0 = bx << size, by << size
+            x1, y1 = x0 + (1 << size) - 1, y0 + (1 << size) - 1
+            if x1 < ix0 or x0 > ix1 or y1 < iy0 or y0 > iy1:
+                continue
+            if size == stop or (ix0 <= x0 and x1 <= ix1 and iy0 <= y0 and y1 <= iy1):
+                ranges.append((prefix << (2 * size), (prefix + 1) << (2 * size)))
+            else:
+                # Hijos en orden de Morton: el bit 0 es x y el bit 1 es y
+                stack.extend((size - 1, 2 * bx + (child & 1), 2 * by + (child >> 1), 4 * prefix + child)
+                             for child in range(4))
+
+        # Los rangos contiguos se unen para hacer menos búsquedas
+        ranges.sort()
+        merged = []
+        for start, end in ranges:
+            if merged and merged[-1][1] == start:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        return np.array(merged, dtype=np.uint64).reshape(-1, 2)
+
+    @staticmethod
+    def _gather(keys, rows, ranges):
+        # Filas de los rangos de códigos con una búsqueda binaria por extremo
+        starts = np.searchsorted(keys, ranges[:, 0])
+        lengths = np.searchsorted(keys, ranges[:, 1]) - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return rows[offsets + np.arange(lengths.sum())]
+
+    def _candidates(self, west, south, east, north):
+        # Filas de las celdas que tocan el rectángulo, con sus coordenadas
+        (ix0, ix1), (iy1, iy0) = self._cells([south, north], [west, east])
+        ranges = self._ranges(int(ix0), int(iy0), int(ix1), int(iy1))
+        rows = np.concatenate([self._gather(self._sorted_keys, self._rows, ranges),
+                               self._gather(self._recent_keys, self._recent_rows, ranges)])
+        return rows, self.datos.column("latitude", rows), self.datos.column("longitude", rows)
+
+    def bbox(self, west, south, east, north):
+        """Índices (ordenados) de las filas dentro del rectángulo, bordes incluidos."""
+        rows, latitude, longitude = self._candidates(west, south, east, north)
+        inside = (latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)
+        return np.sort(rows[inside])
+
+    def radius(self, latitude, longitude, km):
+        """Índices (ordenados) de las filas a menos de ``km`` kilómetros del punto (distancia haversine)."""
+        angle = km / EARTH_RADIUS_KM
+        dlat = math.degrees(angle)
+        # Mayor diferencia de longitud dentro del círculo (se alcanza hacia el polo, no a la latitud del
+        # centro); si el círculo contiene un polo abarca todas las longitudes
+        ratio = math.sin(angle) / max(math.cos(math.radians(latitude)), 1e-12)
+        dlon = math.degrees(math.asin(ratio)) if angle < math.pi / 2 and ratio < 1 else 180.0
+        rows, lat, lon = self._candidates(longitude - dlon, latitude - dlat, longitude + dlon, latitude + dlat)
+        lat, lon = np.radians(lat.astype(np.float64)), np.radians(lon.astype(np.float64))
+        lat0, lon0 = math.radians(latitude), math.radians(longitude)
+        h = np.sin((lat - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+        return np.sort(rows[distance <= km])
+
+    def query(self, region):
+        """Índices (ordenados) de las filas de una región ``("bbox", ...)`` o ``("radio", ...)``."""
+        kind, *values = region
+        if kind == "bbox":
+            return self.bbox(*values)
+        if kind == "radio":
+            return self.radius(*values)
+        raise ValueError(f"Tipo de región desconocido: {kind!r}")
@@ -0,0 +1,117 @@
+"""Estimación de precios por lotes para archivos de anuncios más grandes que la memoria.
+
+Lee el CSV por bloques de tamaño fijo, codifica cada bloque contra las
+variables de ``modeloFinal.csv``, lo estima de forma vectorizada y escribe los
+resultados a medida que avanza, así que la memoria usada no depende del tamaño
+del archivo. Ejemplo::
+
+    python estimar_lotes.py datos.csv estimaciones.csv --sep ";" --encoding Windows-1252 --procesos 4
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modelo import NUMERIC_FEATURES, PriceModel
+
+_modelo = None
+
+
+def _init_worker(modelo):
+    global _modelo
+    _modelo = modelo
+
+
+def encode_and_score(chunk, modelo):
+    """Codifica un bloque de anuncios crudos contra las variables del modelo y lo estima.
+
+    Usa las columnas ``bathrooms``, ``square_feet``, ``cityname``, ``state`` y
+    ``amenities`` (lista separada por comas) del formato de ``datos.csv``.
+    """
+    def names(column, prefix):
+        # Nombres de variable one-hot; los valores que el modelo no conoce suman 0
+        return (prefix + chunk[column].fillna("").astype(str)).to_numpy() if column in chunk else None
+
+    prices = modelo.score_batch(
+        pd.to_numeric(chunk["bathrooms"], errors="coerce").to_numpy(np.float64),
+        pd.to_numeric(chunk["square_feet"], errors="coerce").to_numpy(np.float64),
+        cities=names("cityname", "cityname_"),
+        states=names("state", "state_"),
+    )
+
+    if "amenities" in chunk:
+        # Una columna indicadora por cada amenity del modelo, sin separar las listas fila por fila
+        listas = "," + chunk["amenities"].fillna("").astype(str).str.replace(r"\s*,\s*", ",", regex=True).str.strip() + ","
+        for name in modelo.variables:
+            if name in NUMERIC_FEATURES or name.startswith(("cityname_", "state_")):
+                continue
+            indicator = listas.str.contains("," + name + ",", regex=False).to_numpy()
+            prices += modelo.coefficient(name) * indicator
+    return prices
+
+
+def _score_chunk(chunk):
+    return chunk.index.to_numpy(), encode_and_score(chunk, _modelo)
+
+
+def _chunks(path, args):
+    return pd.read_csv(path, sep=args.sep, encoding=args.encoding, chunksize=args.chunksize,
+                       index_col=args.id_col, dtype={"cityname": str, "state": str, "amenities": str})
+
+
+def run(args):
+    modelo = PriceModel.load(args.modelo)
+    _init_worker(modelo)
+
+    start = time.perf_counter()
+    total = 0
+    header = True
+    with open(args.salida, "w", encoding="utf-8", newline="") as out:
+        def write(result):
+            nonlocal total, header
+            ids, prices = result
+            pd.DataFrame({"id": ids, "precio_estimado": np.round(prices, 2)}).to_csv(out, header=header, index=False)
+            header = False
+            total += len(prices)
+
+        if args.procesos <= 1:
+            for chunk in _chunks(args.entrada, args):
+                write(_score_chunk(chunk))
+        else:
+            # Como máximo dos bloques en vuelo por proceso para acotar la memoria;
+            # los resultados se escriben en el mismo orden del archivo de entrada
+            with ProcessPoolExecutor(args.procesos, initializer=_init_worker, initargs=(modelo,)) as pool:
+                pending = deque()
+                for chunk in _chunks(args.entrada, args):
+                    pending.append(pool.submit(_score_chunk, chunk))
+                    if len(pending) >= 2 * args.procesos:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    elapsed = time.perf_counter() - start
+    print(f"{total} anuncios estimados en {elapsed:.2f} s ({total / max(elapsed, 1e-9):,.0f} filas/s)", file=sys.stderr)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estima precios por lotes con el modelo del simulador.")
+    parser.add_argument("entrada", help="CSV de anuncios (formato de datos.csv)")
+    parser.add_argument("salida", help="CSV de salida con columnas id y precio_estimado")
+    parser.add_argument("--modelo", default="modeloFinal.csv", help="modelo (artefacto .bin o CSV de coeficientes)")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="filas por bloque")
+    parser.add_argument("--sep", default=",", help="separador del CSV de entrada")
+    parser.add_argument("--encoding", default="utf-8", help="codificación del CSV de entrada")
+    parser.add_argument("--id-col", type=int, default=0, help="posición de la columna id (índice)")
+    parser.add_argument("--procesos", type=int, default=1,
+                        help=f"procesos en paralelo (este equipo tiene {os.cpu_count()} núcleos)")
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import json
+import os
+
+import numpy as np
+
+
+class FilterEngine:
+    """Motor de filtros del tablero basado en bitsets precalculados.
+
+    Al cargar los datos se construye un bitset (empaquetado con ``np.packbits``)
+    por cada columna ``state_*``, por cada amenity y por cada valor de
+    ``bathrooms``, además de un índice ordenado sobre ``square_feet``. Cualquier
+    combinación de filtros se resuelve a un arreglo de índices de fila haciendo
+    AND entre bitsets, de modo que los callbacks solo extraen las columnas que
+    necesitan.
+
+    Las filas se pueden agregar (``append``) y dar de baja (``remove``) en
+    tiempo proporcional a su número: los bitsets tienen espacio libre al
+    final, las bajas se marcan en un bitset de filas vigentes y las filas
+    nuevas entran a un índice de tamaño pequeño que se fusiona con el principal
+    cuando crece.
+    """
+
+    def __init__(self, datos, estados, amenities):
+        self.n_rows = len(datos)
+
+        # Bitsets de las columnas one-hot (estados y amenities)
+        self._bitsets = {}
+        for col in list(estados) + list(amenities):
+            self._bitsets[col] = np.packbits(datos[col].to_numpy() == 1)
+
+        # Bitsets por cada valor del número de baños
+        baths = datos["bathrooms"].to_numpy()
+        self._bathrooms_bitsets = {
+            float(value): np.packbits(baths == value) for value in np.unique(baths)
+        }
+
+        # Índice ordenado sobre el tamaño del apartamento
+        self._square_feet = datos["square_feet"].to_numpy()
+        self._square_feet_order = np.argsort(self._square_feet, kind="stable")
+        self._square_feet_sorted = self._square_feet[self._square_feet_order]
+        self._init_updates()
+
+    def _init_updates(self):
+        # Estado de las actualizaciones incrementales: bytes reservados por bitset, bitset de filas
+        # vigentes (None = todas) e índice ordenado de las filas agregadas después de construir
+        self._capacity = (self.n_rows + 7) // 8
+        self._owned = False
+        self._alive = None
+        self._recent_order = np.empty(0, dtype=np.int64)
+        self._recent_sorted = self._square_feet_sorted[:0]
+
+    def save(self, directory):
+        """Guarda los bitsets y el índice ordenado como archivos ``.npy``."""
+        os.makedirs(directory, exist_ok=True)
+        bitset_keys = list(self._bitsets)
+        bathroom_keys = list(self._bathrooms_bitsets)
+        empty = np.empty((0, (self.n_rows + 7) // 8), dtype=np.uint8)
+        np.save(os.path.join(directory, "bitsets.npy"),
+                np.stack([self._bitsets[key] for key in bitset_keys]) if bitset_keys else empty)
+        np.save(os.path.join(directory, "bathrooms.npy"),
+                np.stack([self._bathrooms_bitsets[key] for key in bathroom_keys]) if bathroom_keys else empty)
+        np.save(os.path.join(directory, "square_feet_order.npy"), self._square_feet_order)
+        np.save(os.path.join(directory, "square_feet_sorted.npy"), self._square_feet_sorted)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"n_rows": self.n_rows, "bitsets": bitset_keys, "bathrooms": bathroom_keys}, f,
+                      ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, datos, mmap_mode=None):
+        """Carga un motor guardado con :meth:`save` para el conjunto ``datos``.
+
+        Con ``mmap_mode="r"`` los bitsets quedan mapeados en memoria y se
+        comparten entre todos los procesos que abren el mismo directorio.
+        """
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        def read(filename):
+            return np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+
+        engine = cls.__new__(cls)
+        engine.n_rows = meta["n_rows"]
+        bitsets = read("bitsets.npy")
+        engine._bitsets = {key: bitsets[i] for i, key in enumerate(meta["bitsets"])}
+        bathrooms = read("bathrooms.npy")
+        engine._bathrooms_bitsets = {key: bathrooms[i] for i, key in enumerate(meta["bathrooms"])}
+        engine._square_feet = datos["square_feet"].to_numpy()
+        engine._square_feet_order = read("square_feet_order.npy")
+        engine._square_feet_sorted = read("square_feet_sorted.npy")
+        engine._init_updates()
+        return engine
+
+    def _empty_bitset(self):
+        return np.zeros(self._capacity, dtype=np.uint8)
+
+    @staticmethod
+    def _test(bits, rows):
+        # Valor del bit de cada fila de ``rows``
+        return ((bits[rows >> 3] >> (7 - (rows & 7)).astype(np.uint8)) & 1).astype(bool)
+
+    @staticmethod
+    def _set(bits, rows):
+        np.bitwise_or.at(bits, rows >> 3, (0x80 >> (rows & 7)).astype(np.uint8))
+
+    def _alive_rows(self, rows):
+        return rows if self._alive is None else rows[self._test(self._alive, rows)]
+
+    def _square_feet_rows(self, low, high):
+        # Posiciones del rango [low, high] dentro del índice ordenado y del de filas recientes
+        parts = []
+        for order, values in ((self._square_feet_order, self._square_feet_sorted),
+                              (self._recent_order, self._recent_sorted)):
+            start = np.searchsorted(values, low, side="left")
+            stop = np.searchsorted(values, high, side="right")
+            parts.append(order[start:stop])
+        return self._alive_rows(np.sort(np.concatenate(parts)))
+
+    def _reserve(self):
+        # Los bitsets se realojan con holgura cuando no alcanzan (o la primera vez, porque pueden
+        # ser mapas de memoria de solo lectura), así que su costo amortizado por fila es constante
+        needed = (self.n_rows + 7) // 8
+        if self._owned and needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity + self._capacity // 4)
+
+        def grow(bits):
+            grown = np.zeros(capacity, dtype=np.uint8)
+            grown[:len(bits)] = bits
+            return grown
+
+        self._bitsets = {key: grow(bits) for key, bits in self._bitsets.items()}
+        self._bathrooms_bitsets = {key: grow(bits) for key, bits in self._bathrooms_bitsets.items()}
+        if self._alive is not None:
+            self._alive = grow(self._alive)
+        self._capacity = capacity
+        self._owned = True
+
+    def append(self, datos, rows, columns=()):
+        """Agrega al índice las filas ``rows``, que se acaban de agregar al final de ``datos``.
+
+        ``columns`` son columnas one-hot nuevas (por ejemplo el estado de una
+        ciudad que no existía) para las que se crea un bitset.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        self.n_rows = len(datos)
+        self._reserve()
+        for col in columns:
+            self._bitsets.setdefault(col, self._empty_bitset())
+        for col, bits in self._bitsets.items():
+            self._set(bits, rows[datos.column(col, rows) == 1])
+
+        baths = datos.column("bathrooms", rows)
+        for value in np.unique(baths):
+            bits = self._bathrooms_bitsets.setdefault(float(value), self._empty_bitset())
+            self._set(bits, rows[baths == value])
+        if self._alive is not None:
+            self._set(self._alive, rows)
+
+        self._square_feet = datos.column("square_feet")
+        order = np.concatenate([self._recent_order, rows])
+        values = self._square_feet[order]
+        sort = np.argsort(values, kind="stable")
+        self._recent_order, self._recent_sorted = order[sort], values[sort]
+        if len(self._recent_order) > len(self._square_feet_order) // 8:
+            # Fusión con el índice principal (costo amortizado constante por fila agregada)
+            order = np.concatenate([self._square_feet_order, self._recent_order])
+            sort = np.argsort(self._square_feet[order], kind="stable")
+            self._square_feet_order = order[sort]
+            self._square_feet_sorted = self._square_feet[self._square_feet_order]
+            self._recent_order = self._recent_order[:0]
+            self._recent_sorted = self._recent_sorted[:0]
+
+    def remove(self, rows):
+        """Da de baja las filas ``rows``: dejan de aparecer en ``resolve`` y ``refine``."""
+        if self._alive is None:
+            self._reserve()
+            self._alive = self._empty_bitset()
+            self._alive[:(self.n_rows + 7) // 8] = np.packbits(np.ones(self.n_rows, dtype=bool))
+        rows = np.asarray(rows, dtype=np.int64)
+        np.bitwise_and.at(self._alive, rows >> 3, ~(0x80 >> (rows & 7)).astype(np.uint8))
+
+    def resolve(self, state=None, bathrooms=None, square_feet_range=None, amenities=None, rows=None):
+        """Devuelve los índices (ordenados) de las filas que cumplen los filtros.
+
+        ``rows`` (índices ordenados, por ejemplo los de una región del mapa)
+        restringe el resultado a esas filas; los bits se prueban solo en ellas.
+        """
+        bitsets = []
+        if state:
+            bitsets.append(self._bitsets.get(state, self._empty_bitset()))
+        if bathrooms:
+            bitsets.append(self._bathrooms_bitsets.get(float(bathrooms), self._empty_bitset()))
+        if amenities:
+            for amenity in amenities:
+                bitsets.append(self._bitsets.get(amenity, self._empty_bitset()))
+
+        if rows is not None:
+            rows = self._alive_rows(np.asarray(rows, dtype=np.int64))
+            for bits in bitsets:
+                rows = rows[self._test(bits, rows)]
+            if square_feet_range:
+                values = self._square_feet[rows]
+                rows = rows[(values >= square_feet_range[0]) & (values <= square_feet_range[1])]
+            return rows
+
+        if not bitsets:
+            if square_feet_range:
+                return self._square_feet_rows(*square_feet_range)
+            return self._alive_rows(np.arange(self.n_rows))
+        if self._alive is not None:
+            bitsets.append(self._alive)
+
+        # AND entre todos los bitsets seleccionados
+        bits = bitsets[0].copy()
+        for other in bitsets[1:]:
+            np.bitwise_and(bits, other, out=bits)
+        rows = np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+        # El rango de tamaño se aplica solo sobre las filas candidatas
+        if square_feet_range:
+            values = self._square_feet[rows]
+            rows = rows[(values >= square_feet_range[0]) & (values <= square_feet_range[1])]
+        return rows
+
+    def refine(self, rows, amenities=None):
+        """Restringe ``rows`` (ya resueltas) a las filas que tienen todas las ``amenities``."""
+        if not amenities:
+            return rows
+        keep = np.ones(len(rows), dtype=bool)
+        for amenity in amenities:
+            keep &= self._test(self._bitsets.get(amenity, self._empty_bitset()), rows)
+        return rows[keep]
+
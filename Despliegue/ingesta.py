@@ -0,0 +1,265 @@
+"""Ingesta incremental de anuncios nuevos o dados de baja sin reconstruir el tablero.
+
+Un delta es un CSV con el formato de ``datos.csv`` (Windows-1252, separado
+por ``;``, con el ``id`` del anuncio como primera columna) con anuncios nuevos
+o actualizados, o un CSV ``*.bajas.csv`` con los anuncios que se retiran
+(columnas ``id`` y/o ``fila``). Cada delta se limpia igual que en
+``Preparacion_Datos.ipynb``, se codifica contra el vocabulario del conjunto
+cargado (las ciudades o estados nuevos se agregan como categorías nuevas) y
+se aplica sobre las estructuras del tablero en tiempo proporcional al tamaño
+del delta:
+
+- ``CompactDataset.append`` agrega las filas al final de las columnas;
+- ``FilterEngine.append`` y ``FilterEngine.remove`` actualizan los bitsets;
+- ``AggregateCube.update`` suma o resta las filas en las celdas de los cubos
+  de KPIs y de correlaciones;
+- ``PriceTiles.update`` hace lo mismo en la pirámide del mapa de calor;
+- ``SpatialIndex.update`` agrega las filas nuevas al índice espacial.
+
+Las bajas no mueven filas: quedan marcadas en el motor de filtros. Las filas de
+``datosPreparados.csv`` no tienen ``id``: se retiran por su posición en el
+archivo (0, 1, ...) con la columna ``fila`` de ``*.bajas.csv``. La columna
+``id`` se refiere siempre a anuncios agregados por un delta; un ``id`` nunca se
+interpreta como posición.
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Formato de datos.csv (el mismo que lee Tarea 2 y 3/preparacion.py)
+READ_OPTIONS = {"index_col": 0, "encoding": "Windows-1252", "sep": ";"}
+
+# Tipos de precio que la preparación descarta para que todos los precios sean mensuales
+EXCLUDED_PRICE_TYPES = ["Weekly", "Monthly|Weekly"]
+
+
+def read_delta(path):
+    """Lee un delta de anuncios nuevos o actualizados (formato de ``datos.csv``)."""
+    return pd.read_csv(path, **READ_OPTIONS)
+
+
+def clean(altas):
+    """Limpieza de ``Preparacion_Datos.ipynb``: ``dropna`` y solo precios mensuales."""
+    altas = altas.dropna()
+    return altas[~altas["price_type"].isin(EXCLUDED_PRICE_TYPES)]
+
+
+class ReadWriteLock:
+    """Candado de varios lectores y un escritor.
+
+    Los callbacks del tablero leen en paralelo; la ingesta espera a que
+    terminen los lectores en curso y bloquea a los nuevos mientras escribe.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            # Los escritores en espera tienen prioridad para que la ingesta no espere indefinidamente
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class DeltaIngestor:
+    """Aplica deltas de anuncios sobre el conjunto, el motor de filtros y los cubos del tablero.
+
+    ``cubes`` son los objetos con un método ``update(rows, sign)`` (el cubo de
+    KPIs, el motor de correlaciones, las teselas del mapa y el índice
+    espacial). Las lecturas que deben ver un estado consistente se hacen
+    dentro de ``with ingestor.lock.read():``.
+    """
+
+    def __init__(self, datos, motor, cubes):
+        self.datos = datos
+        self.motor = motor
+        self.cubes = list(cubes)
+        self.lock = ReadWriteLock()
+        self._n_base = len(datos)
+        self._rows = {}  # id -> fila de los anuncios agregados por deltas (-1 = retirado)
+        self._retired_base = set()  # filas de datosPreparados ya retiradas
+        self._applied = set()
+
+    def _lookup(self, ids, filas):
+        # Filas vigentes de los ids (anuncios de deltas) y de las posiciones de datosPreparados
+        rows = [self._rows.get(id_, -1) for id_ in ids]
+        rows += [fila for fila in filas if fila not in self._retired_base]
+        rows = np.asarray(rows, dtype=np.int64)
+        return np.unique(rows[rows >= 0])
+
+    def _encode(self, altas):
+        # Columnas numéricas, códigos por familia, máscara de amenities y categorías nuevas de las filas
+        # nuevas. No modifica el conjunto: las categorías nuevas reciben los códigos que tendrán al
+        # registrarlas con add_label, en el mismo orden
+        datos = self.datos
+        numeric = {}
+        for name in datos.numeric_columns:
+            if name == "longitud_descripcion":
+                numeric[name] = altas["body"].astype(str).str.len().to_numpy()
+            else:
+                # Un valor no numérico falla aquí, antes de tocar el tablero
+                numeric[name] = pd.to_numeric(altas[name]).to_numpy()
+
+        codes, new_labels = {}, {}
+        for family in datos.families:
+            values = altas[family].astype(str)
+            labels = datos.labels(family)
+            new_labels[family] = [label for label in values.unique() if label not in labels]
+            codes[family] = pd.Index(list(labels) + new_labels[family]).get_indexer(values)
+
+        # Amenities separadas una sola vez y marcadas con su bit en la máscara (las que el tablero no
+        # usa se ignoran)
+        items = altas["amenities"].fillna("").reset_index(drop=True).str.split(",").explode()
+        bits = pd.Index(datos.amenities).get_indexer(items.str.strip())
+        known = bits >= 0
+        mask = np.zeros(len(altas), dtype=np.uint32)
+        np.bitwise_or.at(mask, items.index.to_numpy()[known], np.uint32(1) << bits[known].astype(np.uint32))
+        return numeric, codes, mask, new_labels
+
+    def _remove(self, ids, filas):
+        rows = self._lookup(ids, filas)
+        if len(rows):
+            for cube in self.cubes:
+                cube.update(rows, sign=-1)
+            self.motor.remove(rows)
+        for id_ in ids:
+            if id_ in self._rows:
+                self._rows[id_] = -1
+        self._retired_base.update(filas)
+        return len(rows)
+
+    def ingest(self, altas=None, bajas=(), filas=()):
+        """Aplica un delta: ``altas`` (DataFrame con el formato de ``datos.csv``) y las bajas.
+
+        ``bajas`` son ``id`` de anuncios agregados por deltas anteriores (los
+        desconocidos se ignoran) y ``filas`` posiciones de filas de
+        ``datosPreparados``. Un anuncio de ``altas`` cuyo ``id`` ya existe
+        reemplaza al anterior, salvo que la limpieza lo descarte: en ese caso
+        el anterior se conserva. Devuelve un resumen con las filas agregadas,
+        las retiradas (incluidas las reemplazadas) y las columnas one-hot
+        nuevas.
+        """
+        altas = altas if altas is not None else pd.DataFrame()
+        if len(altas):
+            required = [name for name in self.datos.numeric_columns if name != "longitud_descripcion"]
+            missing = set(required + self.datos.families + ["amenities", "body"]) - set(altas.columns)
+            if missing:
+                raise ValueError(f"Al delta le faltan las columnas {sorted(missing)}")
+        altas = altas[~altas.index.duplicated(keep="last")]
+        bajas = [int(id_) for id_ in bajas]
+        filas = sorted({int(fila) for fila in filas})
+        if filas and not 0 <= filas[0] <= filas[-1] < self._n_base:
+            raise ValueError(f"Las filas de datosPreparados van de 0 a {self._n_base - 1}")
+
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(altas).to_numpy().tobytes() if len(altas) else b"")
+        digest.update(np.asarray(bajas, dtype=np.int64).tobytes())
+        digest.update(np.asarray(filas, dtype=np.int64).tobytes())
+
+        with self.lock.write():
+            # Primero se limpia y se codifica el delta completo; si falla, el tablero queda intacto y el
+            # mismo delta se puede volver a aplicar
+            new_columns = []
+            altas = clean(altas) if len(altas) else altas
+            if len(altas):
+                numeric, codes, mask, new_labels = self._encode(altas)
+
+            # Los anuncios actualizados que pasaron la limpieza se retiran y se vuelven a agregar con sus
+            # datos nuevos
+            removed = self._remove(bajas + [int(id_) for id_ in altas.index], filas)
+            if len(altas):
+                for family, labels in new_labels.items():
+                    for label in labels:
+                        self.datos.add_label(family, label)
+                        new_columns.append(f"{family}_{label}")
+                start = len(self.datos)
+                self.datos.append(numeric, codes, mask)
+                rows = np.arange(start, len(self.datos))
+                self.motor.append(self.datos, rows, [col for col in new_columns if col.startswith("state_")])
+                for cube in self.cubes:
+                    cube.update(rows, sign=1)
+                self._rows.update(zip((int(id_) for id_ in altas.index), rows.tolist()))
+
+            self.datos.version = hashlib.sha256(f"{self.datos.version}:{digest.hexdigest()}".encode()).hexdigest()
+
+        return {"altas": len(altas), "bajas": removed, "columnas_nuevas": new_columns}
+
+    def ingest_directory(self, directory):
+        """Aplica en orden de nombre los deltas de ``directory`` que todavía no se aplicaron.
+
+        Los archivos deben aparecer completos en el directorio (escribirlos
+        en otro lugar y moverlos). Devuelve los nombres aplicados.
+        """
+        applied = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".csv") or name in self._applied:
+                continue
+            path = os.path.join(directory, name)
+            if name.endswith(".bajas.csv"):
+                bajas = pd.read_csv(path)
+                if "id" not in bajas.columns and "fila" not in bajas.columns:
+                    raise ValueError(f"{name} no tiene columnas 'id' ni 'fila'")
+                self.ingest(bajas=bajas.get("id", pd.Series(dtype=float)).dropna(),
+                            filas=bajas.get("fila", pd.Series(dtype=float)).dropna())
+            else:
+                self.ingest(altas=read_delta(path))
+            self._applied.add(name)
+            applied.append(name)
+        return applied
+
+
+def watch_directory(directory, current, interval=60, on_ingest=None):
+    """Revisa ``directory`` cada ``interval`` segundos en un hilo de fondo.
+
+    ``current`` devuelve el ``DeltaIngestor`` de la versión vigente del
+    tablero (cambia cuando se recargan los datos). ``on_ingest`` se llama con
+    los nombres aplicados cada vez que se aplica al menos un delta.
+    """
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                applied = current().ingest_directory(directory)
+            except (OSError, ValueError) as error:
+                # El archivo se vuelve a intentar en la siguiente revisión
+                print(f"No se pudo aplicar un delta de {directory}: {error}", file=sys.stderr)
+                continue
+            if applied and on_ingest is not None:
+                on_ingest(applied)
+
+    thread = threading.Thread(target=loop, name="ingesta-deltas", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él se sirven solo las variantes gzip y sin comprimir
+    brotli = None
+
+# Un año: el URL del mapa cambia con cada versión del archivo, así que la respuesta no caduca
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class MapAsset:
+    """Documento del mapa (``mapa_precios.html``) servido como recurso estático cacheable.
+
+    El archivo se lee y se comprime (gzip y, si está instalado, brotli) al
+    crear el recurso, es decir al construir la versión del tablero en el
+    hilo de recarga, así que ninguna solicitud paga la compresión. La huella
+    es un hash del contenido leído.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            content = f.read()
+        self.fingerprint = hashlib.sha256(content).hexdigest()[:16]
+        self.variants = {"identity": content, "gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(content, mode=brotli.MODE_TEXT)
+
+    def response(self):
+        """Respuesta a la solicitud en curso, con ``ETag``, ``Cache-Control`` y ``304`` si no cambió."""
+        variants = self.variants
+        encoding = next((name for name in ("br", "gzip")
+                         if name in variants and request.accept_encodings[name] > 0), "identity")
+        etag = self.fingerprint if encoding == "identity" else f"{self.fingerprint}-{encoding}"
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = Response(variants[encoding], mimetype="text/html")
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Vary"] = "Accept-Encoding"
+        # Con la huella vigente en el URL la respuesta es inmutable; sin ella se revalida cada vez
+        if request.args.get("v") == self.fingerprint:
+            response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+def register_map_route(server, context, path="/mapa/precios.html"):
+    """Registra ``GET path`` en el servidor Flask del tablero.
+
+    ``context()`` devuelve el ``MapAsset`` de la versión vigente; el layout
+    apunta el iframe del mapa a ``path?v=<huella>``.
+    """
+    @server.route(path)
+    def price_map():
+        return context().response()
+
+    return price_map
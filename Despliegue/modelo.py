@@ -0,0 +1,153 @@
+import hashlib
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+# Variables numéricas del modelo; el resto son indicadores one-hot (ciudad, estado, amenities)
+NUMERIC_FEATURES = ["bathrooms", "square_feet"]
+
+# Marca (con la versión del formato) del artefacto que escribe Modelamiento/artefacto_modelo.py
+ARTIFACT_MAGIC = b"PRECIO01"
+
+
+def schema_hash(columns):
+    """Hash de las columnas de ``datosPreparados`` (debe coincidir con ``artefacto_modelo.schema_hash``)."""
+    return hashlib.sha256("\n".join(columns).encode("utf-8")).hexdigest()[:16]
+
+
+class PriceModel:
+    """Motor de estimación de precios compilado desde ``modeloFinal.csv``.
+
+    Los coeficientes se guardan en un vector denso y los nombres de las
+    variables en un mapa nombre -> índice, de modo que cada variable se busca
+    en O(1). Un anuncio se estima sumando los coeficientes de sus variables; un
+    lote de N anuncios se estima con un producto matriz-vector disperso. Las
+    variables que el modelo no conoce (por ejemplo las ciudades que agregan
+    los deltas de la ingesta) cuentan con coeficiente 0.
+
+    Con la lista de ``amenities`` del tablero se verifica que cada variable
+    del modelo se pueda codificar (numérica de ``NUMERIC_FEATURES``, ciudad,
+    estado o amenity): una variable como ``bedrooms`` o ``time`` se estimaría
+    siempre como 0, así que el modelo se rechaza con ``ValueError``.
+    """
+
+    def __init__(self, variables, coefficients, amenities=None):
+        self.variables = list(variables)
+        if amenities is not None:
+            amenities = set(amenities)
+            unknown = [name for name in self.variables if name not in NUMERIC_FEATURES
+                       and not name.startswith(("cityname_", "state_")) and name not in amenities]
+            if unknown:
+                raise ValueError(f"El modelo usa variables que el simulador no puede codificar: {unknown}")
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.index = {name: i for i, name in enumerate(self.variables)}
+        self._vocabulary = pd.Index(self.variables)
+        # Coeficiente extra en cero para las variables que el modelo no conoce
+        self._coefficients_ext = np.append(self.coefficients, 0.0)
+
+    @classmethod
+    def from_frame(cls, coeficientes, amenities=None):
+        """Compila el DataFrame de ``modeloFinal.csv`` (columnas ``Variables`` y ``Coeficientes``)."""
+        return cls(coeficientes["Variables"], coeficientes["Coeficientes"], amenities)
+
+    @classmethod
+    def load(cls, path, columns=None, amenities=None):
+        """Carga el modelo desde el artefacto binario ``.bin`` o, con otra extensión, desde el CSV de coeficientes.
+
+        Si se pasan las ``columns`` del conjunto de datos del tablero, se
+        verifica que coincidan con las que se usaron para entrenar el modelo
+        (deben ser las del archivo, antes de aplicar deltas). Con
+        ``amenities`` se verifica que todas las variables se puedan codificar.
+        """
+        if not path.endswith(".bin"):
+            return cls.from_frame(pd.read_csv(path), amenities)
+
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(ARTIFACT_MAGIC)] != ARTIFACT_MAGIC:
+            raise ValueError(f"{path} no es un artefacto de modelo compatible")
+        offset = len(ARTIFACT_MAGIC) + 4
+        (header_length,) = struct.unpack_from("<I", data, len(ARTIFACT_MAGIC))
+        header = json.loads(data[offset:offset + header_length])
+        if columns is not None and header["schema_hash"] != schema_hash(columns):
+            raise ValueError(f"{path} se entrenó con otras columnas de datosPreparados")
+        coefficients = np.frombuffer(data, dtype="<f8", count=len(header["variables"]), offset=offset + header_length)
+        return cls(header["variables"], coefficients, amenities)
+
+    def coefficient(self, name):
+        """Coeficiente de ``name`` (0 si el modelo no usa esa variable)."""
+        i = self.index.get(name)
+        return 0.0 if i is None else self.coefficients[i]
+
+    def score(self, bathrooms, square_feet, city=None, state=None, amenities=None):
+        """Precio estimado de un anuncio."""
+        price = self.coefficient("bathrooms") * bathrooms + self.coefficient("square_feet") * square_feet
+        for name in [city, state, *(amenities or [])]:
+            if name:
+                price += self.coefficient(name)
+        return price
+
+    def _lookup(self, names):
+        # Índice de cada nombre en el vocabulario (el último índice si no existe)
+        positions = self._vocabulary.get_indexer(pd.Index(names, dtype=object))
+        positions[positions < 0] = len(self.variables)
+        return positions
+
+    def score_batch(self, bathrooms, square_feet, cities=None, states=None, amenities=None):
+        """Precios estimados de un lote de N anuncios.
+
+        ``cities`` y ``states`` son arreglos de N nombres de variable
+        (``cityname_*``, ``state_*``, o ``None``) y ``amenities`` una lista de N
+        listas con los nombres de las amenities de cada anuncio.
+        """
+        prices = (self.coefficient("bathrooms") * np.asarray(bathrooms, dtype=np.float64)
+                  + self.coefficient("square_feet") * np.asarray(square_feet, dtype=np.float64))
+        for names in (cities, states):
+            if names is not None:
+                prices += self._coefficients_ext[self._lookup(names)]
+
+        if amenities is not None:
+            # Producto disperso: una entrada (fila, amenity) por cada amenity marcada
+            lengths = np.fromiter((len(row) if row else 0 for row in amenities), dtype=np.int64, count=len(prices))
+            flat = [name for row in amenities if row for name in row]
+            if flat:
+                row_ids = np.repeat(np.arange(len(prices)), lengths)
+                prices += np.bincount(row_ids, weights=self._coefficients_ext[self._lookup(flat)],
+                                      minlength=len(prices))
+        return prices
+
+    def score_matrix(self, X, columns):
+        """Precios estimados para una matriz de diseño ``X`` (densa o CSR de scipy).
+
+        ``columns`` son los nombres de las columnas de ``X``; las que el modelo
+        no usa cuentan con coeficiente 0. Con una matriz CSR el producto solo
+        recorre los valores distintos de cero.
+        """
+        return np.asarray(X @ self._coefficients_ext[self._lookup(columns)]).ravel()
+
+
+def simulator_payload(model, city_states):
+    """Datos del Store ``sim-modelo`` con los que ``assets/simulador.js`` replica ``PriceModel.score``."""
+    return {
+        "coeficientes": dict(zip(model.variables, model.coefficients.tolist())),
+        "estados": city_states,
+    }
+
+
+def city_state_map(datos):
+    """Estado más frecuente de cada ciudad (``cityname_*`` -> ``state_*``) en el conjunto de datos."""
+    city_codes = datos.codes("cityname").astype(np.int64)
+    state_codes = datos.codes("state").astype(np.int64)
+    valid = (city_codes >= 0) & (state_codes >= 0)
+    n_states = len(datos.labels("state"))
+    counts = np.bincount(city_codes[valid] * n_states + state_codes[valid],
+                         minlength=len(datos.labels("cityname")) * n_states)
+    counts = counts.reshape(len(datos.labels("cityname")), n_states)
+
+    mapa = {}
+    for code, city in enumerate(datos.labels("cityname")):
+        if counts[code].any():
+            mapa[f"cityname_{city}"] = f"state_{datos.labels('state')[counts[code].argmax()]}"
+    return mapa
@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+import time
+
+
+class Registry:
+    """Versión vigente de los datos, el modelo y el mapa del tablero, con recarga en caliente.
+
+    ``build`` arma una versión completa (conjunto, índices, cubos, modelo,
+    mapa) a partir de los archivos de ``paths``. Un hilo de fondo revisa esos
+    archivos cada ``interval`` segundos y, cuando cambian, construye la nueva
+    versión sin tocar la vigente; al terminar la publica con una sola
+    asignación de ``current``. Cada solicitud lee ``registry.current`` una
+    vez y trabaja con esa versión hasta el final, así que las solicitudes en
+    curso terminan sobre la versión anterior y el servidor no deja de
+    responder durante la recarga.
+    """
+
+    def __init__(self, build, paths, interval=5.0):
+        self._build = build
+        self.paths = list(paths)
+        self.interval = interval
+        self.generation = 0
+        self._listeners = []
+        self._build_lock = threading.Lock()
+        self._stamp = self._stamps()
+        self.current = build()
+
+    def _stamps(self):
+        # Tamaño y fecha de modificación de cada archivo (None si no existe)
+        stamps = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def on_swap(self, listener):
+        """Registra ``listener(anterior, nueva)``, que se llama después de publicar cada versión nueva."""
+        self._listeners.append(listener)
+        return listener
+
+    def reload(self):
+        """Construye una versión con el contenido actual de los archivos y la publica."""
+        with self._build_lock:
+            stamp = self._stamps()
+            version = self._build()
+            previous, self.current = self.current, version
+            self._stamp = stamp
+            self.generation += 1
+        for listener in self._listeners:
+            listener(previous, version)
+        return version
+
+    def watch(self):
+        """Revisa los archivos en un hilo de fondo y recarga cuando cambian.
+
+        Un cambio se aplica cuando los archivos se mantienen iguales durante
+        dos revisiones seguidas, para no construir desde un archivo a medio
+        escribir. Si la construcción falla se sigue sirviendo la versión
+        vigente y se vuelve a intentar cuando los archivos cambien de nuevo.
+        """
+        def loop():
+            pending = None
+            while True:
+                time.sleep(self.interval)
+                stamp = self._stamps()
+                if stamp == self._stamp:
+                    pending = None
+                elif stamp != pending:
+                    pending = stamp
+                else:
+                    try:
+                        self.reload()
+                    except Exception as error:
+                        print(f"No se pudo cargar la nueva versión: {error!r}", file=sys.stderr)
+                        self._stamp = stamp
+                    pending = None
+
+        thread = threading.Thread(target=loop, name="registro-versiones", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,262 @@
+"""Mapa de calor de precios agregado en el servidor por teselas.
+
+Cada anuncio se ubica en una grilla Web Mercator de ``2**(MAX_ZOOM + BIN_BITS)``
+celdas por lado y se identifica con su código de Morton (bits de x e y
+intercalados). Con ese orden las celdas de una tesela ``(z, x, y)`` ocupan un
+rango contiguo de códigos, así que una tesela se responde con dos búsquedas
+binarias sobre datos ordenados y su respuesta tiene a lo sumo
+``2**BIN_BITS x 2**BIN_BITS`` celdas (cantidad de anuncios y suma de precios),
+sin importar cuántos anuncios haya.
+
+- Sin filtros se usa una pirámide precalculada: por cada nivel de zoom, las
+  celdas no vacías con sus sumas.
+- Con filtros, las filas de la selección (las del motor de filtros) se ordenan
+  por código una sola vez por firma de filtros y cada tesela es un tramo de
+  ese orden.
+"""
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import Response, request
+
+from cache_resultados import filter_signature
+
+# Celdas por lado de cada tesela (2**5 = 32) y zoom máximo de las teselas
+BIN_BITS = 5
+MAX_ZOOM = 16
+
+# Máximo de teselas por vista del mapa
+MAX_TILES = 64
+
+# Latitud máxima de la proyección Web Mercator
+MAX_LATITUDE = 85.05112878
+
+
+def mercator(latitude, longitude):
+    """Coordenadas Web Mercator normalizadas a ``[0, 1)`` (x hacia el este, y hacia el sur)."""
+    latitude = np.clip(np.asarray(latitude, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    sin = np.sin(np.radians(latitude))
+    x = (np.asarray(longitude, dtype=np.float64) + 180.0) / 360.0
+    y = 0.5 - np.log((1 + sin) / (1 - sin)) / (4 * np.pi)
+    below_one = np.nextafter(1.0, 0.0)
+    return np.clip(x, 0.0, below_one), np.clip(y, 0.0, below_one)
+
+
+def inverse_mercator(x, y):
+    """Latitud y longitud de coordenadas Web Mercator normalizadas."""
+    longitude = np.asarray(x, dtype=np.float64) * 360.0 - 180.0
+    latitude = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y, dtype=np.float64)))))
+    return latitude, longitude
+
+
+def _spread(values):
+    # Intercala un cero entre cada bit (hasta 32 bits -> 64 bits)
+    v = np.asarray(values, dtype=np.uint64) & np.uint64(0x00000000FFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def _compact(values):
+    # Inversa de ``_spread``: toma los bits pares
+    v = np.asarray(values, dtype=np.uint64) & np.uint64(0x5555555555555555)
+    for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+                        (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)):
+        v = (v | (v >> np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def morton(ix, iy):
+    """Código de Morton de las celdas ``(ix, iy)``."""
+    return _spread(ix) | (_spread(iy) << np.uint64(1))
+
+
+def tiles_for_viewport(west, south, east, north, zoom):
+    """Teselas ``(x, y)`` del nivel ``zoom`` que cubren la vista (a lo sumo ``MAX_TILES``)."""
+    (x0, x1), (y1, y0) = mercator([south, north], [west, east])
+    n = 2 ** zoom
+    xs = range(int(x0 * n), int(x1 * n) + 1)
+    ys = range(int(y0 * n), int(y1 * n) + 1)
+    return [(x, y) for y in ys for x in xs][:MAX_TILES]
+
+
+def _group(keys, prices):
+    # Celdas distintas de ``keys`` (ordenadas) con su cantidad y suma de precios
+    if not len(keys):
+        return keys, np.zeros(0), np.zeros(0)
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    counts = np.diff(np.append(starts, len(keys))).astype(np.float64)
+    return keys[starts], counts, np.add.reduceat(prices, starts)
+
+
+class PriceTiles:
+    """Agregados de anuncios y precios por celda para las teselas del mapa de calor.
+
+    Sin filtros cada tesela sale de la pirámide precalculada (mientras sus
+    celdas sean bastante menos que los anuncios; en los niveles más finos se
+    usa el camino con selección). Implementa ``update(rows, sign)`` como los
+    cubos, así que la ingesta de deltas la mantiene al día.
+    """
+
+    def __init__(self, datos, motor, max_zoom=MAX_ZOOM, bin_bits=BIN_BITS, selections=8):
+        self.datos = datos
+        self.motor = motor
+        self.max_zoom = max_zoom
+        self.bin_bits = bin_bits
+        self.level = max_zoom + bin_bits
+        self._selections = OrderedDict()
+        self._max_selections = selections
+        self._lock = threading.Lock()
+
+        keys, prices = self._sorted(self.motor.resolve())
+        # Pirámide: celdas del nivel de cada zoom de tesela (zoom + bin_bits), hasta el primer nivel
+        # en que agregar ya no reduce bastante el número de celdas
+        self._pyramid = {}
+        for zoom in range(max_zoom + 1):
+            cells = _group(keys >> self._shift(zoom + bin_bits), prices)
+            if len(cells[0]) > max(len(keys) // 4, 1):
+                break
+            self._pyramid[zoom] = cells
+
+    def _shift(self, level):
+        # Bits que se descartan del código completo para llegar a las celdas de ``level``
+        return np.uint64(2 * (self.level - level))
+
+    def _keys(self, rows):
+        x, y = mercator(self.datos.column("latitude", rows), self.datos.column("longitude", rows))
+        scale = float(2 ** self.level)
+        return morton((x * scale).astype(np.uint64), (y * scale).astype(np.uint64))
+
+    def _sorted(self, rows):
+        # Códigos completos y precios de ``rows`` ordenados por código
+        keys = self._keys(rows)
+        order = np.argsort(keys, kind="stable")
+        return keys[order], self.datos.column("price", rows).astype(np.float64)[order]
+
+    def update(self, rows, sign=1):
+        """Suma (``sign=1``) o resta (``sign=-1``) las filas ``rows`` en la pirámide.
+
+        El costo depende de las filas y de las celdas de la pirámide, no del
+        total de anuncios. Las selecciones guardadas se descartan.
+        """
+        keys, prices = self._sorted(np.asarray(rows, dtype=np.int64))
+        for zoom, (cells, counts, sums) in self._pyramid.items():
+            new_cells, new_counts, new_sums = _group(keys >> self._shift(zoom + self.bin_bits), sign * prices)
+            merged, position = np.unique(np.concatenate([cells, new_cells]), return_inverse=True)
+            merged_counts = np.zeros(len(merged))
+            merged_sums = np.zeros(len(merged))
+            np.add.at(merged_counts, position, np.concatenate([counts, sign * new_counts]))
+            np.add.at(merged_sums, position, np.concatenate([sums, new_sums]))
+            self._pyramid[zoom] = (merged, merged_counts, merged_sums)
+        with self._lock:
+            self._selections.clear()
+
+    def selection(self, signature, resolve):
+        """Códigos y precios ordenados de las filas de la selección ``signature`` (con caché).
+
+        ``resolve()`` devuelve las filas de la selección; solo se llama si la
+        selección no está guardada, así que los filtros se resuelven una vez
+        por firma y no una vez por tesela.
+        """
+        with self._lock:
+            cached = self._selections.get(signature)
+            if cached is not None:
+                self._selections.move_to_end(signature)
+                return cached
+        cached = self._sorted(resolve())
+        with self._lock:
+            self._selections[signature] = cached
+            while len(self._selections) > self._max_selections:
+                self._selections.popitem(last=False)
+        return cached
+
+    def tile(self, zoom, x, y, selection=None):
+        """Celdas no vacías de la tesela: latitud y longitud del centro, cantidad y precio promedio.
+
+        ``selection`` es el resultado de :meth:`selection`; con ``None`` se
+        usa la pirámide (todos los anuncios vigentes).
+        """
+        level = zoom + self.bin_bits
+        first = int(morton(x, y)) << (2 * self.bin_bits)
+        last = first + (1 << (2 * self.bin_bits))
+        if selection is None:
+            cells, counts, sums = self._pyramid[zoom]
+            start, stop = np.searchsorted(cells, [first, last])
+            cells, counts, sums = cells[start:stop], counts[start:stop], sums[start:stop]
+        else:
+            keys, prices = selection
+            shift = int(self._shift(level))
+            start, stop = np.searchsorted(keys, [first << shift, last << shift])
+            cells, counts, sums = _group(keys[start:stop] >> np.uint64(shift), prices[start:stop])
+
+        present = counts > 0
+        cells, counts, sums = cells[present], counts[present], sums[present]
+        size = float(2 ** level)
+        latitude, longitude = inverse_mercator((_compact(cells) + 0.5) / size,
+                                               (_compact(cells >> np.uint64(1)) + 0.5) / size)
+        return {
+            "lat": np.round(latitude, 5).tolist(),
+            "lon": np.round(longitude, 5).tolist(),
+            "count": counts.astype(np.int64).tolist(),
+            "price": np.round(sums / counts, 2).tolist(),
+        }
+
+    def has_pyramid(self, zoom):
+        """Indica si las teselas de ``zoom`` sin filtros salen de la pirámide."""
+        return zoom in self._pyramid
+
+
+def tile_payload(tiles, zoom, x, y, state, bathrooms, square_feet_range, amenities, cache):
+    """Celdas de la tesela ``(zoom, x, y)`` para una selección de filtros, con caché por tesela y firma.
+
+    Devuelve el JSON de la tesela como texto. ``cache`` es un ``ResultCache``;
+    la firma incluye la versión de los datos.
+    """
+    signature = filter_signature(state, bathrooms, square_feet_range, amenities, None, tiles.datos.version)
+    key = ("tesela", zoom, x, y, signature)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    filtered = bool(state or bathrooms or square_feet_range or amenities)
+    if filtered or not tiles.has_pyramid(zoom):
+        selection = tiles.selection(
+            signature, lambda: tiles.motor.resolve(state, bathrooms, square_feet_range, amenities))
+        cells = tiles.tile(zoom, x, y, selection)
+    else:
+        cells = tiles.tile(zoom, x, y)
+    payload = json.dumps({"z": zoom, "x": x, "y": y, **cells}, separators=(",", ":"))
+    cache.put(key, payload, len(payload))
+    return payload
+
+
+def register_tile_route(server, context, cache):
+    """Registra ``GET /api/mapa/teselas/<z>/<x>/<y>`` en el servidor Flask del tablero.
+
+    Los filtros van como parámetros: ``state``, ``bathrooms``, ``min`` y
+    ``max`` (rango de tamaño) y ``amenities`` separadas por coma.
+    ``context()`` devuelve ``(tiles, lock)`` de la versión vigente, donde
+    ``lock`` es el candado de lectura de la ingesta.
+    """
+    @server.route("/api/mapa/teselas/<int:z>/<int:x>/<int:y>")
+    def price_tile(z, x, y):
+        tiles, lock = context()
+        if not 0 <= z <= tiles.max_zoom or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return Response(json.dumps({"error": "Tesela fuera de rango"}), status=404,
+                            mimetype="application/json")
+        low, high = request.args.get("min", type=float), request.args.get("max", type=float)
+        square_feet_range = [low if low is not None else -math.inf, high if high is not None else math.inf] \
+            if low is not None or high is not None else None
+        amenities = [a for a in request.args.get("amenities", "").split(",") if a]
+        with lock.read():
+            payload = tile_payload(tiles, z, x, y, request.args.get("state"), request.args.get("bathrooms", type=float),
+                                   square_feet_range, amenities, cache)
+        response = Response(payload, mimetype="application/json")
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    return price_tile
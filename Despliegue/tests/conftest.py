@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Los módulos del tablero se importan por nombre desde Despliegue/, como en appDash.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AMENITIES = ["Pool", "Gym", "Parking", "AC"]
+
+
+def _one_hot(prefix, labels, codes):
+    # Columnas one-hot de una familia; código -1 = fila sin categoría
+    return {f"{prefix}_{label}": (codes == i).astype(int) for i, label in enumerate(labels)}
+
+
+def make_frame(n=3000, seed=0):
+    """DataFrame con el formato de ``datosPreparados.csv`` (columnas one-hot y numéricas)."""
+    rng = np.random.default_rng(seed)
+    state = rng.integers(-1, 3, n)
+    city = np.where(state >= 0, state, -1)
+    city[rng.random(n) < 0.05] = -1
+    return pd.DataFrame({
+        "title": [f"Anuncio {i}" for i in range(n)],
+        "bathrooms": rng.choice([1.0, 1.5, 2.0, 3.0], n),
+        "bedrooms": rng.integers(0, 5, n),
+        "price": rng.integers(500, 5000, n),
+        "square_feet": rng.integers(200, 3001, n),
+        "latitude": rng.uniform(25, 48, n),
+        "longitude": rng.uniform(-123, -70, n),
+        **_one_hot("pets_allowed", ["Cats", "Dogs", "No permitido"], rng.integers(0, 3, n)),
+        **_one_hot("has_photo", ["No", "Thumbnail", "Yes"], rng.integers(0, 3, n)),
+        **_one_hot("cityname", ["Austin", "Boston", "Chicago"], city),
+        **_one_hot("state", ["TX", "MA", "IL"], state),
+        **{amenity: (rng.random(n) < p).astype(int) for amenity, p in zip(AMENITIES, [0.3, 0.5, 0.2, 0.6])},
+        "longitud_descripcion": rng.integers(10, 2000, n),
+    })
+
+
+def reference_rows(frame, state=None, bathrooms=None, square_feet_range=None, amenities=None):
+    """Filas de ``frame`` que cumplen los filtros, calculadas con pandas como el tablero original."""
+    selected = np.ones(len(frame), dtype=bool)
+    if state:
+        selected &= (frame[state] == 1).to_numpy() if state in frame else False
+    if bathrooms:
+        selected &= (frame["bathrooms"] == bathrooms).to_numpy()
+    if square_feet_range:
+        selected &= frame["square_feet"].between(*square_feet_range).to_numpy()
+    for amenity in amenities or []:
+        selected &= (frame[amenity] == 1).to_numpy()
+    return np.flatnonzero(selected)
+
+
+@pytest.fixture
+def frame():
+    return make_frame()
+
+
+@pytest.fixture
+def amenities():
+    return list(AMENITIES)
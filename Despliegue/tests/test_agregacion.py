@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from agregacion import BOX_FAMILIES, DashboardAggregator
+from conftest import reference_rows
+from correlaciones import CorrelationEngine
+from cubo import KpiCube
+from datos_compactos import CompactDataset
+from filtros import FilterEngine
+
+STATES = ["state_TX", "state_MA", "state_IL"]
+
+
+def _aggregators(frame, amenities):
+    datos = CompactDataset.from_frame(frame, amenities)
+    motor = FilterEngine(datos, STATES, amenities)
+    columns = [col for col in datos.columns if col.startswith("has_") or col in amenities]
+    cubo = KpiCube(datos, motor, 200, 3000, 100)
+    correlaciones = CorrelationEngine(datos, motor, columns, 200, 3000, 100)
+    # Solo con las filas resueltas, y con el cubo de KPIs y el motor de correlaciones
+    return [DashboardAggregator(datos, motor, amenities, box_max_points=10_000),
+            DashboardAggregator(datos, motor, amenities, cubo=cubo, correlaciones=correlaciones,
+                                box_max_points=10_000)]
+
+
+def _combinations(amenities, n=60, seed=4):
+    rng = np.random.default_rng(seed)
+    ranges = [None, [200, 3000], [500, 1500], [540, 1230], [1000, 1000]]
+    for _ in range(n):
+        yield ([None, *STATES][rng.integers(4)], [None, 1, 2, 3][rng.integers(4)], ranges[rng.integers(5)],
+               [a for a in amenities if rng.random() < 0.25], ["photos", "pets", "otra"][rng.integers(3)])
+
+
+def test_aggregate_matches_pandas(frame, amenities):
+    heatmap_columns = [col for col in frame.columns if col.startswith("has_") or col in amenities]
+    for aggregator in _aggregators(frame, amenities):
+        for state, bathrooms, square_feet_range, chosen, category in _combinations(amenities):
+            result = aggregator.aggregate(state, bathrooms, square_feet_range, chosen, category)
+            filtered = frame.iloc[reference_rows(frame, state, bathrooms, square_feet_range, chosen)]
+
+            # Tarjetas de KPIs
+            assert result["total_cities"] == filtered.filter(like="cityname_").to_numpy().sum()
+            assert result["total_apartments"] == len(filtered)
+            if len(filtered):
+                assert result["avg_price"] == pytest.approx(filtered["price"].mean())
+                assert result["avg_description_length"] == pytest.approx(filtered["longitud_descripcion"].mean())
+
+            # Dormitorios
+            counts = result["bedroom_counts"]
+            assert dict(zip(counts["bedrooms"], counts["count"])) == filtered["bedrooms"].value_counts().to_dict()
+
+            # Boxplot: una caja por categoría presente con sus precios
+            if category not in BOX_FAMILIES:
+                assert result["box_stats"] is None
+            else:
+                columns = filtered.filter(like=BOX_FAMILIES[category] + "_")
+                groups = filtered["price"].groupby(columns.idxmax(axis=1)) if len(filtered) else []
+                assert len(result["box_stats"]) == len(groups)
+                for stats, (_, prices) in zip(result["box_stats"], groups):
+                    assert stats["count"] == len(prices) and stats["total"] == prices.sum()
+                    assert stats["median"] == prices.median()
+
+            # Correlaciones con el precio (sin filtrar por amenities)
+            columns = chosen or heatmap_columns
+            base = frame.iloc[reference_rows(frame, state, bathrooms, square_feet_range)]
+            expected = base[columns + ["price"]].corr()["price"].drop("price")
+            np.testing.assert_allclose(result["correlations"]["price"].to_numpy(), expected.to_numpy(),
+                                       atol=1e-9, equal_nan=True)
@@ -0,0 +1,47 @@
+import io
+import json
+
+import pytest
+from flask import Flask
+
+from api import register_scoring_api
+
+
+class _Model:
+    def score_batch(self, bathrooms, square_feet, cities, states, amenities):
+        return 100 * bathrooms + square_feet
+
+
+@pytest.fixture
+def client():
+    server = Flask(__name__)
+    context = (_Model(), {"cityname_Austin"}, {"state_TX"}, {"Pool"}, {"cityname_Austin": "state_TX"})
+    register_scoring_api(server, lambda: context, max_rows=100, max_bytes=1024)
+    return server.test_client()
+
+
+def _chunked(client, body):
+    # Sin Content-Length, como un cliente que envía el cuerpo por partes; el servidor WSGI marca
+    # wsgi.input_terminated para que Werkzeug entregue el cuerpo
+    return client.post("/api/estimaciones", input_stream=io.BytesIO(body),
+                       headers={"Content-Type": "application/json", "Transfer-Encoding": "chunked"},
+                       environ_overrides={"wsgi.input_terminated": True})
+
+
+def test_estimates_batch(client):
+    listings = [{"bathrooms": 1, "square_feet": 500, "city": "Austin"}, {"bathrooms": 1, "square_feet": 500}]
+    response = client.post("/api/estimaciones", json={"listings": listings})
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [{"index": 0, "estimate": 600.0},
+                                              {"index": 1, "errors": ["'city' no es una ciudad conocida"]}]
+
+
+def test_body_over_limit_without_content_length(client):
+    listing = {"bathrooms": 1, "square_feet": 500, "city": "Austin"}
+    response = _chunked(client, json.dumps({"listings": [listing] * 100}).encode())
+    assert response.status_code == 413
+    assert "1024 bytes" in response.get_json()["error"]
+
+    response = _chunked(client, json.dumps({"listings": [listing]}).encode())
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [{"index": 0, "estimate": 600.0}]
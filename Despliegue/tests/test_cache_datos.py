@@ -0,0 +1,28 @@
+import os
+
+import pandas as pd
+
+from cache_datos import load_coefficients, load_dataset, load_filter_engine
+
+
+def _versions(cache_dir, prefix):
+    return sorted(entry for entry in os.listdir(cache_dir) if entry.startswith(prefix + "-"))
+
+
+def test_rebuild_removes_older_versions(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    datos_csv, modelo_csv = tmp_path / "datosPreparados.csv", tmp_path / "modeloFinal.csv"
+    df = pd.DataFrame({"bathrooms": [1.0, 2.0], "price": [900, 1500], "square_feet": [500, 800],
+                       "state_TX": [1, 0], "Pool": [0, 1]})
+    pd.DataFrame({"Variables": ["bathrooms"], "Coeficientes": [1.0]}).to_csv(modelo_csv, index=False)
+
+    for price in (900, 950, 1000):
+        df.assign(price=[price, 1500]).to_csv(datos_csv, index=False)
+        datos = load_dataset(str(datos_csv), ["Pool"], cache_dir=cache_dir)
+        load_filter_engine(datos, ["state_TX"], ["Pool"], cache_dir=cache_dir)
+        load_coefficients(str(modelo_csv), cache_dir=cache_dir)
+
+        assert len(_versions(cache_dir, "datosPreparados")) == 1
+        assert len(_versions(cache_dir, "filtros")) == 1
+        assert len(_versions(cache_dir, "modeloFinal")) == 1
+        assert datos.column("price").tolist() == [price, 1500]
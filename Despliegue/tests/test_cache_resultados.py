@@ -0,0 +1,23 @@
+from cache_resultados import filter_signature, snap_range
+
+
+def test_snap_range_keeps_off_grid_max():
+    # (5680 - 138) % 100 = 42 < 50: redondear al punto más cercano dejaba el máximo en 5638
+    assert snap_range([138, 5680], 138, 5680, 100) == [138, 5680]
+
+
+def test_snap_range_rounds_upper_bound_up():
+    assert snap_range([138, 5600], 138, 5680, 100) == [138, 5638]
+    assert snap_range([240, 1038], 138, 5680, 100) == [238, 1038]
+
+
+def test_snap_range_clamps_to_slider():
+    assert snap_range([0, 10_000], 138, 5680, 100) == [138, 5680]
+    assert snap_range(None, 138, 5680, 100) is None
+
+
+def test_filter_signature_canonical():
+    a = filter_signature("state_TX", 2, [138, 5680], ["Pool", "Gym"], "photos", "v1")
+    b = filter_signature("state_TX", 2.0, [138, 5680], ["Gym", "Pool"], "photos", "v1")
+    assert a == b
+    assert a != filter_signature("state_TX", 2, [138, 5680], ["Pool", "Gym"], "photos", "v2")
@@ -0,0 +1,74 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import numpy as np
+import plotly
+import pytest
+
+from cajas import box_statistics
+
+PLOTLY_JS = os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js")
+
+# Cuartiles de plotly.js (quartilemethod "linear") con la función ``interp`` del paquete de plotly
+NODE_RUNNER = """
+const fs = require("fs");
+const interp = eval("(" + fs.readFileSync(0, "utf8") + ")");
+const categories = JSON.parse(process.argv[1]);
+process.stdout.write(JSON.stringify(categories.map(
+    (v) => [interp(v, 0.25), interp(v, 0.5), interp(v, 0.75)])));
+"""
+
+
+def _plotly_interp():
+    # Cuerpo de ``Lib.interp`` en el paquete minificado, sin la validación del argumento
+    source = open(PLOTLY_JS, encoding="utf-8").read()
+    match = re.search(r'\.interp=function\((\w),(\w)\)\{if\(!\w+\(\2\)\)throw"n should be a finite number";'
+                      r'(.*?return \w\*\1\[Math\.ceil\(\2\)\]\+\(1-\w\)\*\1\[Math\.floor\(\2\)\])\}', source)
+    assert match, "no se encontró Lib.interp en plotly.min.js"
+    return f"function({match.group(1)},{match.group(2)}){{{match.group(3)}}}"
+
+
+def _categories():
+    # Categorías pequeñas y de tamaños dispares, con atípicos
+    rng = np.random.default_rng(0)
+    categories = [[1.0], [5.0, 9.0], [1.0, 2.0, 3.0, 4.0], [10.0, 20.0, 30.0]]
+    for size in list(range(5, 16)) + [37, 101]:
+        values = rng.integers(500, 3000, size).astype(float)
+        values[rng.integers(size)] *= 5
+        categories.append(sorted(values.tolist()))
+    return categories
+
+
+def _statistics(categories):
+    codes = np.concatenate([[code] * len(values) for code, values in enumerate(categories)])
+    labels = [f"c{code}" for code in range(len(categories))]
+    return box_statistics(codes, np.concatenate(categories), labels, max_points=1000)
+
+
+def test_quartiles_use_plotly_linear_method():
+    statistics = _statistics(_categories()[:4])
+    quartiles = [(s["q1"], s["median"], s["q3"]) for s in statistics]
+    # Posición n*p - 0.5: en [1, 2, 3, 4] el primer cuartil es 1.5 (y no 1.75)
+    assert quartiles == [(1, 1, 1), (5, 7, 9), (1.5, 2.5, 3.5), (12.5, 20, 27.5)]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node no está instalado")
+def test_matches_plotly_js_quartiles_and_fences():
+    categories = _categories()
+    result = subprocess.run(["node", "-e", NODE_RUNNER, json.dumps(categories)], input=_plotly_interp(),
+                            capture_output=True, text=True, check=True)
+    for values, (q1, median, q3), stats in zip(categories, json.loads(result.stdout), _statistics(categories)):
+        np.testing.assert_allclose([stats["q1"], stats["median"], stats["q3"]], [q1, median, q3])
+
+        # Bigotes como los calcula plotly.js con esos cuartiles; atípicos = puntos fuera de los bigotes
+        values = np.array(values)
+        iqr = q3 - q1
+        lowerfence = min(q1, values[values >= q1 - 1.5 * iqr].min())
+        upperfence = max(q3, values[values <= q3 + 1.5 * iqr].max())
+        assert (stats["lowerfence"], stats["upperfence"]) == pytest.approx((lowerfence, upperfence))
+        outliers = values[(values < lowerfence) | (values > upperfence)]
+        assert sorted(stats["outliers"].tolist()) == outliers.tolist()
+        assert stats["count"] == len(values)
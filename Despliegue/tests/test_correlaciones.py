@@ -0,0 +1,57 @@
+import numpy as np
+
+from conftest import reference_rows
+from correlaciones import CorrelationEngine
+from datos_compactos import CompactDataset
+from filtros import FilterEngine
+
+STATES = ["state_TX", "state_MA", "state_IL"]
+
+# Rangos en la grilla del cubo (mínimo 200, paso 100) y fuera de ella
+ON_GRID = [None, [200, 3000], [500, 1500], [1000, 1000], [2900, 3000]]
+OFF_GRID = [[540, 1230], [100, 900], [650, 650]]
+
+
+def _engine(frame, amenities, columns):
+    datos = CompactDataset.from_frame(frame, amenities)
+    motor = FilterEngine(datos, STATES, amenities)
+    return CorrelationEngine(datos, motor, columns, 200, 3000, 100)
+
+
+def _expected(frame, columns, state, bathrooms, square_feet_range, dropped=()):
+    selected = frame.drop(index=list(dropped))
+    selected = selected.iloc[reference_rows(selected, state, bathrooms, square_feet_range)]
+    return selected[columns + ["price"]].corr()["price"].drop("price").to_numpy()
+
+
+def test_correlations_match_pandas(frame, amenities):
+    columns = [col for col in frame.columns if col.startswith("has_")] + amenities
+    engine = _engine(frame, amenities, columns)
+    for state in [None] + STATES:
+        for bathrooms in (None, 1, 3):
+            for square_feet_range in ON_GRID + OFF_GRID:
+                on_grid = square_feet_range in ON_GRID
+                assert (engine.cube.totals(state, bathrooms, square_feet_range) is not None) == on_grid
+                for subset in (columns, ["Gym", "has_photo_Yes"]):
+                    result = engine.correlations(state, bathrooms, square_feet_range, subset)
+                    assert result.index.tolist() == subset
+                    np.testing.assert_allclose(result["price"].to_numpy(),
+                                               _expected(frame, subset, state, bathrooms, square_feet_range),
+                                               atol=1e-9, equal_nan=True)
+
+    # Columnas 0/1 que el motor no acumula: se calculan sobre las filas
+    result = engine.correlations(None, 2, [500, 1500], ["cityname_Boston", "Pool"])
+    np.testing.assert_allclose(result["price"], _expected(frame, ["cityname_Boston", "Pool"], None, 2, [500, 1500]))
+
+
+def test_correlations_after_update_match_pandas(frame, amenities):
+    columns = ["Pool", "Gym", "has_photo_No"]
+    engine = _engine(frame, amenities, columns)
+    dropped = np.random.default_rng(5).choice(len(frame), 700, replace=False)
+    engine.update(dropped, sign=-1)
+    engine.motor.remove(dropped)
+    for state in [None, "state_MA"]:
+        for square_feet_range in ON_GRID + OFF_GRID:
+            np.testing.assert_allclose(
+                engine.correlations(state, 2, square_feet_range)["price"].to_numpy(),
+                _expected(frame, columns, state, 2, square_feet_range, dropped), atol=1e-9, equal_nan=True)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from cubo import KpiCube
+from datos_compactos import CompactDataset
+from filtros import FilterEngine
+
+STATES = ["state_TX", "state_MA", "state_IL"]
+
+
+def _reference(frame, state, bathrooms, square_feet_range):
+    selected = frame
+    if state:
+        selected = selected[selected[state] == 1]
+    if bathrooms:
+        selected = selected[selected["bathrooms"] == bathrooms]
+    if square_feet_range:
+        selected = selected[selected["square_feet"].between(*square_feet_range)]
+    return selected
+
+
+def _check(kpis, selected):
+    assert kpis["total_apartments"] == len(selected)
+    assert kpis["total_cities"] == selected.filter(like="cityname_").to_numpy().any(axis=1).sum()
+    if len(selected):
+        assert kpis["avg_price"] == pytest.approx(selected["price"].mean())
+        assert kpis["avg_description_length"] == pytest.approx(selected["longitud_descripcion"].mean())
+
+
+def _cube(frame, amenities, slider_min, slider_max):
+    datos = CompactDataset.from_frame(frame, amenities)
+    motor = FilterEngine(datos, STATES, amenities)
+    return KpiCube(datos, motor, slider_min, slider_max, 100)
+
+
+def test_cube_matches_pandas(frame, amenities):
+    cube = _cube(frame, amenities, 200, 3000)
+    ranges = [None, [200, 3000], [500, 1500], [200, 1000], [700, 3000], [1500, 1500], [540, 1200], [100, 900]]
+    for state in [None] + STATES:
+        for bathrooms in (None, 1, 1.5, 3, 4):
+            for square_feet_range in ranges:
+                kpis = cube.query(state, bathrooms, square_feet_range)
+                if square_feet_range in ([540, 1200], [100, 900]):
+                    # Fuera de la grilla (no alineado o bajo el mínimo): se responde con el motor de filtros
+                    assert kpis is None
+                    continue
+                _check(kpis, _reference(frame, state, bathrooms, square_feet_range))
+
+
+def test_rows_outside_slider_stay_out_of_cells(frame, amenities):
+    # El slider cubre menos que los datos: las filas fuera de [500, 2000] no deben caer en celdas vecinas
+    cube = _cube(frame, amenities, 500, 2000)
+    for state in [None] + STATES:
+        for bathrooms in (None, 1, 2, 3):
+            for square_feet_range in ([500, 2000], [500, 1000], [1200, 2000], [800, 800]):
+                _check(cube.query(state, bathrooms, square_feet_range),
+                       _reference(frame, state, bathrooms, square_feet_range))
+            # Sin rango o hasta más allá del máximo la selección incluye filas sin celda
+            assert cube.query(state, bathrooms, None) is None
+            assert cube.query(state, bathrooms, [500, 2500]) is None
+
+
+def test_update_tracks_rows_outside_slider(frame, amenities):
+    cube = _cube(frame, amenities, 500, 2000)
+    outside = np.flatnonzero(~frame["square_feet"].between(500, 2000))
+
+    # Sin las filas fuera del slider, la consulta sin rango vuelve a salir del cubo
+    cube.update(outside, sign=-1)
+    _check(cube.query(None, None, None), frame.drop(index=outside))
+    _check(cube.query("state_MA", 2, [500, 3000]), _reference(frame.drop(index=outside), "state_MA", 2, None))
+
+    big = outside[frame["square_feet"].to_numpy()[outside] > 2000][:1]
+    cube.update(big, sign=1)
+    assert cube.query(None, None, None) is None
+    assert cube.query(None, None, [500, 3000]) is None
+    # Las filas por encima del máximo no afectan a un rango que empieza en el mínimo y llega al máximo
+    _check(cube.query(None, None, [500, 2000]), _reference(frame, None, None, [500, 2000]))
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_frame
+from datos_compactos import CompactDataset
+
+
+def _assert_matches(datos, frame):
+    # Todas las columnas no textuales, en el orden original, con los mismos valores
+    expected = [col for col in frame.columns if pd.api.types.is_numeric_dtype(frame[col])]
+    assert datos.columns == expected
+    assert len(datos) == len(frame)
+    for col in expected:
+        np.testing.assert_array_equal(datos[col].to_numpy(), frame[col].to_numpy(), err_msg=col)
+
+
+def test_compact_columns_match_frame(frame, amenities):
+    datos = CompactDataset.from_frame(frame, amenities)
+    _assert_matches(datos, frame)
+    assert datos.nbytes < frame.select_dtypes("number").memory_usage(index=False).sum() / 4
+
+    rows = np.array([5, 17, 17, 2999])
+    pd.testing.assert_frame_equal(datos.take_columns(rows, ["price", "state_MA", "Pool"]),
+                                  frame.iloc[rows][["price", "state_MA", "Pool"]].reset_index(drop=True),
+                                  check_dtype=False)
+    _assert_matches(datos.take(rows), frame.iloc[rows])
+
+    # Familia decodificada con sus etiquetas en español (idxmax como el boxplot original)
+    photos = frame.filter(like="has_photo_").idxmax(axis=1).str.removeprefix("has_photo_")
+    expected = photos.map({"No": "Sin Foto", "Thumbnail": "Miniatura", "Yes": "Con Foto"})
+    assert list(datos.categorical("has_photo")) == expected.tolist()
+
+
+def test_csv_save_and_load_roundtrip(frame, amenities, tmp_path):
+    path = str(tmp_path / "datosPreparados.csv")
+    frame.to_csv(path, index=False)
+    # El tablero original leía el archivo con pd.read_csv; en bloques pequeños el resultado es el mismo
+    frame = pd.read_csv(path)
+    datos = CompactDataset.from_csv(path, amenities, chunksize=700)
+    _assert_matches(datos, frame)
+
+    datos.version = "v1"
+    datos.save(str(tmp_path / "cache"))
+    for mmap_mode in (None, "r"):
+        loaded = CompactDataset.load(str(tmp_path / "cache"), mmap_mode=mmap_mode)
+        assert loaded.version == "v1"
+        _assert_matches(loaded, frame)
+
+
+def test_append_matches_rebuild(amenities):
+    frame = make_frame(n=1000)
+    extra = make_frame(n=300, seed=1)
+    # Las filas agregadas traen una ciudad que el conjunto inicial no tenía
+    extra.insert(extra.columns.get_loc("cityname_Chicago") + 1, "cityname_Denver", 0)
+    extra.loc[:99, extra.filter(like="cityname_").columns] = 0
+    extra.loc[:99, "cityname_Denver"] = 1
+
+    datos = CompactDataset.from_frame(frame, amenities)
+    assert datos.add_label("cityname", "Denver") == 3
+    for start, stop in ((0, 50), (50, 120), (120, 300)):
+        part = CompactDataset.from_frame(extra.iloc[start:stop], amenities)
+        datos.append({name: part.column(name) for name in datos.numeric_columns},
+                     {family: part.codes(family) for family in datos.families}, part.amenity_mask)
+
+    combined = pd.concat([frame.assign(cityname_Denver=0)[extra.columns], extra], ignore_index=True)
+    _assert_matches(datos, combined)
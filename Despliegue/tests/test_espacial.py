@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacion import DashboardAggregator
+from conftest import make_frame, reference_rows
+from datos_compactos import CompactDataset
+from espacial import EARTH_RADIUS_KM, SpatialIndex, bbox_region, radius_region
+from filtros import FilterEngine
+
+STATES = ["state_TX", "state_MA", "state_IL"]
+
+
+def _in_bbox(frame, west, south, east, north):
+    return np.flatnonzero(frame["latitude"].between(south, north) & frame["longitude"].between(west, east))
+
+
+def _in_radius(frame, latitude, longitude, km):
+    lat, lon = np.radians(frame["latitude"].to_numpy()), np.radians(frame["longitude"].to_numpy())
+    lat0, lon0 = np.radians(latitude), np.radians(longitude)
+    h = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return np.flatnonzero(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h)) <= km)
+
+
+def _boxes(n=200, seed=6):
+    # Rectángulos de todos los tamaños, incluidos los que salen del área de los datos
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        width, height = 10 ** rng.uniform(-2, 1.8, 2)
+        west, south = rng.uniform(-130, -70), rng.uniform(20, 50)
+        yield west, south, west + width, south + height
+
+
+def test_bbox_and_radius_match_brute_force(frame, amenities):
+    index = SpatialIndex(CompactDataset.from_frame(frame, amenities))
+    for box in _boxes():
+        np.testing.assert_array_equal(index.bbox(*box), _in_bbox(frame, *box))
+    # Un anuncio exactamente en el borde queda dentro
+    row = frame.iloc[10]
+    assert 10 in index.bbox(row["longitude"], row["latitude"], row["longitude"] + 1, row["latitude"] + 1)
+
+    rng = np.random.default_rng(7)
+    for _ in range(100):
+        center = rng.uniform(25, 48), rng.uniform(-123, -70)
+        km = 10 ** rng.uniform(0, 3.3)
+        np.testing.assert_array_equal(index.query(radius_region(*center, km, digits=6)),
+                                      _in_radius(frame, *center, km))
+
+
+def test_update_matches_rebuild(amenities):
+    frame = make_frame(n=2000)
+    extra = make_frame(n=1000, seed=1)
+    datos = CompactDataset.from_frame(frame, amenities)
+    index = SpatialIndex(datos)
+    # Varias tandas: las primeras quedan en el índice reciente y luego se fusionan con el principal
+    for start, stop in ((0, 100), (100, 150), (150, 1000)):
+        part = CompactDataset.from_frame(extra.iloc[start:stop], amenities)
+        first = len(datos)
+        datos.append({name: part.column(name) for name in datos.numeric_columns},
+                     {family: part.codes(family) for family in datos.families}, part.amenity_mask)
+        index.update(np.arange(first, len(datos)))
+        index.update(np.arange(first, first + 10), sign=-1)
+
+        combined = pd.concat([frame, extra.iloc[:stop]], ignore_index=True)
+        for box in _boxes(n=40, seed=stop):
+            np.testing.assert_array_equal(index.bbox(*box), _in_bbox(combined, *box))
+
+
+def test_region_aggregate_matches_pandas(frame, amenities):
+    datos = CompactDataset.from_frame(frame, amenities)
+    aggregator = DashboardAggregator(datos, FilterEngine(datos, STATES, amenities), amenities,
+                                     espacial=SpatialIndex(datos))
+    regions = [(bbox_region(*box), _in_bbox(frame, *bbox_region(*box)[1:])) for box in _boxes(n=15, seed=8)]
+    regions += [(radius_region(40.7, -74.0, 800), _in_radius(frame, 40.7, -74.0, 800))]
+    for region, within in regions:
+        for state, bathrooms, square_feet_range, chosen in [(None, None, None, []), ("state_MA", 2, [500, 2500], []),
+                                                            (None, 1, None, ["Pool", "Gym"])]:
+            result = aggregator.aggregate(state, bathrooms, square_feet_range, chosen, "photos", region=region)
+            expected = np.intersect1d(within, reference_rows(frame, state, bathrooms, square_feet_range, chosen))
+            assert result["total_apartments"] == len(expected)
+            if len(expected):
+                assert result["avg_price"] == pytest.approx(frame["price"].iloc[expected].mean())
@@ -0,0 +1,58 @@
+import numpy as np
+
+from conftest import reference_rows
+from datos_compactos import CompactDataset
+from filtros import FilterEngine
+
+STATES = ["state_TX", "state_MA", "state_IL"]
+
+
+def _combinations(amenities, n=300, seed=1):
+    # Combinaciones aleatorias de filtros, incluidos valores que no existen en los datos
+    rng = np.random.default_rng(seed)
+    for _ in range(n):
+        state = [None, *STATES, "state_ZZ"][rng.integers(5)]
+        bathrooms = [None, 1, 1.5, 2, 3, 4][rng.integers(6)]
+        low = int(rng.integers(0, 3200))
+        square_feet_range = None if rng.random() < 0.3 else [low, low + int(rng.integers(0, 1500))]
+        chosen = [a for a in amenities if rng.random() < 0.3]
+        yield state, bathrooms, square_feet_range, chosen
+
+
+def test_resolve_matches_pandas(frame, amenities):
+    datos = CompactDataset.from_frame(frame, amenities)
+    motor = FilterEngine(datos, STATES, amenities)
+    subset = np.sort(np.random.default_rng(2).choice(len(frame), 500, replace=False))
+    for state, bathrooms, square_feet_range, chosen in _combinations(amenities):
+        expected = reference_rows(frame, state, bathrooms, square_feet_range, chosen)
+        np.testing.assert_array_equal(motor.resolve(state, bathrooms, square_feet_range, chosen), expected)
+        # Restringido a un subconjunto de filas (como una región del mapa) y refinado por amenities
+        np.testing.assert_array_equal(motor.resolve(state, bathrooms, square_feet_range, chosen, rows=subset),
+                                      np.intersect1d(subset, expected))
+        np.testing.assert_array_equal(motor.refine(motor.resolve(state, bathrooms, square_feet_range), chosen),
+                                      expected)
+
+
+def test_saved_engine_matches(frame, amenities, tmp_path):
+    datos = CompactDataset.from_frame(frame, amenities)
+    FilterEngine(datos, STATES, amenities).save(str(tmp_path))
+    motor = FilterEngine.load(str(tmp_path), datos, mmap_mode="r")
+    for state, bathrooms, square_feet_range, chosen in _combinations(amenities, n=50):
+        np.testing.assert_array_equal(motor.resolve(state, bathrooms, square_feet_range, chosen),
+                                      reference_rows(frame, state, bathrooms, square_feet_range, chosen))
+
+
+def test_append_and_remove_match_rebuild(frame, amenities):
+    # Motor construido con las primeras filas; el resto llega con append y algunas se dan de baja
+    datos = CompactDataset.from_frame(frame, amenities)
+    motor = FilterEngine(CompactDataset.from_frame(frame.iloc[:2000], amenities), STATES, amenities)
+    for start, stop in ((2000, 2100), (2100, 2600), (2600, 3000)):
+        motor.append(datos, np.arange(start, stop))
+    removed = np.random.default_rng(3).choice(len(frame), 400, replace=False)
+    motor.remove(removed)
+
+    alive = frame.drop(index=removed)
+    for state, bathrooms, square_feet_range, chosen in _combinations(amenities, n=100):
+        np.testing.assert_array_equal(
+            motor.resolve(state, bathrooms, square_feet_range, chosen),
+            alive.index.to_numpy()[reference_rows(alive, state, bathrooms, square_feet_range, chosen)])
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacion import DashboardAggregator
+from conftest import AMENITIES as FIXTURE_AMENITIES
+from correlaciones import CorrelationEngine
+from cubo import KpiCube
+from datos_compactos import CompactDataset
+from espacial import SpatialIndex, bbox_region
+from filtros import FilterEngine
+from ingesta import DeltaIngestor
+
+AMENITIES = ["Pool", "Gym"]
+
+
+def _board(n=200):
+    rng = np.random.default_rng(0)
+    city = rng.integers(0, 2, n)
+    df = pd.DataFrame({
+        "bathrooms": rng.integers(1, 3, n).astype(float),
+        "price": rng.integers(500, 3000, n),
+        "square_feet": rng.integers(300, 2000, n),
+        "latitude": rng.uniform(30, 45, n),
+        "longitude": rng.uniform(-100, -70, n),
+        "cityname_Austin": (city == 0).astype(int),
+        "cityname_Boston": (city == 1).astype(int),
+        "state_MA": (city == 1).astype(int),
+        "state_TX": (city == 0).astype(int),
+        "Pool": rng.integers(0, 2, n),
+        "Gym": rng.integers(0, 2, n),
+        "longitud_descripcion": rng.integers(10, 500, n),
+    })
+    datos = CompactDataset.from_frame(df, AMENITIES)
+    datos.version = "base"
+    motor = FilterEngine(datos, ["state_MA", "state_TX"], AMENITIES)
+    cubo = KpiCube(datos, motor, 300, 2000, 100)
+    return DeltaIngestor(datos, motor, [cubo]), cubo
+
+
+def _delta(ids, **overrides):
+    n = len(ids)
+    delta = pd.DataFrame({
+        "bathrooms": [2.0] * n,
+        "price": [1500.0] * n,
+        "square_feet": [800] * n,
+        "latitude": [40.0] * n,
+        "longitude": [-75.0] * n,
+        "cityname": ["Denver"] * n,
+        "state": ["CO"] * n,
+        "amenities": ["Pool"] * n,
+        "body": ["Departamento"] * n,
+        "price_type": ["Monthly"] * n,
+    }, index=pd.Index(ids, name="id"))
+    return delta.assign(**overrides)
+
+
+def _snapshot(ingestor, cubo):
+    datos = ingestor.datos
+    return (len(datos), list(datos.columns), datos.version, ingestor.motor.resolve().tolist(),
+            cubo.totals(None, None, None).tolist(), dict(ingestor._rows))
+
+
+def test_failed_delta_leaves_board_untouched():
+    ingestor, cubo = _board()
+    before = _snapshot(ingestor, cubo)
+
+    # Anuncios nuevos con una ciudad nueva y un precio que no es número, más una baja de datosPreparados
+    with pytest.raises(ValueError):
+        ingestor.ingest(altas=_delta([9000, 9001], price=["1500", "no informado"]), filas=[5])
+    assert _snapshot(ingestor, cubo) == before
+
+    # El mismo delta corregido se aplica una sola vez
+    summary = ingestor.ingest(altas=_delta([9000, 9001]), filas=[5])
+    assert summary == {"altas": 2, "bajas": 1, "columnas_nuevas": ["cityname_Denver", "state_CO"]}
+    rows = ingestor.motor.resolve()
+    assert len(rows) == 200 - 1 + 2
+    assert 5 not in set(rows.tolist())
+    assert cubo.totals(None, None, None)[0] == len(rows)
+    assert cubo.totals("state_CO", None, None)[0] == 2
+
+
+def test_listing_ids_are_not_row_positions():
+    ingestor, cubo = _board()
+
+    # Un id menor que el número de filas es un anuncio nuevo, no la fila 3 de datosPreparados
+    assert ingestor.ingest(altas=_delta([3]))["bajas"] == 0
+    assert ingestor.ingest(bajas=[4])["bajas"] == 0
+    rows = set(ingestor.motor.resolve().tolist())
+    assert {3, 4, 200} <= rows and len(rows) == 201
+
+    # La fila 3 se retira por posición una sola vez; el anuncio 3 se retira por id
+    assert ingestor.ingest(filas=[3])["bajas"] == 1
+    assert ingestor.ingest(filas=[3])["bajas"] == 0
+    assert ingestor.ingest(bajas=[3])["bajas"] == 1
+    rows = ingestor.motor.resolve()
+    assert 3 not in set(rows.tolist()) and 200 not in set(rows.tolist())
+    assert cubo.totals(None, None, None)[0] == len(rows) == 199
+
+    with pytest.raises(ValueError):
+        ingestor.ingest(filas=[200])
+
+
+def test_update_dropped_by_cleaning_keeps_listing():
+    ingestor, cubo = _board()
+    ingestor.ingest(altas=_delta([9000]))
+    row = ingestor._rows[9000]
+
+    # La actualización tiene un precio semanal: la limpieza la descarta y el anuncio sigue vigente
+    summary = ingestor.ingest(altas=_delta([9000], price_type=["Weekly"], price=[400.0]))
+    assert summary["altas"] == 0 and summary["bajas"] == 0
+    assert row in set(ingestor.motor.resolve().tolist())
+    assert ingestor.datos.column("price", np.array([row]))[0] == 1500
+    assert cubo.totals(None, None, None)[0] == 201
+
+
+def test_bajas_file_columns(tmp_path):
+    ingestor, _ = _board()
+    ingestor.ingest(altas=_delta([9000, 9001]))
+    pd.DataFrame({"id": [9000, None], "fila": [None, 7]}).to_csv(tmp_path / "01.bajas.csv", index=False)
+    assert ingestor.ingest_directory(str(tmp_path)) == ["01.bajas.csv"]
+    rows = set(ingestor.motor.resolve().tolist())
+    assert 7 not in rows and ingestor._rows[9000] not in rows and ingestor._rows[9001] in rows
+
+
+def test_cube_update_matches_rebuild():
+    ingestor, cubo = _board()
+    ingestor.ingest(altas=_delta([1000, 1001, 1002], cityname=["Austin"] * 3, state=["TX"] * 3), filas=[7, 8])
+    datos, motor = ingestor.datos, ingestor.motor
+    for state in (None, "state_TX", "state_MA"):
+        for bathrooms in (None, 1, 2):
+            for square_feet_range in (None, [300, 2000], [700, 1200]):
+                rows = motor.resolve(state, bathrooms, square_feet_range)
+                kpis = cubo.query(state, bathrooms, square_feet_range)
+                assert kpis["total_apartments"] == len(rows)
+                assert kpis["avg_price"] == pytest.approx(datos.column("price", rows).mean())
+
+
+FIXTURE_STATES = ["state_TX", "state_MA", "state_IL"]
+
+
+def _dashboard(frame):
+    # Tablero completo sobre un DataFrame con el formato de datosPreparados
+    datos = CompactDataset.from_frame(frame, FIXTURE_AMENITIES)
+    motor = FilterEngine(datos, FIXTURE_STATES, FIXTURE_AMENITIES)
+    columns = [col for col in datos.columns if col.startswith("has_") or col in FIXTURE_AMENITIES]
+    cubo = KpiCube(datos, motor, 200, 3000, 100)
+    correlaciones = CorrelationEngine(datos, motor, columns, 200, 3000, 100)
+    espacial = SpatialIndex(datos)
+    aggregator = DashboardAggregator(datos, motor, FIXTURE_AMENITIES, cubo=cubo, correlaciones=correlaciones,
+                                     box_max_points=10_000, espacial=espacial)
+    return aggregator, DeltaIngestor(datos, motor, [cubo, correlaciones, espacial])
+
+
+def _as_delta(frame, ids):
+    # Las filas con el formato de datos.csv: una columna por familia one-hot, amenities separadas por
+    # comas y un cuerpo del largo de la descripción
+    delta = frame.drop(columns=["title"])
+    for family in ("pets_allowed", "has_photo", "cityname", "state"):
+        columns = frame.filter(like=family + "_").columns
+        delta = delta.drop(columns=columns).assign(
+            **{family: frame[columns].idxmax(axis=1).str.removeprefix(family + "_")})
+    amenities = frame[FIXTURE_AMENITIES].apply(lambda row: ",".join(row.index[row == 1]), axis=1)
+    delta = delta.drop(columns=FIXTURE_AMENITIES + ["longitud_descripcion"]).assign(
+        amenities=amenities, body=frame["longitud_descripcion"].map(lambda length: "x" * length),
+        price_type="Monthly")
+    return delta.set_axis(pd.Index(ids, name="id"))
+
+
+def test_ingest_matches_rebuild(frame):
+    base, extra = frame.iloc[:2000], frame.iloc[2000:]
+    # Los anuncios de datos.csv tienen siempre ciudad y estado
+    extra = extra[(extra.filter(like="cityname_").sum(axis=1) == 1) & (extra.filter(like="state_").sum(axis=1) == 1)]
+    ids = np.arange(5000, 5000 + len(extra))
+    aggregator, ingestor = _dashboard(base)
+
+    retired_rows = np.arange(0, 2000, 7)
+    retired_ids = ids[::5]
+    updated = extra.iloc[1::5].assign(price=extra["price"].iloc[1::5] + 100)
+    ingestor.ingest(altas=_as_delta(extra.iloc[:300], ids[:300]), filas=retired_rows[:100])
+    ingestor.ingest(altas=_as_delta(extra.iloc[300:], ids[300:]), filas=retired_rows[100:])
+    ingestor.ingest(altas=_as_delta(updated, ids[1::5]), bajas=retired_ids)
+
+    # El mismo tablero construido desde cero con las filas vigentes
+    current = extra.drop(index=extra.index[::5]).drop(index=updated.index)
+    rebuilt, _ = _dashboard(pd.concat([base.drop(index=base.index[retired_rows]), current, updated],
+                                      ignore_index=True))
+
+    rng = np.random.default_rng(9)
+    for _ in range(40):
+        west, south = rng.uniform(-123, -90), rng.uniform(25, 35)
+        region = bbox_region(west, south, -70, 48) if rng.random() < 0.3 else None
+        arguments = ([None, *FIXTURE_STATES][rng.integers(4)], [None, 1, 2, 3][rng.integers(4)],
+                     [None, [200, 3000], [500, 1500], [540, 1230]][rng.integers(4)],
+                     [a for a in FIXTURE_AMENITIES if rng.random() < 0.25], "photos")
+        result = aggregator.aggregate(*arguments, region=region)
+        expected = rebuilt.aggregate(*arguments, region=region)
+
+        for key in ("total_cities", "total_apartments", "avg_price", "avg_description_length"):
+            assert result[key] == pytest.approx(expected[key], nan_ok=True), key
+        assert (dict(zip(*result["bedroom_counts"].to_numpy().T))
+                == dict(zip(*expected["bedroom_counts"].to_numpy().T)))
+        assert len(result["box_stats"]) == len(expected["box_stats"])
+        for stats, reference in zip(result["box_stats"], expected["box_stats"]):
+            for key in ("category", "count", "total", "q1", "median", "q3", "lowerfence", "upperfence"):
+                assert stats[key] == pytest.approx(reference[key]), key
+        np.testing.assert_allclose(result["correlations"]["price"].to_numpy(),
+                                   expected["correlations"]["price"].to_numpy(), atol=1e-9, equal_nan=True)
@@ -0,0 +1,46 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+from mapa import IMMUTABLE_MAX_AGE, MapAsset, register_map_route
+
+CONTENT = "<html><body>" + "<div class='celda'>Mapa de precios</div>" * 500 + "</body></html>"
+
+
+@pytest.fixture
+def asset(tmp_path):
+    path = tmp_path / "mapa_precios.html"
+    path.write_text(CONTENT, encoding="utf-8")
+    asset = MapAsset(str(path))
+    # Las variantes se preparan al crear el recurso: el archivo ya no hace falta para responder
+    path.unlink()
+    return asset
+
+
+@pytest.fixture
+def client(asset):
+    server = Flask(__name__)
+    register_map_route(server, lambda: asset)
+    return server.test_client()
+
+
+def test_serves_precompressed_variants(asset, client):
+    response = client.get("/mapa/precios.html", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).decode("utf-8") == CONTENT
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    response = client.get("/mapa/precios.html", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.data.decode("utf-8") == CONTENT
+
+
+def test_versioned_url_and_revalidation(asset, client):
+    response = client.get(f"/mapa/precios.html?v={asset.fingerprint}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Cache-Control"] == f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+    response = client.get("/mapa/precios.html", headers={"Accept-Encoding": "gzip",
+                                                         "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304 and not response.data
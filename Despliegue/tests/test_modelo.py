@@ -0,0 +1,72 @@
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datos_compactos import CompactDataset
+from modelo import ARTIFACT_MAGIC, PriceModel, schema_hash
+
+
+def _dataset():
+    return CompactDataset.from_frame(pd.DataFrame({
+        "bathrooms": [1.0, 2.0],
+        "price": [1000, 2000],
+        "square_feet": [500, 900],
+        "cityname_Austin": [1, 0],
+        "cityname_Boston": [0, 1],
+        "state_TX": [1, 0],
+        "state_MA": [0, 1],
+    }), amenities=[])
+
+
+def _artifact(path, variables, coefficients, columns):
+    # Mismo formato que Modelamiento/artefacto_modelo.py
+    header = json.dumps({"variables": variables, "prune_threshold": 0.0,
+                         "schema_hash": schema_hash(columns)}).encode("utf-8")
+    header += b" " * (-(len(ARTIFACT_MAGIC) + 4 + len(header)) % 8)
+    with open(path, "wb") as f:
+        f.write(ARTIFACT_MAGIC + struct.pack("<I", len(header)) + header)
+        f.write(np.asarray(coefficients, dtype="<f8").tobytes())
+
+
+def test_load_checks_schema_before_deltas(tmp_path):
+    datos = _dataset()
+    path = str(tmp_path / "modeloFinal.bin")
+    _artifact(path, ["bathrooms", "square_feet", "cityname_Austin"], [100.0, 1.5, 50.0], list(datos.columns))
+    base_columns = list(datos.columns)
+
+    # Una ciudad nueva de un delta cambia las columnas: el modelo se valida con las del archivo
+    datos.add_label("cityname", "Denver")
+    with pytest.raises(ValueError):
+        PriceModel.load(path, columns=list(datos.columns))
+    model = PriceModel.load(path, columns=base_columns)
+    assert model.score(1, 500, city="cityname_Austin") == pytest.approx(100 + 750 + 50)
+
+
+def test_unknown_one_hot_columns_score_zero():
+    model = PriceModel(["bathrooms", "square_feet", "cityname_Austin"], [100.0, 1.5, 50.0])
+    assert model.score(2, 800, city="cityname_Denver", state="state_CO") == model.score(2, 800)
+
+    batch = model.score_batch([2, 2], [800, 800], cities=["cityname_Denver", "cityname_Austin"],
+                              states=["state_CO", None], amenities=[["Pool"], []])
+    np.testing.assert_allclose(batch, [model.score(2, 800), model.score(2, 800) + 50])
+
+    matrix = np.array([[2, 800, 1, 1]], dtype=float)
+    columns = ["bathrooms", "square_feet", "cityname_Austin", "cityname_Denver"]
+    np.testing.assert_allclose(model.score_matrix(matrix, columns), [model.score(2, 800) + 50])
+
+
+def test_load_rejects_variables_the_scorer_cannot_encode(tmp_path):
+    path = str(tmp_path / "modeloFinal.csv")
+    pd.DataFrame({"Variables": ["bathrooms", "square_feet", "cityname_Austin", "Pool", "bedrooms"],
+                  "Coeficientes": [100.0, 1.5, 50.0, 20.0, 80.0]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="bedrooms"):
+        PriceModel.load(path, amenities=["Pool", "Gym"])
+
+    # Sin bedrooms el modelo se carga; una amenity que el tablero no ofrece también se rechaza
+    pd.read_csv(path).iloc[:4].to_csv(path, index=False)
+    assert PriceModel.load(path, amenities=["Pool", "Gym"]).score(1, 500, amenities=["Pool"]) == 100 + 750 + 20
+    with pytest.raises(ValueError, match="Pool"):
+        PriceModel.load(path, amenities=["Gym"])
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modelo import PriceModel, simulator_payload
+
+DESPLIEGUE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ejecuta estimar de assets/simulador.js sobre una lista de entradas y devuelve los textos en JSON
+NODE_RUNNER = """
+const fs = require("fs");
+global.window = {};
+eval(fs.readFileSync(process.argv[1], "utf8"));
+const input = JSON.parse(fs.readFileSync(0, "utf8"));
+const estimar = window.dash_clientside.simulador.estimar;
+process.stdout.write(JSON.stringify(input.casos.map(
+    (c) => estimar(c.bathrooms, c.square_feet, c.city, c.amenities, input.modelo))));
+"""
+
+
+@pytest.fixture(scope="module")
+def model():
+    return PriceModel.from_frame(pd.read_csv(os.path.join(DESPLIEGUE, "modeloFinal.csv")))
+
+
+@pytest.fixture(scope="module")
+def payload_and_cases(model):
+    cities = [name for name in model.variables if name.startswith("cityname_")] + ["cityname_Sin Coeficiente"]
+    states = [name for name in model.variables if name.startswith("state_")] + ["state_ZZ"]
+    amenities = [name for name in model.variables if not name.startswith(("cityname_", "state_"))
+                 and name not in ("bathrooms", "square_feet")] + ["Sin Coeficiente"]
+    rng = np.random.default_rng(0)
+    city_states = {city: states[rng.integers(len(states))] for city in cities[::2]}
+
+    cases = []
+    for _ in range(500):
+        cases.append({
+            "bathrooms": float(rng.choice([1, 1.5, 2, 2.5, 3, 4])),
+            "square_feet": int(rng.integers(100, 5000)),
+            "city": cities[rng.integers(len(cities))],
+            "amenities": [amenities[i] for i in rng.choice(len(amenities), rng.integers(0, 6), replace=False)],
+        })
+    # El Store viaja al navegador como JSON
+    return json.loads(json.dumps(simulator_payload(model, city_states))), city_states, cases
+
+
+def _expected(model, city_states, case):
+    price = model.score(case["bathrooms"], case["square_feet"], city=case["city"],
+                        state=city_states.get(case["city"]), amenities=case["amenities"])
+    return f"Precio Estimado: ${price:.2f}"
+
+
+def test_payload_formula_matches_score(model, payload_and_cases):
+    # Misma fórmula que assets/simulador.js sobre los datos del Store
+    payload, city_states, cases = payload_and_cases
+    coefficients = payload["coeficientes"]
+    for case in cases:
+        price = (coefficients.get("bathrooms", 0) * case["bathrooms"]
+                 + coefficients.get("square_feet", 0) * case["square_feet"])
+        for name in [case["city"], payload["estados"].get(case["city"]), *case["amenities"]]:
+            if name:
+                price += coefficients.get(name, 0)
+        assert f"Precio Estimado: ${price:.2f}" == _expected(model, city_states, case)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node no está instalado")
+def test_simulador_js_matches_score(model, payload_and_cases):
+    payload, city_states, cases = payload_and_cases
+    result = subprocess.run(
+        ["node", "-e", NODE_RUNNER, os.path.join(DESPLIEGUE, "assets", "simulador.js")],
+        input=json.dumps({"modelo": payload, "casos": cases}), capture_output=True, text=True, check=True,
+    )
+    assert json.loads(result.stdout) == [_expected(model, city_states, case) for case in cases]
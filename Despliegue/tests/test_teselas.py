@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from cache_resultados import ResultCache
+from datos_compactos import CompactDataset
+from filtros import FilterEngine
+from teselas import PriceTiles, mercator, tile_payload
+
+
+def _tiles(n=2000):
+    rng = np.random.default_rng(0)
+    state = rng.integers(0, 2, n)
+    df = pd.DataFrame({
+        "bathrooms": rng.integers(1, 3, n).astype(float),
+        "price": rng.integers(500, 3000, n),
+        "square_feet": rng.integers(300, 2000, n),
+        "latitude": rng.uniform(30, 45, n),
+        "longitude": rng.uniform(-100, -70, n),
+        "state_TX": (state == 0).astype(int),
+        "state_MA": (state == 1).astype(int),
+        "Pool": rng.integers(0, 2, n),
+    })
+    datos = CompactDataset.from_frame(df, amenities=["Pool"])
+    return PriceTiles(datos, FilterEngine(datos, ["state_TX", "state_MA"], ["Pool"])), df
+
+
+def test_tiles_match_brute_force():
+    tiles, df = _tiles()
+    cache = ResultCache()
+    x, y = mercator(df["latitude"], df["longitude"])
+    for zoom in (0, 3, 6):
+        tx, ty = (x * 2 ** zoom).astype(int), (y * 2 ** zoom).astype(int)
+        for i, j in set(zip(tx[:20], ty[:20])):
+            inside = (tx == i) & (ty == j)
+            cells = json.loads(tile_payload(tiles, zoom, int(i), int(j), None, None, None, [], cache))
+            assert sum(cells["count"]) == inside.sum()
+            # Los promedios viajan redondeados a centavos
+            np.testing.assert_allclose(np.dot(cells["count"], cells["price"]), df["price"][inside].sum(), rtol=1e-5)
+
+            selected = inside & (df["state_TX"] == 1) & (df["Pool"] == 1)
+            cells = json.loads(tile_payload(tiles, zoom, int(i), int(j), "state_TX", None, None, ["Pool"], cache))
+            assert sum(cells["count"]) == selected.sum()
+
+
+def test_filters_resolved_once_per_signature():
+    tiles, _ = _tiles()
+    calls = []
+    resolve = tiles.motor.resolve
+
+    def counting_resolve(*args, **kwargs):
+        calls.append(args)
+        return resolve(*args, **kwargs)
+
+    tiles.motor.resolve = counting_resolve
+    cache = ResultCache()
+    for x in range(2 ** 4):
+        for y in range(2 ** 4):
+            tile_payload(tiles, 4, x, y, "state_MA", None, None, ["Pool"], cache)
+    assert len(calls) == 1
@@ -0,0 +1,83 @@
+"""Artefacto binario del modelo de precios.
+
+Además de ``modeloFinal.csv``, el notebook exporta ``modeloFinal.bin``:
+
+- 8 bytes con la marca ``MAGIC`` (incluye la versión del formato),
+- 4 bytes (entero little-endian) con el largo del encabezado,
+- el encabezado JSON: ``variables`` (vocabulario del modelo), ``prune_threshold``
+  (umbral por debajo del cual se descartaron coeficientes) y ``schema_hash``
+  (hash de las columnas numéricas de ``datosPreparados.csv`` con las que se
+  entrenó, para que el tablero detecte datos incompatibles), rellenado con
+  espacios para que los coeficientes queden alineados a 8 bytes,
+- los coeficientes en float64 little-endian, en el orden de ``variables``.
+
+El tablero lo carga con ``PriceModel.load`` (``Despliegue/modelo.py``) con una
+sola lectura y sin convertir texto a números. Uso desde la terminal para
+convertir un ``modeloFinal.csv`` existente::
+
+    python artefacto_modelo.py modeloFinal.csv datosPreparados.csv modeloFinal.bin
+"""
+import argparse
+import hashlib
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+# Debe coincidir con modelo.ARTIFACT_MAGIC del tablero
+MAGIC = b"PRECIO01"
+
+
+def schema_columns(df):
+    """Columnas numéricas de ``datosPreparados`` en su orden original (las que usa el tablero)."""
+    return [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+
+
+def schema_hash(columns):
+    # Debe coincidir con modelo.schema_hash del tablero
+    return hashlib.sha256("\n".join(columns).encode("utf-8")).hexdigest()[:16]
+
+
+def write_model_artifact(path, variables, coefficients, datos, prune_threshold=1e-6):
+    """Guarda el modelo en ``path`` descartando los coeficientes con ``|coef| < prune_threshold``.
+
+    ``datos`` es el DataFrame de ``datosPreparados.csv`` (o su lista de columnas numéricas).
+    Devuelve el número de variables que se conservaron.
+    """
+    variables = [str(name) for name in variables]
+    coefficients = np.asarray(coefficients, dtype="<f8")
+    keep = np.abs(coefficients) >= prune_threshold
+    columns = schema_columns(datos) if isinstance(datos, pd.DataFrame) else list(datos)
+
+    header = json.dumps({
+        "variables": [name for name, kept in zip(variables, keep) if kept],
+        "prune_threshold": prune_threshold,
+        "schema_hash": schema_hash(columns),
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(coefficients[keep].tobytes())
+    return int(keep.sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte modeloFinal.csv al artefacto binario del tablero.")
+    parser.add_argument("modelo", help="CSV con columnas Variables y Coeficientes")
+    parser.add_argument("datos", help="datosPreparados.csv con el que se entrenó el modelo")
+    parser.add_argument("salida", help="archivo .bin de salida")
+    parser.add_argument("--umbral", type=float, default=1e-6, help="descarta coeficientes con |coef| menor")
+    args = parser.parse_args(argv)
+
+    modelo = pd.read_csv(args.modelo)
+    columnas = schema_columns(pd.read_csv(args.datos))
+    kept = write_model_artifact(args.salida, modelo["Variables"], modelo["Coeficientes"], columnas, args.umbral)
+    print(f"{kept} de {len(modelo)} variables guardadas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Entrenamiento del modelo de precios por eliminación hacia atrás.
+
+Reproduce la selección de ``SeleccionModelo.ipynb`` (ajustar MCO sin
+intercepto, quitar las variables con p > 0.05 hasta que no quede ninguna,
+quitar las filas con distancia de Cook mayor a 4/n y volver a ajustar) sin
+reajustar el modelo completo en cada iteración:
+
+- los datos se recorren por bloques una sola vez para acumular ``X'X``, ``X'y``
+  e ``y'y``; cada iteración trabaja solo con esas matrices de p x p,
+- al quitar columnas, la inversa de ``X'X`` se actualiza con el complemento de
+  Schur en lugar de invertir de nuevo (mientras la matriz sea de rango
+  incompleto se usa la pseudoinversa, como ``statsmodels``),
+- la distancia de Cook sale de los apalancamientos ``h_i = x_i' (X'X)^-1 x_i``
+  en una segunda pasada por bloques, sin construir la matriz sombrero, y en
+  esa misma pasada las filas atípicas se restan de ``X'X`` y ``X'y`` para el
+  ajuste final.
+
+Con ``sparse=True`` (``--disperso``) cada bloque se arma como matriz CSR desde
+los códigos de las familias one-hot (``matriz_dispersa.py``), de modo que el
+número de ciudades no multiplica la memoria del diseño; ``degree=2``
+(``--grado 2``) entrena el modelo polinómico del notebook.
+
+Uso::
+
+    python entrenamiento.py datosPreparados.csv --salida modeloFinal.bin --csv modeloFinal.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+from scipy import stats
+
+import matriz_dispersa
+from artefacto_modelo import write_model_artifact
+
+# Columnas que el notebook excluye del modelo
+EXCLUDED_COLUMNS = ["price", "title", "body", "currency", "fee", "price_display", "address"]
+
+# Autovalores de X'X (con columnas escaladas) por debajo de esta fracción del mayor se tratan como cero
+RANK_TOLERANCE = 1e-10
+
+
+def design_chunks(source, features=None, chunksize=100_000, sparse=False, degree=1):
+    """Recorre ``source`` (ruta de ``datosPreparados.csv`` o DataFrame) por bloques ``(X, y)``.
+
+    ``X`` es densa o, con ``sparse=True``, CSR; ``degree`` eleva cada columna
+    a esa potencia (ver ``matriz_dispersa.powers``).
+    """
+    if isinstance(source, pd.DataFrame):
+        parts = (source.iloc[start:start + chunksize] for start in range(0, len(source), chunksize))
+    else:
+        parts = pd.read_csv(source, chunksize=chunksize)
+    for part in parts:
+        columns = features if features is not None else [c for c in part.columns if c not in EXCLUDED_COLUMNS]
+        if sparse:
+            X = matriz_dispersa.from_frame(part, columns)
+        else:
+            X = part[columns].to_numpy(dtype=np.float64)
+        yield matriz_dispersa.powers(X, columns, degree)[0], part["price"].to_numpy(dtype=np.float64)
+
+
+def feature_names(source):
+    """Variables candidatas del modelo: todas las columnas menos ``EXCLUDED_COLUMNS``."""
+    columns = source.columns if isinstance(source, pd.DataFrame) else pd.read_csv(source, nrows=0).columns
+    return [col for col in columns if col not in EXCLUDED_COLUMNS]
+
+
+class GramOLS:
+    """Mínimos cuadrados ordinarios (sin intercepto) a partir de ``X'X``, ``X'y`` e ``y'y``.
+
+    Las columnas se escalan a norma 1 para que el condicionamiento de ``X'X``
+    no dependa de las unidades de cada variable (``time`` frente a columnas 0/1).
+    """
+
+    def __init__(self, gram, xty, yty, n_rows):
+        self.gram = np.asarray(gram, dtype=np.float64)
+        self.xty = np.asarray(xty, dtype=np.float64)
+        self.yty = float(yty)
+        self.n_rows = int(n_rows)
+        norms = np.sqrt(np.diag(self.gram))
+        self.scale = 1.0 / np.where(norms > 0, norms, 1.0)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        gram = xty = None
+        yty, n_rows = 0.0, 0
+        for X, y in chunks:
+            if gram is None:
+                gram = np.zeros((X.shape[1], X.shape[1]))
+                xty = np.zeros(X.shape[1])
+            product = X.T @ X
+            gram += product.toarray() if sp.issparse(product) else product
+            xty += X.T @ y
+            yty += y @ y
+            n_rows += len(y)
+        return cls(gram, xty, yty, n_rows)
+
+    def remove_rows(self, X, y):
+        """Quita del ajuste las filas ``X``, ``y`` (actualización de rango bajo de ``X'X``)."""
+        product = X.T @ X
+        self.gram -= product.toarray() if sp.issparse(product) else product
+        self.xty -= X.T @ y
+        self.yty -= y @ y
+        self.n_rows -= len(y)
+
+    def _scaled(self, columns):
+        d = self.scale[columns]
+        return self.gram[np.ix_(columns, columns)] * np.outer(d, d), self.xty[columns] * d
+
+    def _pseudo_inverse(self, gram):
+        values, vectors = np.linalg.eigh(gram)
+        keep = values > RANK_TOLERANCE * max(values.max(), 0.0)
+        inverse = (vectors[:, keep] / values[keep]) @ vectors[:, keep].T
+        return inverse, int(keep.sum())
+
+    def fit(self, columns, inverse=None):
+        """Ajusta el modelo con las columnas ``columns`` (índices).
+
+        ``inverse`` es la inversa escalada de ``X'X`` para esas columnas si ya
+        se conoce (ver ``drop``); si no, se calcula.
+        """
+        columns = np.asarray(columns, dtype=np.int64)
+        gram, xty = self._scaled(columns)
+        if inverse is None:
+            inverse, rank = self._pseudo_inverse(gram)
+        else:
+            rank = len(columns)
+
+        beta = inverse @ xty
+        rss = max(self.yty - 2 * beta @ xty + beta @ gram @ beta, 0.0)
+        df_resid = self.n_rows - rank
+        sigma2 = rss / df_resid
+        d = self.scale[columns]
+        bse = np.sqrt(np.clip(sigma2 * np.diag(inverse), 0.0, None)) * d
+        params = beta * d
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pvalues = 2 * stats.t.sf(np.abs(params / bse), df_resid)
+        rsquared = 1 - rss / self.yty
+        return {
+            "columns": columns,
+            "params": params,
+            "bse": bse,
+            "pvalues": pvalues,
+            "rank": rank,
+            "df_resid": df_resid,
+            "scale": sigma2,
+            "rsquared_adj": 1 - self.n_rows / df_resid * (1 - rsquared),
+            "inverse": inverse,
+        }
+
+    def drop(self, fit, drop_mask):
+        """Ajuste sin las columnas marcadas en ``drop_mask``, reutilizando la inversa de ``fit``."""
+        keep = ~drop_mask
+        if fit["rank"] < len(fit["columns"]):
+            # Con rango incompleto la pseudoinversa no se actualiza por bloques
+            return self.fit(fit["columns"][keep])
+
+        # Complemento de Schur: (X_K'X_K)^-1 = M_KK - M_KD M_DD^-1 M_DK
+        inverse = fit["inverse"]
+        m_kd = inverse[np.ix_(keep, drop_mask)]
+        m_dd = inverse[np.ix_(drop_mask, drop_mask)]
+        downdated = inverse[np.ix_(keep, keep)] - m_kd @ np.linalg.solve(m_dd, m_kd.T)
+        return self.fit(fit["columns"][keep], inverse=downdated)
+
+
+def backward_elimination(ols, names, alpha=0.05, max_rounds=None, verbose=False):
+    """Quita todas las variables con p > ``alpha`` y reajusta hasta que no quede ninguna.
+
+    ``max_rounds`` limita el número de rondas de eliminación (``0`` = modelo
+    con todas las variables, ``None`` = hasta que todas sean significativas).
+    """
+    fit = ols.fit(np.arange(len(names)))
+    iteration = 1
+    while True:
+        drop_mask = fit["pvalues"] > alpha
+        if verbose:
+            print(f"Iteración {iteration}: {len(fit['columns'])} variables, "
+                  f"R^2 ajustado {fit['rsquared_adj']:.4f}, {int(drop_mask.sum())} no significativas")
+        if not drop_mask.any() or (max_rounds is not None and iteration > max_rounds):
+            return fit
+        fit = ols.drop(fit, drop_mask)
+        iteration += 1
+
+
+def cooks_distance(X, y, ols, fit):
+    """Distancia de Cook de las filas ``X``, ``y`` para el ajuste ``fit``.
+
+    ``D_i = e_i^2 h_i / (k s^2 (1 - h_i)^2)`` con ``h_i`` el apalancamiento de la
+    fila, ``k`` el número de variables y ``s^2`` la varianza residual del ajuste.
+    """
+    columns = fit["columns"]
+    X = X[:, columns]
+    resid = y - X @ fit["params"]
+    if sp.issparse(X):
+        scaled = X @ sp.diags(ols.scale[columns])
+        leverage = np.asarray(scaled.multiply(scaled @ fit["inverse"]).sum(axis=1)).ravel()
+    else:
+        scaled = X * ols.scale[columns]
+        leverage = np.einsum("ij,ij->i", scaled @ fit["inverse"], scaled)
+    return resid ** 2 * leverage / (len(columns) * fit["scale"] * (1 - leverage) ** 2)
+
+
+def fit_model(chunks, names, alpha=0.05, remove_outliers=True, max_rounds=None, verbose=False):
+    """Eliminación hacia atrás y, opcionalmente, reajuste sin las filas atípicas.
+
+    ``chunks`` es una función sin argumentos que devuelve un iterador nuevo de
+    bloques ``(X, y)`` con las columnas ``names``; se recorre una vez para
+    acumular ``X'X`` y otra para la distancia de Cook.
+    """
+    ols = GramOLS.from_chunks(chunks())
+    fit = backward_elimination(ols, names, alpha, max_rounds, verbose)
+
+    outliers = np.empty(0, dtype=np.int64)
+    if remove_outliers:
+        # Una pasada por bloques: distancia de Cook de cada fila y resta de las atípicas de X'X,
+        # sin volver a leer los datos para reajustar
+        threshold = 4 / ols.n_rows
+        flagged, start = [], 0
+        for X, y in chunks():
+            local = np.flatnonzero(cooks_distance(X, y, ols, fit) > threshold)
+            flagged.append(local + start)
+            ols.remove_rows(X[local], y[local])
+            start += len(y)
+        outliers = np.concatenate(flagged) if flagged else outliers
+        fit = ols.fit(fit["columns"])
+        if verbose:
+            print(f"Sin {len(outliers)} filas atípicas: R^2 ajustado {fit['rsquared_adj']:.4f}")
+
+    return {
+        "variables": [names[i] for i in fit["columns"]],
+        "columns": fit["columns"],
+        "params": fit["params"],
+        "pvalues": fit["pvalues"],
+        "rsquared_adj": fit["rsquared_adj"],
+        "n_rows": ols.n_rows,
+        "outliers": outliers,
+    }
+
+
+def train(source, alpha=0.05, remove_outliers=True, chunksize=100_000, sparse=False, degree=1,
+          max_rounds=None, verbose=False):
+    """Selección del modelo como en ``SeleccionModelo.ipynb``.
+
+    Devuelve un diccionario con ``variables``, ``params``, ``pvalues``,
+    ``rsquared_adj``, el número de filas usadas y las posiciones de las filas
+    atípicas descartadas.
+    """
+    base = feature_names(source)
+    names = matriz_dispersa.power_names(base, degree)
+    return fit_model(lambda: design_chunks(source, base, chunksize, sparse, degree), names,
+                     alpha, remove_outliers, max_rounds, verbose)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena el modelo de precios por eliminación hacia atrás.")
+    parser.add_argument("datos", help="datosPreparados.csv")
+    parser.add_argument("--salida", default="modeloFinal.bin", help="artefacto binario del modelo")
+    parser.add_argument("--csv", help="exporta también los coeficientes en CSV (formato de modeloFinal.csv)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="nivel de significancia")
+    parser.add_argument("--umbral", type=float, default=1e-6, help="descarta coeficientes con |coef| menor")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="filas por bloque")
+    parser.add_argument("--disperso", action="store_true", help="arma el diseño como matriz CSR")
+    parser.add_argument("--grado", type=int, default=1, help="potencia de las variables (2 = modelo polinómico)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    resultado = train(args.datos, alpha=args.alpha, chunksize=args.chunksize, sparse=args.disperso,
+                      degree=args.grado, verbose=True)
+    print(f"{len(resultado['variables'])} variables en {time.perf_counter() - start:.2f} s")
+
+    # El tablero infiere los tipos de las columnas con el primer bloque de 100 000 filas
+    datos = pd.read_csv(args.datos, nrows=100_000)
+    write_model_artifact(args.salida, resultado["variables"], resultado["params"], datos, args.umbral)
+    if args.csv:
+        pd.DataFrame({"Variables": resultado["variables"], "Coeficientes": resultado["params"]}) \
+            .to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Comparación de modelos con validación cruzada de k particiones.
+
+En lugar de comparar el R^2 ajustado dentro de la muestra, cada especificación
+candidata (rondas de eliminación, con o sin quitar atípicos por distancia de
+Cook, grado del polinomio) se entrena en k-1 particiones y se mide el error en
+la restante. Los trabajos especificación x partición se reparten en un grupo
+de procesos; el diseño se escribe una sola vez en disco y cada proceso lo abre
+como mapa de memoria de solo lectura, así que ningún proceso copia los datos.
+
+Uso::
+
+    python evaluacion.py datosPreparados.csv --particiones 5 --procesos 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import matriz_dispersa
+from entrenamiento import design_chunks, feature_names, fit_model
+
+# Especificaciones del notebook: modelo lineal completo, con una ronda de eliminación, con eliminación
+# hasta que todas las variables sean significativas (con y sin atípicos) y el modelo de grado 2
+DEFAULT_SPECS = [
+    {"nombre": "lineal completo", "rounds": 0, "outliers": False, "degree": 1},
+    {"nombre": "lineal 1 ronda", "rounds": 1, "outliers": False, "degree": 1},
+    {"nombre": "lineal", "rounds": None, "outliers": False, "degree": 1},
+    {"nombre": "lineal sin atípicos", "rounds": None, "outliers": True, "degree": 1},
+    {"nombre": "grado 2", "rounds": 1, "outliers": False, "degree": 2},
+    {"nombre": "grado 2 sin atípicos", "rounds": 1, "outliers": True, "degree": 2},
+]
+
+_shared = {}
+
+
+def write_design(source, directory, chunksize=100_000):
+    """Escribe el diseño denso de ``source`` en ``directory`` (``X.f8`` e ``y.f8``, float64 por filas).
+
+    Los bloques se agregan al archivo a medida que se leen, sin tener todo el
+    diseño en memoria. Devuelve los nombres de las columnas y el número de filas.
+    """
+    names = feature_names(source)
+    n_rows = 0
+    with open(os.path.join(directory, "X.f8"), "wb") as fx, open(os.path.join(directory, "y.f8"), "wb") as fy:
+        for X, y in design_chunks(source, names, chunksize):
+            fx.write(np.ascontiguousarray(X).tobytes())
+            fy.write(y.tobytes())
+            n_rows += len(y)
+    return names, n_rows
+
+
+def _init_worker(directory, n_rows, n_columns):
+    _shared["X"] = np.memmap(os.path.join(directory, "X.f8"), dtype=np.float64, mode="r", shape=(n_rows, n_columns))
+    _shared["y"] = np.memmap(os.path.join(directory, "y.f8"), dtype=np.float64, mode="r", shape=(n_rows,))
+    _shared["folds"] = np.load(os.path.join(directory, "folds.npy"), mmap_mode="r")
+
+
+def _run_job(spec, fold, names, alpha, chunksize):
+    start = time.perf_counter()
+    X, y, folds = _shared["X"], _shared["y"], _shared["folds"]
+    train_rows = np.flatnonzero(folds != fold)
+    test_rows = np.flatnonzero(folds == fold)
+    degree_names = matriz_dispersa.power_names(names, spec["degree"])
+
+    def chunks():
+        for begin in range(0, len(train_rows), chunksize):
+            rows = train_rows[begin:begin + chunksize]
+            yield matriz_dispersa.powers(X[rows], names, spec["degree"])[0], y[rows]
+
+    model = fit_model(chunks, degree_names, alpha, spec["outliers"], spec["rounds"])
+    errors = []
+    for begin in range(0, len(test_rows), chunksize):
+        rows = test_rows[begin:begin + chunksize]
+        design = matriz_dispersa.powers(X[rows], names, spec["degree"])[0]
+        errors.append(y[rows] - design[:, model["columns"]] @ model["params"])
+    errors = np.concatenate(errors)
+    return {
+        "sse": float(errors @ errors),
+        "sae": float(np.abs(errors).sum()),
+        "n": len(errors),
+        "variables": len(model["variables"]),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def cross_validate(source, specs=None, folds=5, processes=None, alpha=0.05, seed=0, chunksize=100_000):
+    """Error fuera de muestra de cada especificación con ``folds`` particiones.
+
+    Devuelve una fila por especificación con ``rmse``, ``mae``, el número
+    medio de variables seleccionadas y ``tiempo`` (suma de los segundos de
+    sus trabajos).
+    """
+    specs = DEFAULT_SPECS if specs is None else specs
+    with tempfile.TemporaryDirectory() as directory:
+        names, n_rows = write_design(source, directory, chunksize)
+        # Particiones aleatorias pero reproducibles
+        assignment = np.random.default_rng(seed).permutation(n_rows) % folds
+        np.save(os.path.join(directory, "folds.npy"), assignment.astype(np.int32))
+
+        jobs = [(i, fold) for i in range(len(specs)) for fold in range(folds)]
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(directory, n_rows, len(names))) as pool:
+            futures = [pool.submit(_run_job, specs[i], fold, names, alpha, chunksize) for i, fold in jobs]
+            results = [future.result() for future in futures]
+
+    resumen = []
+    for i, spec in enumerate(specs):
+        parts = [r for (j, _), r in zip(jobs, results) if j == i]
+        n = sum(p["n"] for p in parts)
+        resumen.append({
+            "nombre": spec["nombre"],
+            "rmse": np.sqrt(sum(p["sse"] for p in parts) / n),
+            "mae": sum(p["sae"] for p in parts) / n,
+            "variables": np.mean([p["variables"] for p in parts]),
+            "tiempo": sum(p["seconds"] for p in parts),
+        })
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara modelos de precios con validación cruzada.")
+    parser.add_argument("datos", help="datosPreparados.csv")
+    parser.add_argument("--particiones", type=int, default=5, help="número de particiones (k)")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="nivel de significancia")
+    parser.add_argument("--semilla", type=int, default=0, help="semilla de las particiones")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    resumen = cross_validate(args.datos, folds=args.particiones, processes=args.procesos,
+                             alpha=args.alpha, seed=args.semilla)
+    print(f"{'Modelo':<24}{'RMSE':>10}{'MAE':>10}{'Variables':>11}{'Tiempo (s)':>12}")
+    for fila in resumen:
+        print(f"{fila['nombre']:<24}{fila['rmse']:>10.2f}{fila['mae']:>10.2f}"
+              f"{fila['variables']:>11.1f}{fila['tiempo']:>12.2f}")
+    print(f"Total: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
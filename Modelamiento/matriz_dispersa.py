@@ -0,0 +1,94 @@
+"""Matriz de diseño dispersa (CSR) para el espacio one-hot del modelo.
+
+Cada familia one-hot (``cityname_*``, ``state_*``, ``source_*``, ...) tiene a
+lo sumo un valor distinto de cero por fila, así que en lugar de guardar una
+columna densa por categoría se guarda un código por fila y la matriz CSR se
+arma directamente desde esos códigos. La memoria pasa a depender del número
+de valores distintos de cero y no del número de ciudades.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Familias one-hot de datosPreparados.csv (las mismas que compacta el tablero)
+ONE_HOT_FAMILIES = ["category", "pets_allowed", "has_photo", "cityname", "state", "source", "price_type"]
+
+
+def from_codes(n_rows, numeric, categorical, columns):
+    """Arma la matriz CSR de ``n_rows`` filas con las columnas ``columns`` en ese orden.
+
+    ``numeric`` es un diccionario nombre -> arreglo de valores y ``categorical``
+    un diccionario familia -> ``(códigos, etiquetas)`` con código ``-1`` para
+    las filas sin categoría; la columna de la etiqueta ``x`` de la familia
+    ``f`` se llama ``f_x``. Las columnas que no aparecen en ``columns`` se
+    ignoran.
+    """
+    position = {name: i for i, name in enumerate(columns)}
+    used = [name for name in numeric if name in position]
+
+    # Una fuente por columna numérica y por familia: cada fuente aporta a lo sumo un valor por
+    # fila, así que una grilla filas x fuentes (que no crece con el número de ciudades) se
+    # convierte en CSR tomando sus celdas ocupadas en orden de filas
+    n_sources = len(used) + len(categorical)
+    values = np.zeros((n_rows, n_sources))
+    targets = np.full((n_rows, n_sources), -1, dtype=np.int32)
+
+    for k, name in enumerate(used):
+        column = np.asarray(numeric[name], dtype=np.float64)
+        values[:, k] = column
+        targets[:, k] = np.where(column != 0, position[name], -1)
+
+    for k, (family, (codes, labels)) in enumerate(categorical.items(), start=len(used)):
+        # Posición de cada etiqueta en la matriz (-1 si el modelo no usa esa columna)
+        lookup = np.array([position.get(f"{family}_{label}", -1) for label in labels] + [-1], dtype=np.int32)
+        targets[:, k] = lookup[np.asarray(codes, dtype=np.int64)]  # el código -1 cae en el -1 final
+        values[:, k] = 1.0
+
+    occupied = targets >= 0
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(occupied.sum(axis=1), out=indptr[1:])
+    matrix = sparse.csr_matrix((values[occupied], targets[occupied], indptr), shape=(n_rows, len(columns)))
+    matrix.has_sorted_indices = False
+    return matrix
+
+
+def codes_from_frame(df):
+    """Separa un bloque de ``datosPreparados`` en columnas numéricas y códigos por familia one-hot."""
+    categorical, numeric = {}, {}
+    family_columns = set()
+    for family in ONE_HOT_FAMILIES:
+        columns = [col for col in df.columns if col.startswith(family + "_")]
+        if not columns:
+            continue
+        one_hot = df[columns].to_numpy()
+        codes = np.where(one_hot.any(axis=1), one_hot.argmax(axis=1), -1)
+        categorical[family] = (codes, [col[len(family) + 1:] for col in columns])
+        family_columns.update(columns)
+    for col in df.columns:
+        if col not in family_columns and pd.api.types.is_numeric_dtype(df[col]):
+            numeric[col] = df[col].to_numpy()
+    return numeric, categorical
+
+
+def from_frame(df, columns):
+    """Matriz CSR de un bloque de ``datosPreparados`` con las columnas ``columns``."""
+    numeric, categorical = codes_from_frame(df)
+    return from_codes(len(df), numeric, categorical, columns)
+
+
+def power_names(names, degree):
+    """Nombres de las columnas elevadas a ``degree`` (los de ``PolynomialFeatures``: ``x^2``)."""
+    return list(names) if degree == 1 else [f"{name}^{degree}" for name in names]
+
+
+def powers(X, names, degree):
+    """Potencia ``degree`` de cada columna, como en el modelo polinómico del notebook.
+
+    ``SeleccionModelo.ipynb`` conserva de ``PolynomialFeatures`` solo los
+    términos ``x^2`` (sin productos cruzados); elevar una matriz CSR elemento
+    a elemento conserva su patrón de ceros. Acepta matrices CSR o densas y
+    devuelve la matriz y sus nombres.
+    """
+    if degree == 1:
+        return X, power_names(names, degree)
+    return (X.power(degree) if sparse.issparse(X) else X ** degree), power_names(names, degree)
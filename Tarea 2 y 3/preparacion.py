@@ -0,0 +1,306 @@
+"""Preparación de ``datos.csv`` por bloques (versión de script de ``Preparacion_Datos.ipynb``).
+
+Aplica los mismos pasos del notebook (``dropna``, quitar los tipos de precio
+distintos de mensual, ``get_dummies`` de las familias categóricas, una columna
+0/1 por amenity y ``longitud_descripcion``) sin cargar el archivo completo:
+
+1. Una pasada previa fija el vocabulario: las categorías de cada familia, las
+   amenities y el tipo de cada columna en todo el archivo. Así todos los
+   bloques producen exactamente las mismas columnas, en el mismo orden y con
+   el mismo formato que el notebook.
+2. Cada bloque se codifica contra ese vocabulario con operaciones
+   vectorizadas (las amenities se separan una sola vez, se convierten en
+   códigos del vocabulario y se marcan en la matriz 0/1 de un solo golpe) y
+   se agrega al CSV de salida.
+
+Con ``--procesos N`` el archivo se divide en rangos de bytes que se procesan
+en paralelo (ver ``prepare_parallel``) con la misma salida.
+
+Las amenities quedan en orden alfabético (en el notebook su orden dependía del
+recorrido de un ``set``). Uso::
+
+    python preparacion.py datos.csv datosPreparados.csv --procesos 4
+"""
+import argparse
+import io
+import json
+import mmap
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Formato de datos.csv. Las amenities se leen siempre como texto: en un bloque en que todas faltan
+# read_csv las inferiría como float
+READ_OPTIONS = {"index_col": 0, "encoding": "Windows-1252", "sep": ";", "dtype": {"amenities": str}}
+
+# Familias que el notebook codifica con get_dummies, en el mismo orden
+FAMILIES = ["category", "pets_allowed", "has_photo", "cityname", "state", "source", "price_type"]
+
+# Tipos de precio que se descartan para que todos los precios sean mensuales
+EXCLUDED_PRICE_TYPES = ["Weekly", "Monthly|Weekly"]
+
+
+def read_chunks(path, chunksize=100_000):
+    return pd.read_csv(path, chunksize=chunksize, **READ_OPTIONS)
+
+
+def clean(chunk):
+    """``dropna``, coordenadas como float y solo precios mensuales."""
+    chunk = chunk.dropna()
+    chunk = chunk.astype({"latitude": float, "longitude": float})
+    return chunk[~chunk["price_type"].isin(EXCLUDED_PRICE_TYPES)]
+
+
+def amenity_items(series):
+    """Amenities de cada fila como pares ``(posición de la fila, amenity sin espacios)``."""
+    items = series.astype(object).fillna("").astype(str).reset_index(drop=True).str.split(",").explode()
+    return items.index.to_numpy(), items.str.strip()
+
+
+def amenity_indicators(series, vocabulary):
+    """Matriz 0/1 filas x ``vocabulary`` en una sola pasada sobre todas las amenities del bloque."""
+    rows, items = amenity_items(series)
+    codes = pd.Categorical(items, categories=vocabulary).codes
+    known = codes >= 0
+    indicators = np.zeros((len(series), len(vocabulary)), dtype=np.int64)
+    indicators[rows[known], codes[known]] = 1
+    return pd.DataFrame(indicators, index=series.index, columns=vocabulary)
+
+
+def _merge_dtype(a, b):
+    # Tipo numérico común de dos bloques (None si en alguno la columna no es numérica)
+    if not pd.api.types.is_numeric_dtype(b) or (a is not None and not pd.api.types.is_numeric_dtype(a)):
+        return b if not pd.api.types.is_numeric_dtype(b) else a
+    return b if a is None else np.result_type(a, b)
+
+
+def _scan_chunks(chunks):
+    # Vocabulario parcial (conjuntos sin ordenar) de una secuencia de bloques crudos
+    families = {family: set() for family in FAMILIES}
+    amenities = set()
+    dtypes = {}
+    for chunk in chunks:
+        # El tipo se toma antes de dropna, como lo infiere read_csv sobre el archivo completo: una
+        # columna entera con valores faltantes en algún bloque queda float en todos (3 -> 3.0)
+        for col, dtype in chunk.dtypes.items():
+            dtypes[col] = _merge_dtype(dtypes.get(col), dtype)
+        chunk = clean(chunk)
+        for family in FAMILIES:
+            families[family].update(chunk[family].unique())
+        amenities.update(item for item in amenity_items(chunk["amenities"])[1].unique() if item)
+    return {"families": families, "amenities": amenities, "dtypes": dtypes}
+
+
+def _merge_partials(partials):
+    # Une vocabularios parciales; el resultado no depende del orden en que lleguen
+    families = {family: set() for family in FAMILIES}
+    amenities = set()
+    dtypes = {}
+    for partial in partials:
+        for family in FAMILIES:
+            families[family].update(partial["families"][family])
+        amenities.update(partial["amenities"])
+        for col, dtype in partial["dtypes"].items():
+            dtypes[col] = _merge_dtype(dtypes.get(col), dtype)
+    return {
+        "families": {family: sorted(values) for family, values in families.items()},
+        "amenities": sorted(amenities),
+        "dtypes": {col: dtype.str for col, dtype in dtypes.items() if pd.api.types.is_numeric_dtype(dtype)},
+    }
+
+
+def scan_vocabulary(path, chunksize=100_000):
+    """Pasada previa: categorías de cada familia, amenities y tipo de cada columna en todo el archivo."""
+    return _merge_partials([_scan_chunks(read_chunks(path, chunksize))])
+
+
+def prepare_chunk(chunk, vocabulary):
+    """Codifica un bloque crudo de ``datos.csv`` contra ``vocabulary`` (ver ``scan_vocabulary``)."""
+    chunk = clean(chunk)
+    base = chunk.drop(columns=FAMILIES + ["amenities"])
+    base = base.astype({col: np.dtype(dtype) for col, dtype in vocabulary["dtypes"].items() if col in base})
+
+    parts = [base]
+    for family in FAMILIES:
+        categories = pd.CategoricalDtype(vocabulary["families"][family])
+        parts.append(pd.get_dummies(chunk[family].astype(categories), prefix=family, dtype=int))
+
+    parts.append(amenity_indicators(chunk["amenities"], vocabulary["amenities"]))
+
+    prepared = pd.concat(parts, axis=1)
+    prepared["longitud_descripcion"] = chunk["body"].astype(str).str.len()
+    return prepared
+
+
+def write_chunk(prepared, out, vocabulary, header):
+    """Escribe un bloque preparado con el mismo texto que ``to_csv(index=False)``.
+
+    Las columnas 0/1 (familias y amenities, entre las columnas originales y
+    ``longitud_descripcion``) son la mayoría; en lugar de pasar cada celda por
+    el módulo csv, cada fila de ese bloque se arma con numpy como ``"0,1,..."``.
+    Las demás columnas las escribe pandas con un fin de línea ``"\n\x00"`` (el
+    ``"\n"`` mantiene las reglas de comillas de siempre) para poder separarlas.
+    """
+    if header:
+        prepared.iloc[:0].to_csv(out, index=False)
+    if prepared.empty:
+        return
+    last = len(prepared.columns) - 1
+    first = last - sum(len(values) for values in vocabulary["families"].values()) - len(vocabulary["amenities"])
+
+    indicators = prepared.iloc[:, first:last].to_numpy(dtype=np.uint8)
+    width = 2 * indicators.shape[1]
+    text = np.full((len(indicators), width), ord(","), dtype=np.uint8)
+    text[:, 0::2] = indicators + ord("0")
+    middle = text.view(f"S{width}").ravel().astype(str)  # "0,1,...," con la coma final
+
+    def lines(frame):
+        return frame.to_csv(index=False, header=False, lineterminator="\n\x00").split("\n\x00")[:-1]
+
+    left, right = lines(prepared.iloc[:, :first]), lines(prepared.iloc[:, last:])
+    out.write("".join(f"{l},{m}{r}\n" for l, m, r in zip(left, middle, right)))
+
+
+def prepare(path, output, vocabulary=None, chunksize=100_000):
+    """Prepara ``path`` y escribe el resultado en ``output`` bloque a bloque. Devuelve las filas escritas."""
+    if vocabulary is None:
+        vocabulary = scan_vocabulary(path, chunksize)
+    rows = 0
+    with open(output, "w", encoding="utf-8", newline="") as out:
+        for chunk in read_chunks(path, chunksize):
+            prepared = prepare_chunk(chunk, vocabulary)
+            write_chunk(prepared, out, vocabulary, header=out.tell() == 0)
+            rows += len(prepared)
+    return rows
+
+
+def partition_offsets(path, partition_bytes=64 * 1024 * 1024):
+    """Divide ``path`` en rangos de bytes ``(inicio, fin)`` que empiezan y terminan en un fin de registro.
+
+    Un salto de línea dentro de un campo entre comillas (por ejemplo en
+    ``body``) no termina el registro: un corte solo es válido si antes de él
+    hay un número par de comillas (las comillas escapadas van dobles, así que
+    no cambian la paridad). Las comillas se cuentan una sola vez, por tramos.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        quotes, position = 0, 0
+
+        def next_record_end(target):
+            # Primer fin de registro después de ``target``; avanza el conteo de comillas hasta ahí
+            nonlocal quotes, position
+            while position < target:
+                step = min(target, position + (1 << 24))
+                quotes += data[position:step].count(b'"')
+                position = step
+            while True:
+                newline = data.find(b"\n", position)
+                if newline < 0:
+                    position = size
+                    return size
+                quotes += data[position:newline].count(b'"')
+                position = newline + 1
+                if quotes % 2 == 0:
+                    return position
+
+        header_end = next_record_end(0)
+        offsets = [header_end]
+        while offsets[-1] < size:
+            offsets.append(next_record_end(max(offsets[-1] + partition_bytes, position)))
+    return header_end, list(zip(offsets[:-1], offsets[1:]))
+
+
+def _read_partition(path, header_end, start, end, chunksize):
+    with open(path, "rb") as f:
+        header = f.read(header_end)
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), chunksize=chunksize, **READ_OPTIONS)
+
+
+def _scan_partition(path, header_end, start, end, chunksize):
+    return _scan_chunks(_read_partition(path, header_end, start, end, chunksize))
+
+
+def _prepare_partition(path, header_end, start, end, vocabulary, chunksize):
+    out = io.StringIO()
+    rows = 0
+    for chunk in _read_partition(path, header_end, start, end, chunksize):
+        prepared = prepare_chunk(chunk, vocabulary)
+        write_chunk(prepared, out, vocabulary, header=False)
+        rows += len(prepared)
+    return out.getvalue(), rows
+
+
+def _ordered(pool, function, jobs, in_flight):
+    # Resultados en el orden de ``jobs`` con a lo sumo ``in_flight`` trabajos pendientes
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(function, *job))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def prepare_parallel(path, output, processes=None, vocabulary=None, chunksize=100_000,
+                     partition_bytes=64 * 1024 * 1024):
+    """Igual que ``prepare`` pero repartiendo rangos de bytes del archivo entre ``processes`` procesos.
+
+    Cada proceso lee y procesa su propio rango. El vocabulario se arma uniendo
+    los vocabularios parciales de cada rango y todos los rangos se codifican
+    contra él, así que producen las mismas columnas; los resultados se
+    escriben en el orden del archivo, por lo que la salida es idéntica a la de
+    ``prepare``. Devuelve las filas escritas.
+    """
+    header_end, partitions = partition_offsets(path, partition_bytes)
+    processes = processes or os.cpu_count()
+    with ProcessPoolExecutor(processes) as pool:
+        if vocabulary is None:
+            jobs = [(path, header_end, start, end, chunksize) for start, end in partitions]
+            vocabulary = _merge_partials(_ordered(pool, _scan_partition, jobs, 2 * processes))
+
+        rows = 0
+        with open(output, "w", encoding="utf-8", newline="") as out:
+            # El encabezado sale de la línea de nombres de columna, no de una fila de datos
+            header = pd.read_csv(path, nrows=0, **READ_OPTIONS)
+            write_chunk(prepare_chunk(header, vocabulary), out, vocabulary, header=True)
+            jobs = [(path, header_end, start, end, vocabulary, chunksize) for start, end in partitions]
+            for text, count in _ordered(pool, _prepare_partition, jobs, 2 * processes):
+                out.write(text)
+                rows += count
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prepara datos.csv para el modelamiento y el tablero.")
+    parser.add_argument("entrada", help="datos.csv (Windows-1252, separado por ';')")
+    parser.add_argument("salida", help="CSV preparado (datosPreparados.csv)")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="filas por bloque")
+    parser.add_argument("--procesos", type=int, default=1, help="procesos en paralelo")
+    parser.add_argument("--vocabulario", help="JSON con el vocabulario; si no existe se calcula y se guarda ahí")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    vocabulary = None
+    if args.vocabulario:
+        try:
+            with open(args.vocabulario, encoding="utf-8") as f:
+                vocabulary = json.load(f)
+        except FileNotFoundError:
+            vocabulary = scan_vocabulary(args.entrada, args.chunksize)
+            with open(args.vocabulario, "w", encoding="utf-8") as f:
+                json.dump(vocabulary, f, ensure_ascii=False, indent=1)
+    if args.procesos > 1:
+        rows = prepare_parallel(args.entrada, args.salida, args.procesos, vocabulary, args.chunksize)
+    else:
+        rows = prepare(args.entrada, args.salida, vocabulary, args.chunksize)
+    print(f"{rows} filas preparadas en {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# preparacion.py se importa por nombre desde "Tarea 2 y 3/"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import preparacion
+
+
+def _raw(n=12):
+    # Anuncios con el formato de datos.csv; las filas 1 a 3 no tienen amenities
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({
+        "category": "housing/rent/apartment",
+        "title": [f"Anuncio {i}" for i in range(n)],
+        "body": [f"Descripción, con \"comillas\"\ny salto {i}" for i in range(n)],
+        "amenities": ["Pool,Gym", None, None, None] + ["Parking, Pool"] * (n - 4),
+        "bathrooms": rng.integers(1, 3, n).astype(float),
+        "bedrooms": rng.integers(0, 4, n).astype(float),
+        "currency": "USD",
+        "fee": "No",
+        "has_photo": ["Yes", "Thumbnail"] * (n // 2),
+        "pets_allowed": ["Cats", "Dogs", "Cats,Dogs"] * (n // 3),
+        "price": rng.integers(500, 3000, n).astype(float),
+        "price_display": "$1,000",
+        "price_type": "Monthly",
+        "square_feet": rng.integers(300, 2000, n),
+        "address": "Calle 1",
+        "cityname": ["Austin", "Boston"] * (n // 2),
+        "state": ["TX", "MA"] * (n // 2),
+        "latitude": rng.uniform(30, 45, n),
+        "longitude": rng.uniform(-100, -70, n),
+        "source": "RentLingo",
+        "time": rng.integers(1_500_000_000, 1_600_000_000, n),
+    }, index=pd.RangeIndex(1000, 1000 + n, name="id"))
+    return raw
+
+
+@pytest.fixture
+def datos_csv(tmp_path):
+    path = tmp_path / "datos.csv"
+    _raw().to_csv(path, sep=";", encoding="Windows-1252")
+    return str(path)
+
+
+def test_chunk_without_amenities(datos_csv, tmp_path):
+    # Con un bloque por fila, los bloques 1 a 3 tienen todas sus amenities vacías
+    reference = tmp_path / "referencia.csv"
+    chunked = tmp_path / "por_fila.csv"
+    assert preparacion.prepare(datos_csv, str(reference)) == 9
+    assert preparacion.prepare(datos_csv, str(chunked), chunksize=1) == 9
+    assert chunked.read_bytes() == reference.read_bytes()
+
+    prepared = pd.read_csv(reference)
+    assert list(prepared.columns[-4:]) == ["Gym", "Parking", "Pool", "longitud_descripcion"]
+
+
+def test_amenity_items_all_missing():
+    rows, items = preparacion.amenity_items(pd.Series([np.nan, np.nan]))
+    assert list(rows) == [0, 1]
+    assert list(items) == ["", ""]
+
+
+def test_parallel_header_when_first_row_has_no_amenities(tmp_path):
+    path = tmp_path / "datos.csv"
+    _raw().iloc[1:].to_csv(path, sep=";", encoding="Windows-1252")
+    reference = tmp_path / "referencia.csv"
+    parallel = tmp_path / "paralelo.csv"
+    rows = preparacion.prepare(str(path), str(reference))
+    assert preparacion.prepare_parallel(str(path), str(parallel), processes=3, chunksize=1,
+                                        partition_bytes=200) == rows
+    assert parallel.read_bytes() == reference.read_bytes()